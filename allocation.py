@@ -0,0 +1,273 @@
+"""
+Распределение платежей по ведомости без обращения к Excel.
+
+Работает с компактным состоянием ведомости:
+- `LedgerRow` — строка квартиры на листе "список как должн"
+  (взнос, долг за прошлый год, оплата долга и 13 месячных сумм);
+- `PaymentRow` — строка квартиры в блоке месяца на листе "оплата".
+
+Все платежи обрабатываются одним проходом, результатом является набор изменений
+`Change(sheet, row, col, value)`, который затем записывается в книгу отдельно,
+и список `Allocation` — как распределён каждый записанный платёж (для журнала платежей).
+"""
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_SHEET = 'оплата'
+LEDGER_SHEET = 'список как должн'
+
+# Лист "оплата"
+PAYMENT_DATE_COLUMN = 1  # дата оплаты
+PAYMENT_KV_COLUMN = 2  # номер квартиры
+PAYMENT_PERIOD_COLUMN = 3  # оплаченный период
+PAYMENT_SUMM_COLUMN = 4  # сумма оплаты
+
+# Лист "список как должн"
+LEDGER_HEADER_ROW = 7  # строка с названиями месяцев
+LEDGER_FEE_COLUMN = 6  # ежемесячный взнос
+LEDGER_DEBT_COLUMN = 8  # долг за прошлый год
+LEDGER_DEBT_PAID_COLUMN = 9  # оплата долга за прошлый год
+LEDGER_FIRST_MONTH_COLUMN = 10  # первый месяц
+LEDGER_LAST_MONTH_COLUMN = 22  # последний столбец (переплата)
+LEDGER_MONTHS = LEDGER_LAST_MONTH_COLUMN - LEDGER_FIRST_MONTH_COLUMN + 1
+
+
+class LedgerColumns(NamedTuple):
+    """Столбцы листа "список как должн" (в шаблонах ведомости могут быть сдвинуты, см. `layout`)"""
+    fee: int = LEDGER_FEE_COLUMN
+    debt: int = LEDGER_DEBT_COLUMN
+    debt_paid: int = LEDGER_DEBT_PAID_COLUMN
+    first_month: int = LEDGER_FIRST_MONTH_COLUMN
+
+    @property
+    def last_month(self) -> int:
+        return self.first_month + LEDGER_MONTHS - 1
+
+
+LEDGER_COLUMNS = LedgerColumns()
+
+
+class Change(NamedTuple):
+    """Изменение одной ячейки ведомости"""
+    sheet: str
+    row: int
+    col: int
+    value: object
+
+
+class Allocation(NamedTuple):
+    """Как распределён записанный платёж квартиры за одну дату"""
+    kv: str
+    date: str
+    summ: float
+    debt: float  # погашено долга за прошлый год
+    months: str  # оплаченный платежом период ('январь', 'январь - март'; '' — в месяцы не попало)
+
+
+class LedgerRow:
+    """Строка квартиры на листе "список как должн" """
+    __slots__ = ('row', 'fee', 'debt', 'debt_paid', 'months')
+
+    def __init__(self, row: int, fee, debt, debt_paid, months):
+        """
+        Args:
+            row (int): Номер строки на листе.
+            fee: Ежемесячный взнос.
+            debt: Долг за прошлый год.
+            debt_paid: Оплата долга за прошлый год.
+            months (list): 13 сумм по месяцам (столбцы 10-22).
+        """
+        self.row = row
+        self.fee = fee if fee is not None else 0
+        self.debt = debt if debt is not None else 0
+        self.debt_paid = debt_paid if debt_paid is not None else 0
+        self.months = [summ if summ is not None else 0 for summ in months]
+
+
+class PaymentRow:
+    """Строка квартиры в блоке месяца на листе "оплата" """
+    __slots__ = ('row', 'date', 'period', 'summ')
+
+    def __init__(self, row: int, date, period, summ):
+        """
+        Args:
+            row (int): Номер строки на листе.
+            date: Даты оплат через "/".
+            period: Оплаченный период.
+            summ: Сумма оплат за месяц.
+        """
+        self.row = row
+        self.date = date
+        self.period = period
+        self.summ = summ
+
+
+class VedState:
+    """Компактное состояние ведомости для распределения платежей"""
+
+    def __init__(self, ledger: dict, payment_rows: dict, month_names: list, columns=LEDGER_COLUMNS):
+        """
+        Args:
+            ledger (dict): {квартира: LedgerRow}.
+            payment_rows (dict): {месяц: {квартира: PaymentRow}}.
+            month_names (list): Названия 13 месяцев из строки 7 листа "список как должн".
+            columns (LedgerColumns): Столбцы листа "список как должн".
+        """
+        self.ledger = ledger
+        self.payment_rows = payment_rows
+        self.month_names = month_names
+        self.columns = columns
+
+
+class Allocator:
+    """
+    Распределяет платежи банка по состоянию ведомости.
+
+    Порядок распределения для квартиры:
+    1. погашается долг за прошлый год (столбцы 8/9);
+    2. остаток раскладывается по месяцам (столбцы 10-21) по размеру взноса;
+    3. всё, что не поместилось, записывается в последний столбец (22).
+    """
+
+    def __init__(self, state: VedState, known_dates=None):
+        """
+        Args:
+            state (VedState): Состояние ведомости (изменяется на месте).
+            known_dates (set | None): Пары (квартира, дата), записанные через журнал платежей
+                (`payments_ledger`): для них совпадение даты в ячейке не считается повтором.
+        """
+        self.state = state
+        self.known_dates = known_dates if known_dates is not None else set()
+        self.applied = 0  # записано платежей
+        self.allocations = []  # Allocation записанных платежей
+        self.applied_keys = set()  # (квартира, дата) записанных платежей
+        self._changes = {}
+
+    def _set(self, sheet: str, row: int, col: int, value) -> None:
+        self._changes[(sheet, row, col)] = value
+
+    def changes(self) -> list:
+        """Набор изменений (последнее значение для каждой ячейки)."""
+        return [Change(sheet, row, col, value) for (sheet, row, col), value in self._changes.items()]
+
+    def apply(self, payments) -> list:
+        """
+        Применяет платежи к состоянию.
+
+        Args:
+            payments: Пары (квартира, (сумма, дата)) — элементы словаря `bank_xlsx.group_payments`.
+
+        Returns:
+            list[Change]: Набор изменений.
+        """
+        for kv, (summ, date) in payments:
+            self.apply_payment(kv.split('-')[0], summ, date)
+        return self.changes()
+
+    def apply_payment(self, kv: str, summ, date: str) -> bool:
+        """
+        Записывает один платёж на лист "оплата" и распределяет его по ведомости.
+
+        Returns:
+            bool: True, если платёж записан (его даты нет в ячейке или журнал знает,
+                что это новый платёж за уже записанную дату).
+        """
+        month = date.split('.')[1]
+        block = self.state.payment_rows.get(month)
+        if block is None:
+            logger.warning(f'На листе "{PAYMENT_SHEET}" нет блока для месяца {month}, '
+                           f'платёж кв {kv} от {date} пропущен')
+            return False
+        payment_row = block.get(kv)
+        if payment_row is None:
+            return False
+
+        date_payment = str(payment_row.date) if payment_row.date is not None else '0'
+        if date_payment == '0':
+            payment_row.date = date
+        elif date not in date_payment.split('/'):
+            payment_row.date = f'{date_payment}/{date}'
+        elif (kv, date) not in self.known_dates:
+            return False
+
+        payment_row.summ = (payment_row.summ if payment_row.summ is not None else 0) + summ
+        self._set(PAYMENT_SHEET, payment_row.row, PAYMENT_DATE_COLUMN, payment_row.date)
+        self._set(PAYMENT_SHEET, payment_row.row, PAYMENT_SUMM_COLUMN, payment_row.summ)
+
+        self.applied += 1
+        self.applied_keys.add((kv, date))
+        ledger_row = self.state.ledger.get(kv)
+        debt, months = self._allocate_debt(ledger_row, payment_row, summ) if ledger_row is not None else (0, '')
+        self.allocations.append(Allocation(kv, date, summ, debt, months))
+        return True
+
+    def _allocate_debt(self, ledger_row: LedgerRow, payment_row: PaymentRow, summ) -> tuple:
+        """
+        Гасит долг за прошлый год, остаток распределяет по месяцам.
+
+        Returns:
+            tuple: (погашено долга, оплаченный период).
+        """
+        summ_difference = ledger_row.debt - ledger_row.debt_paid
+        if summ_difference > 0:
+            defrayal = summ if summ <= summ_difference else summ_difference
+            ledger_row.debt_paid += defrayal
+            summ -= defrayal
+            self._set(LEDGER_SHEET, ledger_row.row, self.state.columns.debt_paid, ledger_row.debt_paid)
+            if summ > 0:
+                return defrayal, self._allocate_months(ledger_row, payment_row, summ)
+            return defrayal, ''
+        return 0, self._allocate_months(ledger_row, payment_row, summ)
+
+    def _allocate_months(self, ledger_row: LedgerRow, payment_row: PaymentRow, summ) -> str:
+        """
+        Разбивает сумму по месяцам и записывает оплаченный период.
+
+        Returns:
+            str: Период, оплаченный этой суммой ('' — все месяцы уже оплачены).
+        """
+        fee = ledger_row.fee
+        months = ledger_row.months
+        names = self.state.month_names
+        month_start = ''
+        month_end = ''
+
+        overflow = LEDGER_MONTHS - 1  # последний столбец принимает любую сумму, даже если в нём уже взнос
+        for index in range(LEDGER_MONTHS):
+            if summ <= 0:
+                break
+            if index < overflow and months[index] == fee:
+                continue
+
+            month_start = names[index]
+            summ_month = summ + months[index]
+            overflow_included = True  # текущая сумма столбца уже учтена в summ_month
+            while summ_month > 0:
+                if index < overflow:
+                    value = fee if summ_month >= fee else summ_month
+                    summ_month -= value
+                else:
+                    value = summ_month if overflow_included else summ_month + months[index]
+                    summ_month = 0
+                months[index] = value
+                self._set(LEDGER_SHEET, ledger_row.row, self.state.columns.first_month + index, value)
+                month_end = names[index]
+                overflow_included = False
+                index += 1
+            break
+
+        if month_start == '':
+            return ''
+
+        covered = month_start if month_start == month_end else f'{month_start} - {month_end}'
+        period = payment_row.period if payment_row.period is not None else 0
+        if period == 0:
+            period = covered
+        else:
+            period = f'{period} - {month_end}'
+        payment_row.period = period
+        self._set(PAYMENT_SHEET, payment_row.row, PAYMENT_PERIOD_COLUMN, period)
+        return covered
+
@@ -0,0 +1,222 @@
+"""
+Форматы файлов банка.
+
+Одна и та же выписка может быть выгружена в xlsx, CSV или текст с разделителями
+(";" или табуляция). Все форматы имеют одинаковую раскладку столбцов:
+строка 1 — заголовок, строка 2 — итоговая сумма (столбец 4), далее платежи
+(столбец 2 — назначение с полями через ";", столбец 4 — сумма, столбец 5 — дата и время).
+
+Формат определяется по сигнатуре файла (xlsx — zip-архив) или по строке заголовка
+(разделитель текстового файла), каждый формат читается потоково и отдаёт
+платежи `bank_xlsx.Payment`, которые использует `statement.Assistant.bank_reading`.
+
+Новый формат добавляется наследником `BankFormat`, зарегистрированным через `register`.
+"""
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import bank_xlsx
+
+logger = logging.getLogger(__name__)
+
+HEAD_BYTES = 4096  # сколько байт читать для определения формата
+ZIP_MAGIC = b'PK\x03\x04'
+OLE_MAGIC = b'\xd0\xcf\x11\xe0'  # старый формат Excel (xls)
+TEXT_ENCODINGS = ('utf-8-sig', 'cp1251')
+DELIMITERS = (';', '\t', ',')
+
+_registry = []
+
+
+def register(bank_format: "BankFormat") -> "BankFormat":
+    """Регистрирует формат (порядок регистрации — порядок проверки при определении)."""
+    _registry.append(bank_format)
+    return bank_format
+
+
+def formats() -> list:
+    """Зарегистрированные форматы."""
+    return list(_registry)
+
+
+class UnknownFormat(ValueError):
+    """Формат файла банка не распознан"""
+
+
+class BankFormat:
+    """Формат файла банка"""
+
+    name = ''
+
+    def sniff(self, head: bytes, path: str) -> bool:
+        """
+        Подходит ли файл под формат.
+
+        Args:
+            head (bytes): Первые байты файла.
+            path (str): Путь к файлу.
+        """
+        raise NotImplementedError
+
+    def statement(self, path: str, name_bank=None):
+        """
+        Потоковое чтение файла: итерация отдаёт `bank_xlsx.Payment`,
+        после итерации заполнены `total` и `warnings`.
+        """
+        raise NotImplementedError
+
+
+class XlsxFormat(BankFormat):
+    """Выгрузка в Excel (xlsx)"""
+
+    name = 'xlsx'
+
+    def sniff(self, head: bytes, path: str) -> bool:
+        return head.startswith(ZIP_MAGIC)
+
+    def statement(self, path: str, name_bank=None):
+        return bank_xlsx.BankStatement(path, name_bank)
+
+
+def _decode(head: bytes):
+    """Кодировка текстового файла по первым байтам (или None, если это не текст)."""
+    if b'\x00' in head:
+        return None
+    for encoding in TEXT_ENCODINGS:
+        try:
+            head.decode(encoding)
+        except UnicodeDecodeError as exc:
+            if exc.start < len(head) - 4:  # ошибка не из-за обрезанного последнего символа
+                continue
+        return encoding
+    return None
+
+
+def _number(value: str):
+    """'1 000,50' -> 1000.5, '2000' -> 2000; пустое значение -> None."""
+    value = value.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    if not value:
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() and '.' not in value else number
+
+
+class DelimitedStatement:
+    """Потоковое чтение текстовой выписки (та же раскладка столбцов, что в xlsx)"""
+
+    def __init__(self, path: str, encoding: str, delimiter: str, name_bank=None):
+        self.path = path
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.name_bank = name_bank if name_bank is not None else os.path.basename(path)
+        self.total = None
+        self.rows = 0
+        self.warnings = []
+
+    @staticmethod
+    def _rows(reader):
+        """Значения столбцов 2-5 (как iter_rows(min_col=2, max_col=5, values_only=True)) до первой пустой строки."""
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                return
+            row = (row + [''] * 5)[:5]
+            yield tuple(cell or None for cell in row[1:])
+
+    def __iter__(self):
+        with open(self.path, encoding=self.encoding, newline='') as file:
+            reader = csv.reader(file, delimiter=self.delimiter)
+            next(reader, None)  # заголовок
+            total_row = next(reader, None)
+            if total_row is not None and len(total_row) > 3:
+                try:
+                    self.total = _number(total_row[3])
+                except ValueError:
+                    self.total = None
+            for payment in bank_xlsx.iter_payments(self._rows(reader), self.name_bank, warnings=self.warnings):
+                try:
+                    summ = _number(payment.summ or '')
+                except ValueError:
+                    self.warnings.append(f'ОШИБКА сумма "{payment.summ}" в файле "{self.name_bank}" указана не верно, '
+                                         f'координаты ошибки (строка {payment.row} столбец 4)')
+                    print(f'\n{self.warnings[-1]}\n')
+                    continue
+                self.rows += 1
+                yield payment._replace(summ=summ)
+
+
+class DelimitedFormat(BankFormat):
+    """Выгрузка в CSV или текст с разделителями ";", табуляция, ","."""
+
+    name = 'csv'
+
+    def sniff(self, head: bytes, path: str) -> bool:
+        return _decode(head) is not None and self._delimiter(head, _decode(head)) is not None
+
+    @staticmethod
+    def _delimiter(head: bytes, encoding: str):
+        """Разделитель столбцов — самый частый из DELIMITERS в строке заголовка."""
+        header = head.decode(encoding, errors='ignore').splitlines()[0] if head.strip() else ''
+        counts = {delimiter: header.count(delimiter) for delimiter in DELIMITERS}
+        delimiter = max(counts, key=counts.get)
+        return delimiter if counts[delimiter] >= 3 else None  # в выписке не меньше 5 столбцов
+
+    def statement(self, path: str, name_bank=None):
+        with open(path, 'rb') as file:
+            head = file.read(HEAD_BYTES)
+        encoding = _decode(head)
+        return DelimitedStatement(path, encoding, self._delimiter(head, encoding), name_bank)
+
+
+register(XlsxFormat())
+register(DelimitedFormat())
+
+
+def detect(path: str) -> BankFormat:
+    """
+    Определяет формат файла банка по сигнатуре и заголовку.
+
+    Raises:
+        UnknownFormat: Если формат не распознан.
+    """
+    with open(path, 'rb') as file:
+        head = file.read(HEAD_BYTES)
+    for bank_format in _registry:
+        if bank_format.sniff(head, path):
+            return bank_format
+    if head.startswith(OLE_MAGIC):
+        raise UnknownFormat(f'Файл "{os.path.basename(path)}" в старом формате xls, сохраните его как xlsx или csv')
+    raise UnknownFormat(f'Формат файла банка "{os.path.basename(path)}" не распознан')
+
+
+def read_statement(path_bank: str, name_bank=None):
+    """
+    Читает файл банка любого зарегистрированного формата.
+
+    Returns:
+        tuple: (итоговая сумма, список Payment, сообщения об ошибках в строках).
+    """
+    bank_format = detect(path_bank)
+    logger.debug(f'Файл банка {os.path.basename(path_bank)}: формат {bank_format.name}')
+    statement = bank_format.statement(path_bank, name_bank)
+    records = list(statement)
+    return statement.total, records, statement.warnings
+
+
+def read_statements(paths_bank, workers=None) -> list:
+    """
+    Читает несколько файлов банка, при нескольких файлах — параллельно в отдельных процессах.
+
+    Args:
+        paths_bank: Пути к файлам банка.
+        workers (int | None): Количество процессов (1 — читать последовательно).
+
+    Returns:
+        list: Результаты `read_statement` в порядке paths_bank.
+    """
+    paths_bank = list(paths_bank)
+    if len(paths_bank) < 2 or workers == 1:
+        return [read_statement(path) for path in paths_bank]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_statement, paths_bank))
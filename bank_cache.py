@@ -0,0 +1,256 @@
+"""
+Кэш разобранных файлов банка (SQLite в каталоге кэша пользователя).
+
+Ключ — версия разбора (`bank_xlsx.PARSER_VERSION`) и SHA-256 содержимого файла,
+поэтому повторный запуск с тем же файлом не открывает его через openpyxl.
+Хранятся итоговая сумма, платежи `bank_xlsx.Payment` и сообщения об ошибках в строках
+(при попадании в кэш они выводятся повторно). При превышении размера удаляются
+давно не использованные записи.
+
+Каталог кэша можно задать переменной окружения `OSI_CACHE_DIR`.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+import bank_xlsx
+from bank import formats
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'bank_cache.sqlite3'
+MAX_BYTES = 50 * 1024 * 1024  # размер кэша по умолчанию
+BACKGROUND_MIN_BYTES = 256 * 1024  # файлы банка меньше этого размера быстрее разобрать в основном процессе
+
+
+def cache_dir() -> str:
+    """Каталог кэша пользователя: OSI_CACHE_DIR, %LOCALAPPDATA%\\OSI или ~/.cache/osi."""
+    if os.environ.get('OSI_CACHE_DIR'):
+        return os.environ['OSI_CACHE_DIR']
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'OSI', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'osi')
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BankCache:
+    """Кэш разобранных файлов банка"""
+
+    def __init__(self, path=None, max_bytes=MAX_BYTES):
+        """
+        Args:
+            path (str | None): Файл базы SQLite (по умолчанию в `cache_dir()`).
+            max_bytes (int): Максимальный размер хранимых данных.
+        """
+        if path is None:
+            os.makedirs(cache_dir(), exist_ok=True)
+            path = os.path.join(cache_dir(), CACHE_FILE)
+        self.path = path
+        self.max_bytes = max_bytes
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS statements ('
+                'key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, '
+                'created REAL NOT NULL, last_used REAL NOT NULL)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Соединение с базой: транзакция фиксируется и соединение закрывается на выходе."""
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def key(content_hash: str) -> str:
+        return f'{bank_xlsx.PARSER_VERSION}:{content_hash}'
+
+    def get(self, content_hash: str):
+        """
+        Возвращает разобранный файл из кэша.
+
+        Returns:
+            tuple | None: (итоговая сумма, список Payment, сообщения) или None.
+        """
+        key = self.key(content_hash)
+        with self._connect() as connection:
+            row = connection.execute('SELECT data FROM statements WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE statements SET last_used = ? WHERE key = ?', (time(), key))
+        data = json.loads(zlib.decompress(row[0]))
+        records = [bank_xlsx.Payment(*record) for record in data['payments']]
+        return data['total'], records, data['warnings']
+
+    def put(self, content_hash: str, total, records: list, warnings: list) -> None:
+        """Сохраняет разобранный файл и удаляет старые записи сверх `max_bytes`."""
+        data = zlib.compress(json.dumps(
+            {'total': total, 'payments': [list(record) for record in records], 'warnings': warnings},
+            ensure_ascii=False).encode('utf-8'))
+        now = time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO statements (key, data, size, created, last_used) VALUES (?, ?, ?, ?, ?)',
+                (self.key(content_hash), data, len(data), now, now))
+            self._evict(connection)
+
+    def _evict(self, connection) -> None:
+        used = connection.execute('SELECT COALESCE(SUM(size), 0) FROM statements').fetchone()[0]
+        if used <= self.max_bytes:
+            return
+        for key, size in connection.execute('SELECT key, size FROM statements ORDER BY last_used').fetchall():
+            connection.execute('DELETE FROM statements WHERE key = ?', (key,))
+            used -= size
+            if used <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM statements')
+
+
+def open_cache(path=None):
+    """
+    Открывает кэш; при ошибке (нет доступа к каталогу, повреждённая база) работаем без кэша.
+
+    Returns:
+        BankCache | None: Кэш или None.
+    """
+    try:
+        return BankCache(path)
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning(f'Кэш файлов банка недоступен: {exc}')
+        return None
+
+
+def usable_cpus() -> int:
+    """Количество ядер, доступных процессу."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _print_warnings(warnings: list) -> None:
+    for warning in warnings:
+        print(f'\n{warning}\n')
+
+
+def _read_quietly(path_bank: str):
+    """`formats.read_statement` в фоновом процессе: сообщения об ошибках выводит основной процесс."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return formats.read_statement(path_bank)
+
+
+class StatementReader:
+    """
+    Чтение файлов банка с использованием кэша.
+
+    Файлы, которых нет в кэше, при `background=True` сразу отдаются на разбор в отдельные
+    процессы, а основной процесс в это время может загружать ведомость; `result()` дожидается
+    разобранных платежей (компактные `bank_xlsx.Payment`, а не объекты openpyxl).
+    Используется как контекстный менеджер: на выходе незавершённый разбор отменяется.
+    """
+
+    def __init__(self, paths_bank, workers=None, cache=None, background=True):
+        """
+        Args:
+            paths_bank: Пути к файлам банка.
+            workers (int | None): Количество процессов для разбора (1 — один процесс).
+            cache (BankCache | None): Кэш (None — без кэша).
+            background (bool): Разбирать файлы в фоновых процессах, не дожидаясь `result()`
+                (если ядер больше одного и файлы не меньше `BACKGROUND_MIN_BYTES`).
+        """
+        self.paths_bank = list(paths_bank)
+        self.workers = workers
+        self.cache = cache
+        self.hashes = [file_hash(path) for path in self.paths_bank]  # SHA-256 файлов (кэш, журнал платежей)
+        self.results = [None] * len(self.paths_bank)
+        self.missing = []  # номера файлов, которых нет в кэше
+        self._executor = None
+        self._futures = None
+
+        for number, content_hash in enumerate(self.hashes):
+            cached = self._cached(content_hash)
+            if cached is None:
+                self.missing.append(number)
+                continue
+            logger.debug(f'Файл банка {os.path.basename(self.paths_bank[number])} взят из кэша')
+            self.results[number] = cached
+
+        # на одном ядре или с маленькими файлами отдельные процессы только замедляют работу
+        if background and self.missing and usable_cpus() > 1 and \
+                max(os.path.getsize(self.paths_bank[number]) for number in self.missing) >= BACKGROUND_MIN_BYTES:
+            max_workers = min(len(self.missing), workers or usable_cpus())
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+            self._futures = [self._executor.submit(_read_quietly, self.paths_bank[number])
+                             for number in self.missing]
+
+    def _cached(self, content_hash: str):
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(content_hash)
+        except sqlite3.Error as exc:
+            logger.warning(f'Ошибка чтения кэша файлов банка: {exc}')
+            return None
+
+    def result(self) -> list:
+        """
+        Дожидается разбора файлов.
+
+        Returns:
+            list: Результаты `bank.formats.read_statement` в порядке paths_bank.
+        """
+        for statement in self.results:
+            if statement is not None:  # из кэша: сообщения выводим повторно
+                _print_warnings(statement[2])
+        if self._futures is not None:
+            parsed = [future.result() for future in self._futures]
+            self.close()
+            for statement in parsed:  # фоновые процессы ничего не выводят
+                _print_warnings(statement[2])
+        else:
+            parsed = formats.read_statements([self.paths_bank[number] for number in self.missing], self.workers)
+
+        for number, statement in zip(self.missing, parsed):
+            self.results[number] = statement
+            if self.cache is None:
+                continue
+            try:
+                self.cache.put(self.hashes[number], *statement)
+            except sqlite3.Error as exc:
+                logger.warning(f'Ошибка записи в кэш файлов банка: {exc}')
+        self.missing = []
+        return self.results
+
+    def close(self) -> None:
+        """Останавливает фоновые процессы (незавершённый разбор отменяется)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
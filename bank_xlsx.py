@@ -1,102 +1,154 @@
 import openpyxl as op
 import re
+from typing import NamedTuple
 
+PARSER_VERSION = 3  # версия разбора файла банка (ключ кэша bank_cache)
+KV_FIELD = 5  # номер поля с квартирой в столбце 2 (поля через ";")
+NON_DIGITS = re.compile(r'\D')
 
-def payments(bank_sheet, name_bank='None'):
-    """
-    :param bank_sheet:
-    :param name_bank:
-    :return:
-    """
-    name_fil = name_bank
-    # wb = op.load_workbook(a, data_only=True)
-    sheet = bank_sheet
 
-    max_row = sheet.max_row
+class Payment(NamedTuple):
+    """Платёж из файла банка"""
+    row: int  # номер строки в файле банка
+    kv: str  # номер квартиры
+    summ: float  # сумма платежа
+    date: str  # дата платежа в формате ГГГГ.ММ.ДД
+    time: str = ''  # дата и время платежа как в файле банка
 
-    # print(f'max_row {max_row}')
 
-    kv_su = {}
-    kv_repeat = {}
-    for s in range(3, max_row + 1):
+class ApartmentPayment(NamedTuple):
+    """Сумма платежей квартиры за одну дату"""
+    kv: int  # номер квартиры
+    sequence: int  # 1 — первая дата квартиры в файле, 2, 3, ... — следующие даты
+    summ: float  # сумма платежей за дату
+    date: str  # дата платежа в формате ГГГГ.ММ.ДД
+
+    @property
+    def key(self) -> str:
+        """Ключ словаря group_payments: 'кв' для первой даты, 'кв-2', 'кв-3', ... для следующих"""
+        return str(self.kv) if self.sequence == 1 else f'{self.kv}-{self.sequence}'
+
+
+def iter_payments(rows, name_bank='None', first_row=3, warnings=None):
+    """
+    Генератор платежей по строкам файла банка
+    :param rows: значения столбцов 2-5 каждой строки (iter_rows(values_only=True))
+    :param name_bank: имя файла банка для сообщений об ошибках
+    :param first_row: номер строки, с которой начинаются rows
+    :param warnings: список, в который добавляются сообщения об ошибках в строках
+    :return: генератор Payment
+    """
+    name_fil = name_bank
+    warnings = warnings if warnings is not None else []
+    for s, values in enumerate(rows, start=first_row):
 
         try:
-            st_col2 = (sheet.cell(row=s, column=2).value).split(';')
-            st_col4 = sheet.cell(row=s, column=4).value
-            st_col5 = sheet.cell(row=s, column=5).value
+            st_col2 = values[0].split(';', KV_FIELD + 1)
+            st_col4 = values[2]
+            st_col5 = values[3]
 
         except AttributeError:
-            print('Файл от банка выбран не верно')
+            warnings.append('Файл от банка выбран не верно')
+            print(warnings[-1])
             break
 
-        kv_chek = ''.join(re.findall(r'\d', st_col2[5]))
-
-        if len(kv_chek) <= 3:
-            if kv_chek[0] == '0':
-
-                kv = kv_chek[1]
+        kv_chek = NON_DIGITS.sub('', st_col2[KV_FIELD])
 
-            else:
-                kv = kv_chek
+        if not kv_chek:
+            kv = kv_chek
+            warnings.append(f'ОШИБКА номер квартиры в файле "{name_fil}" не указан, координаты '
+                            f'ошибки (строка {s} столбец 2)')
+            print(f'\n{warnings[-1]}\n')
+        elif len(kv_chek) <= 3:
+            kv = str(int(kv_chek))  # '05' -> '5', '012' -> '12'
         else:
             kv = kv_chek
-            print(f'\nОШИБКА № {kv_chek} кв  в файле "{name_fil}" указано не верно, координаты '
-                  f'ошибки (строка {s} столбец 2)\n')
-
-        su = st_col4
-        date = (st_col5.split(' ')[0]).replace('-', '.')
-        n = 2
-
-        def check_date(kv):
-            nonlocal su
-            nonlocal n
-            if kv in kv_su.keys():
+            warnings.append(f'ОШИБКА № {kv_chek} кв  в файле "{name_fil}" указано не верно, координаты '
+                            f'ошибки (строка {s} столбец 2)')
+            print(f'\n{warnings[-1]}\n')
 
-                if kv not in kv_repeat.keys() and len(kv) <= 2:
+        date = st_col5.split(' ', 1)[0].replace('-', '.')
+        yield Payment(s, kv, st_col4, date, st_col5)
 
-                    kv_repeat[kv] = 2
 
-                elif kv in kv_repeat.keys():
-
-                    values = kv_repeat[kv]
-                    kv_repeat[kv] = values + 1
-
-                if kv_su[kv][1] != date:
-
-                    kv_n = kv
-
-                    while kv_n in kv_su.keys():
-                        if len(kv_n)<=2:
-
-                            kv_n = f'{kv}-{n}'
-                        else:
-                            kv_n = kv_n.split('-')
-                            kv_n[-1] = str(n)
-                            kv_n = '-'.join(kv_n)
-                        n += 1
-                        kv = kv_n
-                        return check_date(kv)
+class BankStatement:
+    """
+    Потоковое чтение файла банка (read-only, только столбцы 2-5).
+    При обходе отдаёт платежи Payment и запоминает итоговую сумму (ячейка D2).
+    """
 
+    def __init__(self, path_bank, name_bank=None):
+        """
+        :param path_bank: путь к файлу банка
+        :param name_bank: имя файла банка для сообщений об ошибках
+        """
+        self.path_bank = path_bank
+        self.name_bank = name_bank if name_bank is not None else path_bank.split('/')[-1]
+        self.total = None  # итоговая сумма из файла банка
+        self.rows = 0  # прочитано строк с платежами
+        self.warnings = []  # сообщения об ошибках в строках
+
+    def __iter__(self):
+        wb = op.load_workbook(self.path_bank, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(min_row=2, min_col=2, max_col=5, values_only=True)
+            total_row = next(rows, None)
+            self.total = total_row[2] if total_row is not None else None
+            for payment in iter_payments(rows, self.name_bank, warnings=self.warnings):
+                self.rows += 1
+                yield payment
+        finally:
+            wb.close()
 
-                else:
-                    sum_kv = kv_su[kv][0]
-                    # date = f'{kv_su[kv][1]}/{date}'
-                    su = su + sum_kv
 
-                kv_su[kv] = (su, date)
+def group_records(records, repeats=None) -> list:
+    """
+    Группирует платежи по квартирам и датам (один проход, без рекурсии)
+    Платежи квартиры за одну дату складываются; каждая следующая дата квартиры
+    получает следующий порядковый номер.
+    :param records: платежи Payment
+    :param repeats: словарь, в который записывается {квартира: количество платежей} для повторяющихся квартир
+    :return: список ApartmentPayment в порядке первого появления (квартира, дата)
+    """
+    repeats = repeats if repeats is not None else {}
+    grouped = []
+    slots = {}  # {квартира: {дата: номер в grouped}}
+    counts = {}  # {квартира: количество платежей}
+    for record in records:
+        kv = record.kv
+        if not kv.isdigit() or (len(kv) > 1 and kv[0] == '0'):
+            continue  # номер квартиры не распознан (сообщение выведено при чтении)
+        count = counts.get(kv, 0) + 1
+        counts[kv] = count
+        if count > 1:
+            repeats[kv] = count
+
+        dates = slots.get(kv)
+        if dates is None:
+            dates = slots[kv] = {}
+        number = dates.get(record.date)
+        if number is None:
+            dates[record.date] = len(grouped)
+            grouped.append(ApartmentPayment(int(kv), len(dates), record.summ, record.date))
+        else:
+            payment = grouped[number]
+            grouped[number] = payment._replace(summ=record.summ + payment.summ)
+    return grouped
 
-            else:
-                kv_su[kv] = (su, date)
 
-        check_date(kv)
+def group_payments(records):
+    """
+    Собирает платежи в словарь квартир с суммой и датой оплаты
+    :param records: платежи Payment
+    :return: словарь {квартира: (сумма, дата)}, платежи за другие даты — под ключами 'кв-2', 'кв-3', ...
+    """
+    kv_repeat = {}
+    kv_su = {payment.key: (payment.summ, payment.date) for payment in group_records(records, kv_repeat)}
 
-    # pp.pprint((kv_su,'len = ',len(kv_su)))
     if kv_repeat != {}:
         print(f'Квартиры которые встречаются в файле более одного раза: \n{kv_repeat}\n')
     else:
         print('Повторяющийся квартир нет \n')
-        pass
-    # print('\n',kv_su)
     return kv_su
 
 
@@ -107,7 +159,7 @@ if __name__ == '__main__':
     c = 'D:/PyCharm/Project/OSI/fail/4Платежи апрель банк версия.xlsx'
     b = 'D:/PyCharm/Project/osi_doc/2/Платежи (80).xlsx'
     p = 'C:/Users/бук/Desktop/fail1/4Платежи апрель банк версия.xlsx.xlsx'
-    wb = op.load_workbook(bb, data_only=True)
-    bank_sheet = wb.active
-    t = payments(bank_sheet)
+    from bank import formats
+
+    t = group_payments(formats.read_statement(bb)[1])
     print(t, 'len-', len(t))
@@ -0,0 +1,139 @@
+"""
+Замеры производительности обработки на синтетических данных.
+
+Для каждого размера (квартир x платежей) генерируются ведомость и выгрузка банка
+(`synthetic`), затем замеряются этапы `statement.Assistant` (отчёт `instrumentation.RunReport`)
+и весь запуск целиком.
+Результаты сохраняются в JSON для сравнения версий.
+
+Пример:
+    python benchmark.py --sizes 60x200,300x2000,300x10000 --repeat 3 --output benchmark.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+from datetime import datetime
+
+import openpyxl
+
+import statement
+import synthetic
+
+DEFAULT_SIZES = '60x200,300x2000,300x10000'
+
+
+def run_once(path_ved: str, path_bank: str, kv_quantity: int, trace_memory=False) -> dict:
+    """
+    Один полный запуск с замерами этапов (`statement.Assistant.report`).
+
+    Returns:
+        dict: Отчёт `instrumentation.RunReport.to_dict()`.
+    """
+    assistant = statement.Assistant(path_ved, path_bank, kv_quantity, trace_memory=trace_memory, use_cache=False,
+                                    use_ledger=False)
+    assistant.launch()
+    return assistant.report.to_dict()
+
+
+def run_size(kv_quantity: int, payments: int, repeat: int, workdir: str, trace_memory=False) -> dict:
+    """
+    Замеры для одного размера данных (лучшее и медианное время из `repeat` запусков).
+
+    Returns:
+        dict: Параметры размера, время этапов и время полного запуска.
+    """
+    template_ved = os.path.join(workdir, f'ved_{kv_quantity}.xlsx')
+    path_bank = os.path.join(workdir, f'bank_{kv_quantity}_{payments}.xlsx')
+    path_ved = os.path.join(workdir, 'ved_run.xlsx')
+    synthetic.ved_workbook(template_ved, kv_quantity)
+    synthetic.bank_workbook(path_bank, kv_quantity, payments)
+
+    runs = []
+    for _ in range(repeat):
+        shutil.copyfile(template_ved, path_ved)
+        runs.append(run_once(path_ved, path_bank, kv_quantity, trace_memory))
+
+    stages = {}
+    for stage in runs[0]['stages']:
+        seconds = [run['stages'][stage]['seconds'] for run in runs]
+        stages[stage] = {'best': min(seconds), 'median': statistics.median(seconds)}
+        if trace_memory:
+            stages[stage]['peak_bytes'] = max(run['stages'][stage]['peak_bytes'] for run in runs)
+    total_runs = [run['total_seconds'] for run in runs]
+    return {
+        'apartments': kv_quantity,
+        'payments': payments,
+        'ved_bytes': os.path.getsize(template_ved),
+        'bank_bytes': os.path.getsize(path_bank),
+        'counters': runs[0]['counters'],
+        'stages': stages,
+        'total': {'best': min(total_runs), 'median': statistics.median(total_runs)},
+    }
+
+
+def parse_sizes(sizes: str) -> list:
+    """'60x200,300x2000' -> [(60, 200), (300, 2000)]"""
+    result = []
+    for size in sizes.split(','):
+        kv_quantity, payments = size.lower().split('x')
+        result.append((int(kv_quantity), int(payments)))
+    return result
+
+
+def run(sizes: list, repeat=3, label=None, trace_memory=False) -> dict:
+    """
+    Запускает все замеры.
+
+    Args:
+        sizes (list): Пары (квартир, платежей).
+        repeat (int): Количество повторов для каждого размера.
+        label (str | None): Метка запуска (например, версия).
+        trace_memory (bool): Замерять пиковую память этапов (замедляет работу).
+
+    Returns:
+        dict: Результаты для сохранения в JSON.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        for kv_quantity, payments in sizes:
+            results.append(run_size(kv_quantity, payments, repeat, workdir, trace_memory))
+    return {
+        'label': label,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'openpyxl': openpyxl.__version__,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Замеры производительности помощника ОСИ')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='размеры: квартирxплатежей через запятую')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов для каждого размера')
+    parser.add_argument('--label', default=None, help='метка запуска (версия, ветка)')
+    parser.add_argument('--trace-memory', action='store_true', help='замерять пиковую память этапов')
+    parser.add_argument('--output', default='benchmark.json', help='файл для результатов JSON')
+    args = parser.parse_args(argv)
+
+    report = run(parse_sizes(args.sizes), args.repeat, args.label, args.trace_memory)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    for result in report['results']:
+        stages = ', '.join(f'{stage} {timing["best"]:.3f}' for stage, timing in result['stages'].items())
+        print(f'{result["apartments"]} кв x {result["payments"]} платежей: '
+              f'всего {result["total"]["best"]:.3f} сек. ({stages})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
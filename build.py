@@ -1,16 +1,135 @@
+"""
+Сборка exe (PyInstaller) с замером запуска.
+
+Профили:
+- onefile — один exe, при каждом запуске распаковывается во временную папку (медленный старт);
+- onedir — папка с exe и библиотеками, запускается без распаковки (быстрый старт).
+
+Перед сборкой выводится время импорта модулей окна (`python -X importtime`), после сборки —
+время от запуска exe до появления окна (`main.py --startup-check`), чтобы замедление запуска было видно сразу.
+
+    python build.py                   # onefile, как раньше
+    python build.py --profile onedir
+    python build.py --report-only     # только замеры, без сборки
+"""
+import argparse
+import json
+import os
 import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
 import main
 
-# 1. Сначала генерируем version.txt
-subprocess.run(["python", "creating_fail_version.py"], check=True)
-
-# 2. Затем вызываем pyinstaller
-subprocess.run([
-    "pyinstaller",
-    "--onefile",
-    "--noconsole",
-    "--version-file=version.txt",                                   # указать путь к фалу
-    "--icon=лого.ico",                                              # указать иконку
-    f"--name=Помощник ОСИ v{main.version}",
-    "main.py"
-], check=True)
+PROFILES = ('onefile', 'onedir')
+IMPORT_REPORT_TOP = 10  # модулей с наибольшим временем импорта в отчёте
+STARTUP_BUDGET = 1.0  # сек. до появления окна
+STARTUP_TIMEOUT = 60
+DEFERRED_MODULES = ('openpyxl', 'statement')  # не должны загружаться при открытии окна
+
+
+def import_report(module='main') -> dict:
+    """
+    Время импорта модуля в отдельном интерпретаторе (`-X importtime`).
+
+    Returns:
+        dict: Общее время (сек.), модули с наибольшим собственным временем, загруженные отложенные модули.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, check=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    total = next((cumulative for name, _, cumulative in modules if name == module), 0)
+    slowest = sorted(modules, key=lambda item: item[1], reverse=True)[:IMPORT_REPORT_TOP]
+    return {
+        'seconds': total / 1e6,
+        'slowest': [(name, self_us / 1e6) for name, self_us, _ in slowest],
+        'deferred_loaded': sorted({name.split('.')[0] for name, _, _ in modules} & set(DEFERRED_MODULES)),
+    }
+
+
+def startup_time(command: list):
+    """
+    Время запуска до появления окна (`--startup-check`).
+
+    Returns:
+        dict | None: Замер окна и полное время процесса (сек.) или None, если окно не открылось (нет дисплея).
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'startup.json')
+        start = perf_counter()
+        try:
+            subprocess.run(command + [main.STARTUP_CHECK_ARG, path], check=True, timeout=STARTUP_TIMEOUT,
+                           capture_output=True)
+        except (OSError, subprocess.SubprocessError) as exc:
+            print(f'Не удалось замерить запуск {command[-1]}: {exc}')
+            return None
+        wall = perf_counter() - start
+        with open(path, encoding='utf-8') as file:
+            report = json.load(file)
+    report['process_seconds'] = round(wall, 3)
+    return report
+
+
+def print_startup(title: str, report) -> None:
+    if report is None:
+        return
+    print(f'{title}: окно через {report["process_seconds"]:.3f} сек. от запуска процесса '
+          f'({report["window_seconds"]:.3f} сек. после импорта main), модулей: {report["modules"]}, '
+          f'openpyxl загружен: {"да" if report["openpyxl_loaded"] else "нет"}')
+    if report['process_seconds'] > STARTUP_BUDGET or report['openpyxl_loaded']:
+        print(f'ВНИМАНИЕ: запуск медленнее {STARTUP_BUDGET} сек. или модули обработки загружаются при открытии окна')
+
+
+def executable_path(name: str, profile: str) -> str:
+    """Путь к собранному exe в папке dist."""
+    executable = f'{name}.exe' if sys.platform == 'win32' else name
+    if profile == 'onedir':
+        return os.path.join('dist', name, executable)
+    return os.path.join('dist', executable)
+
+
+def main_build(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Сборка Помощника ОСИ (PyInstaller) с замером запуска')
+    parser.add_argument('--profile', choices=PROFILES, default='onefile',
+                        help='onefile — один exe, onedir — папка с exe (быстрый запуск без распаковки)')
+    parser.add_argument('--report-only', action='store_true', help='только замеры импорта и запуска, без сборки')
+    args = parser.parse_args(argv)
+
+    imports = import_report()
+    print(f'Импорт main: {imports["seconds"]:.3f} сек. Самые медленные модули:')
+    for name, seconds in imports['slowest']:
+        print(f'    {name}: {seconds * 1000:.1f} мс')
+    if imports['deferred_loaded']:
+        print(f'ВНИМАНИЕ: при открытии окна загружаются {", ".join(imports["deferred_loaded"])}')
+    print_startup('Запуск из исходников', startup_time([sys.executable, 'main.py']))
+    if args.report_only:
+        return
+
+    # 1. Сначала генерируем version.txt
+    subprocess.run([sys.executable, "creating_fail_version.py"], check=True)
+
+    # 2. Затем вызываем pyinstaller
+    name = f"Помощник ОСИ v{main.VERSION}"
+    subprocess.run([
+        "pyinstaller",
+        f"--{args.profile}",
+        "--noconfirm",
+        "--noconsole",
+        "--version-file=version.txt",                                   # указать путь к фалу
+        "--icon=лого.ico",                                              # указать иконку
+        f"--name={name}",
+        "main.py"
+    ], check=True)
+
+    # 3. Замер запуска собранного exe
+    print_startup(f'Запуск exe ({args.profile})', startup_time([executable_path(name, args.profile)]))
+
+
+if __name__ == '__main__':
+    main_build()
@@ -0,0 +1,306 @@
+"""
+Консольный запуск помощника ОСИ (без графического интерфейса).
+
+Импортирует только модули обработки (tkinter не нужен), поэтому подходит
+для планировщиков и скриптов на сервере без дисплея.
+
+Примеры:
+    python cli.py process --ved ved.xlsx --bank bank.xlsx --kv 60
+    python cli.py process --ved ved.xlsx --bank 07.xlsx --bank 08.xlsx --kv 60 --json
+    python cli.py process --ved ved.xlsx --bank bank.xlsx --kv 60 --dry-run
+    python cli.py jobs manifest.csv --workers 4 --json
+    python cli.py watch inbox --routes routes.csv --ved-dir veds --workers 2
+    python cli.py serve --port 8765 --workers 4
+    python cli.py history --ved ved.xlsx --apartment 17 --since 2025.01.01
+    python cli.py history --ved ved.xlsx --debtors --json
+    python cli.py cache-clear
+
+Коды возврата:
+    0 — ведомость сохранена (с --dry-run — изменения рассчитаны);
+    1 — ошибка обработки или сохранения;
+    2 — неверные аргументы;
+    3 — ведомость сохранена, но суммы не сошлись (только с --strict).
+"""
+import argparse
+import contextlib
+import json
+import logging
+import sys
+from time import monotonic
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_MISMATCH = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _print_json(data) -> None:
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write('\n')
+
+
+def cmd_process(args) -> int:
+    """Обработка одной ведомости."""
+    import statement
+
+    # print() модулей обработки не должен смешиваться с JSON и просмотром изменений в stdout
+    output = contextlib.redirect_stdout(sys.stderr) if args.json or args.dry_run else contextlib.nullcontext()
+    try:
+        with output:
+            options = dict(trace_memory=args.trace_memory, report_json=args.report, use_cache=not args.no_cache,
+                           use_ledger=not args.no_ledger, writer=args.writer, check_files=not args.no_preflight)
+            if len(args.bank) > 1:
+                assistant = statement.BatchAssistant(args.ved, args.bank, args.kv, args.workers, **options)
+            else:
+                assistant = statement.Assistant(args.ved, args.bank[0], args.kv, **options)
+            if args.dry_run:
+                changes = assistant.preview()
+            else:
+                saved = assistant.launch()
+    except statement.PreflightError as exc:
+        for problem in exc.problems:
+            logger.error(problem)
+        if args.json:
+            _print_json({'ok': False, 'error': str(exc), 'problems': exc.problems})
+        return EXIT_ERROR
+    except Exception as exc:
+        logger.exception('Ошибка при обработке')
+        if args.json:
+            _print_json({'ok': False, 'error': f'{type(exc).__name__}: {exc}'})
+        return EXIT_ERROR
+
+    reconciliation = assistant.reconciliation
+    if args.dry_run:
+        if args.json:
+            _print_json({'ok': True, 'dry_run': True, 'changes': changes.to_dict(),
+                         'reconciliation': reconciliation.to_dict(), 'report': assistant.report.to_dict()})
+        else:
+            print('\n'.join(changes.lines()))
+        return EXIT_MISMATCH if args.strict and not reconciliation.is_ok else EXIT_OK
+    if args.json:
+        _print_json({
+            'ok': saved,
+            'error': None if saved else f'Не удалось сохранить ведомость "{assistant.name_ved}"',
+            'reconciliation': reconciliation.to_dict() if saved else None,
+            'report': assistant.report.to_dict(),
+        })
+    if not saved:
+        return EXIT_ERROR
+    if args.strict and not reconciliation.is_ok:
+        return EXIT_MISMATCH
+    return EXIT_OK
+
+
+def cmd_jobs(args) -> int:
+    """Обработка нескольких домов по манифесту."""
+    import jobs
+
+    try:
+        job_list = jobs.load_manifest(args.manifest)
+    except (OSError, ValueError) as exc:
+        logger.error(f'Не удалось прочитать манифест: {exc}')
+        return EXIT_ERROR
+
+    start = monotonic()
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        results = jobs.run_jobs(job_list, args.workers)
+    jobs_summary = jobs.summary(results, monotonic() - start)
+    if args.json:
+        _print_json(jobs_summary)
+    else:
+        logger.info(f'Обработано домов: {jobs_summary["ok"]} из {jobs_summary["total"]}')
+    return EXIT_OK if jobs_summary['failed'] == 0 else EXIT_ERROR
+
+
+def cmd_watch(args) -> int:
+    """Обработка файлов банка, появляющихся в папке."""
+    import watcher
+
+    try:
+        routes = watcher.load_routes(args.routes) if args.routes else []
+    except (OSError, ValueError) as exc:
+        logger.error(f'Не удалось прочитать маршруты: {exc}')
+        return EXIT_ERROR
+    if not routes and args.ved_dir is None:
+        logger.error('Укажите маршруты (--routes) или папку ведомостей (--ved-dir)')
+        return EXIT_ERROR
+
+    folder = watcher.Watcher(args.inbox, routes, args.ved_dir, args.workers, args.settle, args.interval,
+                             use_inotify=not args.polling)
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            processed = folder.run(once=args.once)
+        except KeyboardInterrupt:
+            processed = folder.processed
+    logger.info(f'Наблюдение остановлено, обработано файлов: {processed}')
+    return EXIT_OK
+
+
+def cmd_serve(args) -> int:
+    """Локальный HTTP-сервис обработки ведомостей."""
+    import server
+
+    try:
+        server.serve(args.host, args.port, args.workers, args.upload_dir)
+    except OSError as exc:
+        logger.error(f'Не удалось запустить сервис: {exc}')
+        return EXIT_ERROR
+    return EXIT_OK
+
+
+def cmd_history(args) -> int:
+    """История платежей и остатки квартир из журнала ведомости (без загрузки книги)."""
+    import os
+    import sqlite3
+
+    import payments_ledger
+
+    path = f'{args.ved}{payments_ledger.LEDGER_SUFFIX}'
+    if not os.path.isfile(path):
+        logger.error(f'Журнал платежей не найден: {path} (ведомость ещё не обрабатывалась с журналом)')
+        return EXIT_ERROR
+    try:
+        ledger = payments_ledger.PaymentsLedger(path)
+        if args.balance or args.debtors:
+            history = None
+            balances = ledger.balances(args.apartment, args.debtors)
+        else:
+            history = ledger.history(args.apartment, args.since, args.until)
+            balances = ledger.balances(args.apartment) if args.apartment is not None else []
+    except ValueError as exc:
+        logger.error(str(exc))
+        return EXIT_ERROR
+    except sqlite3.Error as exc:
+        logger.error(f'Не удалось прочитать журнал платежей: {exc}')
+        return EXIT_ERROR
+
+    if args.json:
+        _print_json({
+            'history': [entry._asdict() for entry in history] if history is not None else None,
+            'balances': [balance.to_dict() for balance in balances],
+        })
+        return EXIT_OK
+    for entry in history or []:
+        months = entry.months if entry.months is not None else 'не записан в ведомость'
+        debt = f', долг {entry.debt:g}' if entry.debt else ''
+        print(f'{entry.date}  кв {entry.kv:>4}  {entry.summ:>10g}  {months}{debt}  '
+              f'({entry.source}, строка {entry.row})')
+    for balance in balances:
+        print(f'кв {balance.kv}: взнос {balance.fee:g}, долг за прошлый год {balance.debt:g}, '
+              f'оплачено долга {balance.debt_paid:g}, остаток долга {balance.debt_left:g}, '
+              f'оплачено по месяцам {balance.paid:g}')
+    if history is not None:
+        logger.info(f'Платежей: {len(history)}, сумма: {sum(entry.summ for entry in history):g}')
+    return EXIT_OK
+
+
+def cmd_cache(args) -> int:
+    """Очистка кэша разобранных файлов банка и разметки ведомостей."""
+    import sqlite3
+
+    import bank_cache
+    import layout
+
+    cache = bank_cache.open_cache()
+    if cache is None:
+        return EXIT_ERROR
+    cache.clear()
+    logger.info(f'Кэш файлов банка очищен: {cache.path}')
+    try:
+        layout_cache = layout.LayoutCache()
+        layout_cache.clear()
+    except (OSError, sqlite3.Error) as exc:
+        logger.error(f'Не удалось очистить кэш разметки ведомостей: {exc}')
+        return EXIT_ERROR
+    logger.info(f'Кэш разметки ведомостей очищен: {layout_cache.path}')
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli.py', description='Помощник ОСИ (консольный режим)')
+    parser.add_argument('--debug', action='store_true', help='подробное логирование')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    process = commands.add_parser('process', help='занести платежи банка в ведомость')
+    process.add_argument('--ved', required=True, help='путь к ведомости')
+    process.add_argument('--bank', required=True, action='append',
+                         help='путь к файлу банка (можно указать несколько раз)')
+    process.add_argument('--kv', required=True, type=int, help='количество квартир')
+    process.add_argument('--workers', type=int, default=None,
+                         help='процессов для чтения нескольких файлов банка')
+    process.add_argument('--json', action='store_true', help='вывести результат сверки в JSON')
+    process.add_argument('--report', action='store_true',
+                         help='сохранить замеры этапов рядом с ведомостью (<ведомость>.report.json)')
+    process.add_argument('--trace-memory', action='store_true', help='замерять пиковую память этапов')
+    process.add_argument('--no-cache', action='store_true',
+                         help='не использовать кэш файлов банка и разметки ведомости')
+    process.add_argument('--no-ledger', action='store_true',
+                         help='не вести журнал платежей (повторы проверяются только по датам)')
+    process.add_argument('--writer', choices=('openpyxl', 'patch'), default='openpyxl',
+                         help='сохранение ведомости: openpyxl — полностью, patch — только изменённые ячейки')
+    process.add_argument('--no-preflight', action='store_true',
+                         help='не проверять файлы перед загрузкой (блокировка ведомости, листы, формат банка)')
+    process.add_argument('--dry-run', action='store_true',
+                         help='только показать изменения ячеек по квартирам (было -> стало), не сохраняя ведомость')
+    process.add_argument('--strict', action='store_true',
+                         help='код возврата 3, если суммы банка и ведомости не сошлись')
+    process.set_defaults(handler=cmd_process)
+
+    jobs_parser = commands.add_parser('jobs', help='обработать несколько домов по манифесту')
+    jobs_parser.add_argument('manifest', help='CSV (ved;bank;kv) или JSON манифест')
+    jobs_parser.add_argument('--workers', type=int, default=None, help='количество процессов')
+    jobs_parser.add_argument('--json', action='store_true', help='вывести сводку в JSON')
+    jobs_parser.set_defaults(handler=cmd_jobs)
+
+    watch = commands.add_parser('watch', help='обрабатывать файлы банка, появляющиеся в папке')
+    watch.add_argument('inbox', help='папка входящих файлов банка (обработанные переносятся в done/ и failed/)')
+    watch.add_argument('--routes', help='CSV (pattern;ved;kv) или JSON: шаблон имени файла банка -> ведомость')
+    watch.add_argument('--ved-dir', help='папка ведомостей для файлов с именем <ведомость>__*.xlsx')
+    watch.add_argument('--workers', type=int, default=None, help='количество процессов')
+    watch.add_argument('--settle', type=float, default=2.0,
+                       help='секунд без изменений, после которых файл считается записанным')
+    watch.add_argument('--interval', type=float, default=1.0, help='период опроса папки, сек.')
+    watch.add_argument('--polling', action='store_true', help='опрашивать папку вместо inotify')
+    watch.add_argument('--once', action='store_true', help='обработать файлы, которые уже лежат в папке, и выйти')
+    watch.set_defaults(handler=cmd_watch)
+
+    serve = commands.add_parser('serve', help='локальный HTTP-сервис обработки (JSON)')
+    serve.add_argument('--host', default='127.0.0.1', help='адрес (по умолчанию только этот компьютер)')
+    serve.add_argument('--port', type=int, default=8765, help='порт')
+    serve.add_argument('--workers', type=int, default=None, help='количество процессов')
+    serve.add_argument('--upload-dir', default=None, help='папка для загружаемых файлов')
+    serve.set_defaults(handler=cmd_serve)
+
+    history = commands.add_parser('history', help='история платежей и остатки квартир из журнала ведомости')
+    history.add_argument('--ved', required=True, help='путь к ведомости (журнал <ведомость>.ledger.sqlite3)')
+    history.add_argument('--apartment', help='номер квартиры (по умолчанию все)')
+    history.add_argument('--since', help='начальная дата ГГГГ.ММ.ДД')
+    history.add_argument('--until', help='конечная дата ГГГГ.ММ.ДД')
+    history.add_argument('--balance', action='store_true',
+                         help='остатки квартир (взнос, долг за прошлый год, оплата по месяцам) вместо платежей')
+    history.add_argument('--debtors', action='store_true', help='только квартиры с непогашенным долгом за прошлый год')
+    history.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    history.set_defaults(handler=cmd_history)
+
+    cache_parser = commands.add_parser('cache-clear',
+                                       help='очистить кэш разобранных файлов банка и разметки ведомостей')
+    cache_parser.set_defaults(handler=cmd_cache)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="[%(asctime)s.%(msecs)03d] %(module)s:%(lineno)d %(levelname)7s - %(message)s"
+        if args.debug else "%(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stderr,
+    )
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
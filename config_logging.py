@@ -8,50 +8,80 @@
 Особенности:
 - Поддержка двух форматов логов: краткий (INFO) и подробный (DEBUG).
 - Автоматический вывод логов в GUI и консоль.
+- Логи из рабочих потоков передаются в GUI через очередь и выводятся пачками.
+- Ограничение количества строк в окне логов и полный лог в файл с ротацией.
 """
+import collections
 import logging
+import logging.handlers
+import queue
+
+LOG_FILE_MAX_BYTES = 1024 * 1024  # размер файла лога до ротации
+LOG_FILE_BACKUPS = 3  # количество старых файлов лога
 
 class TextHandler(logging.Handler):
     """
        Обработчик логов для вывода сообщений в Tkinter Text/ScrolledText.
 
-       Позволяет безопасно добавлять строки в текстовый виджет из главного потока.
+       Записи складываются в очередь (можно из любого потока), а главный поток
+       раз в `flush_interval` мс забирает всё накопленное и добавляет одной вставкой.
+       В виджете хранится не больше `max_lines` строк (старые удаляются).
    """
-    def __init__(self, text_widget):
+    def __init__(self, text_widget, flush_interval=100, max_lines=5000):
         """
         Args:
             text_widget (tk.Text): Tkinter виджет для вывода логов.
+            flush_interval (int): Интервал вывода накопленных сообщений, мс.
+            max_lines (int): Максимум строк в виджете.
         """
         super().__init__()
         self.text_widget = text_widget
+        self.flush_interval = flush_interval
+        self.max_lines = max_lines
+        self.queue = queue.SimpleQueue()
+        self.text_widget.after(self.flush_interval, self._poll)
 
     def emit(self, record):
         """
-        Обрабатывает запись лога и добавляет её в текстовый виджет.
+        Обрабатывает запись лога и кладёт её в очередь.
 
         Args:
             record (logging.LogRecord): Объект с данными лога.
         """
         try:
-            msg = self.format(record)
-            # Работа с виджетом из главного потока (Tkinter не потокобезопасен)
-            self.text_widget.after(0, self._append, msg)
+            self.queue.put(self.format(record))
         except Exception:
             self.handleError(record)
 
+    def _poll(self):
+        """Забирает накопленные сообщения из очереди (в главном потоке Tkinter)."""
+        # при потоке сообщений больше max_lines нет смысла вставлять то, что сразу будет удалено
+        batch = collections.deque(maxlen=self.max_lines)
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._append('\n'.join(batch))
+        self.text_widget.after(self.flush_interval, self._poll)
+
     def _append(self, msg):
         """
-        Добавляет сообщение в конец текстового виджета.
+        Добавляет сообщения в конец текстового виджета и обрезает старые строки.
 
         Args:
-            msg (str): Текст сообщения.
+            msg (str): Текст сообщений (через перевод строки).
         """
         self.text_widget.configure(state='normal')
         self.text_widget.insert('end', msg + '\n')
+        lines = int(self.text_widget.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.text_widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
         self.text_widget.configure(state='disabled')
         self.text_widget.yview('end')
 
-def settings_logging(level=logging.INFO, text_widget=None):
+def settings_logging(level=logging.INFO, text_widget=None, max_lines=5000, log_file=None):
     """
        Настраивает систему логирования для приложения.
 
@@ -62,6 +92,8 @@ def settings_logging(level=logging.INFO, text_widget=None):
        Args:
            level (int): Уровень логирования (logging.INFO или logging.DEBUG).
            text_widget (tk.Text): Виджет для вывода логов в GUI.
+           max_lines (int): Максимум строк в окне логов.
+           log_file (str | None): Файл для полного (DEBUG) лога с ротацией.
 
        Returns:
            logging.Logger: Настроенный экземпляр логгера.
@@ -89,7 +121,7 @@ def settings_logging(level=logging.INFO, text_widget=None):
     formatter_info = logging.Formatter(fmt_info)
 
     # Обработчики
-    text_handler = TextHandler(text_widget)
+    text_handler = TextHandler(text_widget, max_lines=max_lines)
     console_handler = logging.StreamHandler()
 
     # По умолчанию применяем один из форматтеров
@@ -103,6 +135,18 @@ def settings_logging(level=logging.INFO, text_widget=None):
     logger.addHandler(text_handler)
     logger.addHandler(console_handler)
 
+    # Полный лог в файл — всегда DEBUG, не переключается вместе с GUI
+    if log_file is not None:
+        try:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+        except OSError as exc:  # папка недоступна для записи или файл занят другой копией программы
+            logger.warning(f'Лог в файл {log_file} не ведётся: {exc}')
+        else:
+            file_handler.setFormatter(formatter_debug)
+            file_handler.setLevel(logging.DEBUG)
+            logger.addHandler(file_handler)
+
     # Сохраняем форматтеры в атрибуты для последующего переключения
     logger._formatter_debug = formatter_debug
     logger._formatter_info = formatter_info
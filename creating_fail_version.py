@@ -1,13 +1,14 @@
 import os
 import main
 
-version_str = main.version.replace(',', '.')  # '1, 0, 0, 1' -> '1.0.0.1'
+version_str = main.VERSION  # '1.0.0.1'
+version_tuple = ', '.join(version_str.split('.'))  # '1.0.0.1' -> '1, 0, 0, 1'
 
 version_info = f"""# UTF-8 encoding is required
 VSVersionInfo(
     ffi=FixedFileInfo(
-        filevers=({main.version}),  # Версия файла
-        prodvers=({main.version}),  # Версия продукта
+        filevers=({version_tuple}),  # Версия файла
+        prodvers=({version_tuple}),  # Версия продукта
         mask=0x3f,
         flags=0x0,
         OS=0x40004,
@@ -0,0 +1,92 @@
+"""
+Замеры этапов обработки: время (монотонные часы), пиковая память (tracemalloc) и счётчики.
+
+`RunReport` заполняется внутри `statement.Assistant`: каждый вызов `start(stage)`
+закрывает предыдущий этап и открывает новый, `finish()` закрывает последний.
+"""
+import json
+import logging
+import tracemalloc
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class RunReport:
+    """Отчёт о запуске: время и память по этапам, счётчики"""
+
+    def __init__(self, trace_memory=False):
+        """
+        Args:
+            trace_memory (bool): Замерять пиковую память этапов через tracemalloc.
+        """
+        self.trace_memory = trace_memory
+        self.stages = {}  # {этап: {'seconds': ..., 'peak_bytes': ...}}
+        self.counters = {}  # {название: значение}
+        self._current = None
+        self._stage_start = None
+        self._run_start = perf_counter()
+        self._run_end = None
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def start(self, stage: str) -> None:
+        """Закрывает текущий этап и начинает новый."""
+        self._close_stage()
+        self._current = stage
+        self._stage_start = perf_counter()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+    def _close_stage(self) -> None:
+        if self._current is None:
+            return
+        stage = self.stages.setdefault(self._current, {'seconds': 0.0})
+        stage['seconds'] += perf_counter() - self._stage_start
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak)
+        self._current = None
+
+    def finish(self) -> None:
+        """Закрывает последний этап и останавливает замер памяти (если запускали его сами)."""
+        self._close_stage()
+        if self._run_end is None:
+            self._run_end = perf_counter()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def count(self, name: str, value=1) -> None:
+        """Увеличивает счётчик."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def total(self) -> float:
+        """Общее время запуска, сек."""
+        end = self._run_end if self._run_end is not None else perf_counter()
+        return end - self._run_start
+
+    def to_dict(self) -> dict:
+        return {
+            'total_seconds': self.total,
+            'stages': self.stages,
+            'counters': self.counters,
+        }
+
+    def log(self) -> None:
+        """Пишет отчёт в лог (DEBUG)."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        for stage, values in self.stages.items():
+            memory = f', пик памяти {values["peak_bytes"] / 1024 / 1024:.1f} МБ' if 'peak_bytes' in values else ''
+            logger.debug(f'Этап {stage}: {values["seconds"]:.3f} сек.{memory}')
+        counters = ', '.join(f'{name} {value}' for name, value in self.counters.items())
+        logger.debug(f'Всего {self.total:.3f} сек. Счётчики: {counters}')
+
+    def save_json(self, path: str) -> None:
+        """Сохраняет отчёт в JSON."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
@@ -0,0 +1,177 @@
+"""
+Пакетная обработка нескольких домов (ОСИ) в пуле процессов.
+
+Манифест — CSV (с заголовком `ved;bank;kv`) или JSON (список объектов
+`{"ved": ..., "bank": ..., "kv": ...}`). Для каждого дома в отдельном процессе
+запускается `statement.Assistant`; ошибка одного дома не останавливает остальные.
+Задания одной ведомости выполняются по очереди, разных ведомостей — параллельно.
+"""
+import csv
+import json
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import monotonic
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    """Задание: ведомость, файл банка и количество квартир одного дома"""
+    path_ved: str
+    path_bank: str
+    kv_quantity: int
+
+
+class JobResult(NamedTuple):
+    """Результат обработки одного дома"""
+    job: Job
+    ok: bool
+    elapsed: float  # время обработки, сек
+    reconciliation: dict = None  # результат сверки (Reconciliation.to_dict)
+    error: str = None
+
+    def to_dict(self) -> dict:
+        result = self._asdict()
+        result['job'] = self.job._asdict()
+        return result
+
+
+def read_records(path: str) -> list:
+    """
+    Читает записи CSV (разделитель `;`, первая строка — заголовок) или JSON (список объектов).
+
+    Args:
+        path (str): Путь к файлу (JSON — по расширению .json).
+
+    Returns:
+        list[dict]: Записи {поле: значение}.
+    """
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        return list(csv.DictReader(file, delimiter=';'))
+
+
+def load_manifest(path: str) -> list:
+    """
+    Читает манифест заданий.
+
+    Args:
+        path (str): Путь к CSV или JSON файлу.
+
+    Returns:
+        list[Job]: Задания.
+
+    Raises:
+        ValueError: Если в записи манифеста нет нужных полей.
+    """
+    jobs = []
+    for number, record in enumerate(read_records(path), start=1):
+        try:
+            jobs.append(Job(record['ved'], record['bank'], int(record['kv'])))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f'Манифест {path}: неверная запись №{number} ({exc})') from exc
+    return jobs
+
+
+def run_job(job: Job) -> JobResult:
+    """
+    Обрабатывает один дом. Выполняется в процессе пула, исключения не пробрасывает.
+
+    Args:
+        job (Job): Задание.
+
+    Returns:
+        JobResult: Результат обработки.
+    """
+    import statement
+
+    start = monotonic()
+    try:
+        # дома уже обрабатываются параллельно, файл банка разбираем в том же процессе
+        assistant = statement.Assistant(job.path_ved, job.path_bank, job.kv_quantity, concurrent_loading=False)
+        if not assistant.launch():
+            return JobResult(job, False, monotonic() - start,
+                             error=f'Не удалось сохранить ведомость "{assistant.name_ved}"')
+        return JobResult(job, True, monotonic() - start, assistant.reconciliation.to_dict())
+    except Exception as exc:
+        return JobResult(job, False, monotonic() - start, error=f'{type(exc).__name__}: {exc}')
+
+
+def run_jobs(jobs: list, workers=None) -> list:
+    """
+    Обрабатывает дома в пуле процессов (один `statement.Assistant` на процесс).
+    Задания одной ведомости выполняются по очереди: две записи одной книги одновременно
+    затёрли бы друг друга.
+
+    Args:
+        jobs (list[Job]): Задания.
+        workers (int | None): Количество процессов (по умолчанию — число ядер).
+
+    Returns:
+        list[JobResult]: Результаты в порядке заданий.
+    """
+    results = [None] * len(jobs)
+    queues = {}  # {ведомость: номера её заданий в порядке манифеста}
+    for number, job in enumerate(jobs):
+        queues.setdefault(os.path.realpath(job.path_ved), []).append(number)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit(path_ved):
+            number = queues[path_ved].pop(0)
+            futures[executor.submit(run_job, jobs[number])] = (number, path_ved)
+
+        futures = {}  # {future: (номер задания, ведомость)}
+        for path_ved in queues:
+            submit(path_ved)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, path_ved = futures.pop(future)
+                job = jobs[number]
+                try:
+                    result = future.result()
+                except Exception as exc:  # процесс пула упал
+                    result = JobResult(job, False, 0.0, error=f'{type(exc).__name__}: {exc}')
+                results[number] = result
+                if result.ok:
+                    logger.info(f'{os.path.basename(job.path_ved)}: готово за {result.elapsed:.2f} сек.')
+                else:
+                    logger.error(f'{os.path.basename(job.path_ved)}: {result.error}')
+                if queues[path_ved]:
+                    submit(path_ved)
+    return results
+
+
+def summary(results: list, elapsed: float) -> dict:
+    """
+    Сводка по результатам обработки.
+
+    Args:
+        results (list[JobResult]): Результаты.
+        elapsed (float): Время обработки всех заданий (по часам, не сумма времени заданий), сек.
+
+    Returns:
+        dict: Количество заданий, успешных и ошибочных, общее время и результаты.
+    """
+    failed = [result for result in results if not result.ok]
+    return {
+        'total': len(results),
+        'ok': len(results) - len(failed),
+        'failed': len(failed),
+        'elapsed': elapsed,
+        'results': [result.to_dict() for result in results],
+    }
+
+
+if __name__ == '__main__':
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    start = monotonic()
+    jobs_results = run_jobs(load_manifest(sys.argv[1]))
+    jobs_summary = summary(jobs_results, monotonic() - start)
+    print(json.dumps(jobs_summary, ensure_ascii=False, indent=2))
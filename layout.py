@@ -0,0 +1,265 @@
+"""
+Разметка ведомости: где находятся блоки месяцев, строки квартир и столбцы сумм.
+
+`Layout.detect` определяет разметку по листам:
+- на листе "список как должн" — строку с названиями месяцев (по умолчанию 7)
+  и столбец первого месяца (по умолчанию 10); столбцы взноса и долга
+  отсчитываются от него (6, 8, 9 при стандартном шаблоне);
+- на листе "оплата" — строки начала блоков месяцев (название месяца в столбце 1);
+- строки квартир на обоих листах (`sheet_index.SheetIndex`).
+
+Разметка шаблона меняется редко, поэтому она сохраняется в кэше (`LayoutCache`)
+по отпечатку книги и при следующем запуске только проверяется по нескольким ячейкам.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from time import time
+
+import allocation
+import bank_cache
+from allocation import LedgerColumns
+from sheet_index import KV_COLUMN, SheetIndex
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_VERSION = 1  # версия формата разметки в кэше
+CACHE_FILE = 'layout_cache.sqlite3'
+HEADER_SCAN_ROWS = 30  # строк листа "список как должн", в которых ищется строка месяцев
+HEADER_SCAN_COLUMNS = 40
+# последний столбец листа "список как должн", который может понадобиться (месяцы сдвинутого шаблона)
+LEDGER_MAX_COLUMN = HEADER_SCAN_COLUMNS + allocation.LEDGER_MONTHS - 1
+HEADER_MIN_MONTHS = 6  # минимум названий месяцев в строке заголовка
+
+MONTHS = {'01': 'январь',
+          '02': 'февраль',
+          '03': 'март',
+          '04': 'апрель',
+          '05': 'май',
+          '06': 'июнь',
+          '07': 'июль',
+          '08': 'август',
+          '09': 'сентябрь',
+          '10': 'октябрь',
+          '11': 'ноябрь',
+          '12': 'декабрь'
+          }
+MONTH_NUMBERS = {name: number for number, name in MONTHS.items()}
+
+
+def month_blocks(sheet_payment) -> dict:
+    """
+    Ищет начала блоков месяцев на листе "оплата" (название месяца в столбце 1).
+
+    Returns:
+        dict: {месяц: (строка, столбец)}, например {'07': (313, 1)}.
+    """
+    blocks = {}
+    rows = sheet_payment.iter_rows(min_row=1, max_row=sheet_payment.max_row - 1, min_col=1, max_col=1,
+                                   values_only=True)
+    for row, (value,) in enumerate(rows, start=1):
+        if value in MONTH_NUMBERS:
+            blocks[MONTH_NUMBERS[value]] = (row, 1)
+    return blocks
+
+
+def ledger_header(sheet_list):
+    """
+    Ищет строку с названиями месяцев на листе "список как должн".
+
+    Returns:
+        tuple: (строка, столбец первого месяца) или (None, None), если строка не найдена.
+    """
+    rows = sheet_list.iter_rows(min_row=1, max_row=min(HEADER_SCAN_ROWS, sheet_list.max_row),
+                                min_col=1, max_col=HEADER_SCAN_COLUMNS, values_only=True)
+    for row, values in enumerate(rows, start=1):
+        columns = [column for column, value in enumerate(values, start=1) if value in MONTH_NUMBERS]
+        if len(columns) >= HEADER_MIN_MONTHS:
+            return row, columns[0]
+    return None, None
+
+
+class Layout:
+    """Разметка ведомости"""
+
+    def __init__(self, header_row: int, columns: LedgerColumns, mon_coord_dict: dict, index: SheetIndex,
+                 kv_column=KV_COLUMN):
+        """
+        Args:
+            header_row (int): Строка с названиями месяцев на листе "список как должн".
+            columns (LedgerColumns): Столбцы взноса, долга и месяцев.
+            mon_coord_dict (dict): {месяц: (строка, столбец)} начала блоков на листе "оплата".
+            index (SheetIndex): Строки квартир на обоих листах.
+            kv_column (int): Столбец с номером квартиры на листе "список как должн".
+        """
+        self.header_row = header_row
+        self.columns = columns
+        self.mon_coord_dict = mon_coord_dict
+        self.index = index
+        self.kv_column = kv_column
+
+    @classmethod
+    def detect(cls, sheet_payment, sheet_list, kv_quantity: int) -> "Layout":
+        """
+        Определяет разметку по листам ведомости.
+
+        Если строка месяцев не найдена, используется стандартный шаблон (строка 7, столбцы 6/8/9/10-22).
+
+        Returns:
+            Layout: Разметка.
+        """
+        header_row, first_month = ledger_header(sheet_list)
+        if header_row is None:
+            header_row, first_month = allocation.LEDGER_HEADER_ROW, allocation.LEDGER_FIRST_MONTH_COLUMN
+        # квартира, взнос, долг и оплата долга стоят на тех же местах относительно первого месяца
+        offset = first_month - allocation.LEDGER_FIRST_MONTH_COLUMN
+        columns = LedgerColumns(allocation.LEDGER_FEE_COLUMN + offset, allocation.LEDGER_DEBT_COLUMN + offset,
+                                allocation.LEDGER_DEBT_PAID_COLUMN + offset, first_month)
+        if (header_row, columns) != (allocation.LEDGER_HEADER_ROW, allocation.LEDGER_COLUMNS):
+            logger.info(f'Нестандартная разметка листа "{allocation.LEDGER_SHEET}": месяцы в строке {header_row}, '
+                        f'со столбца {columns.first_month}')
+
+        mon_coord_dict = month_blocks(sheet_payment)
+        index = SheetIndex.build(sheet_payment, sheet_list, mon_coord_dict, kv_quantity, header_row + 1,
+                                 KV_COLUMN + offset)
+        return cls(header_row, columns, mon_coord_dict, index, KV_COLUMN + offset)
+
+    def matches(self, sheet_payment, sheet_list) -> bool:
+        """
+        Проверка сохранённой разметки: названия месяцев в заголовке и в начале блоков,
+        номера всех квартир в сохранённых строках обоих листов (вставка и удаление строк внутри таблицы
+        не меняют размеры листа).
+        """
+        header = next(sheet_list.iter_rows(min_row=self.header_row, max_row=self.header_row,
+                                           min_col=self.columns.first_month, max_col=self.columns.first_month,
+                                           values_only=True))[0]
+        if header not in MONTH_NUMBERS:
+            return False
+        for month, (row, column) in self.mon_coord_dict.items():
+            if sheet_payment.cell(row=row, column=column).value != MONTHS[month]:
+                return False
+        checks = [(sheet_list, self.index.ledger_rows, self.kv_column)]
+        checks.extend((sheet_payment, rows, allocation.PAYMENT_KV_COLUMN)
+                      for rows in self.index.payment_rows.values())
+        for sheet, rows, column in checks:
+            for kv, row in rows.items():
+                if str(sheet.cell(row=row, column=column).value) != kv:
+                    return False
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            'header_row': self.header_row,
+            'columns': list(self.columns),
+            'kv_column': self.kv_column,
+            'months': {month: row for month, (row, _) in self.mon_coord_dict.items()},
+            'kv_quantity': self.index.kv_quantity,
+            'payment_rows': self.index.payment_rows,
+            'ledger_rows': self.index.ledger_rows,
+            'warnings': self.index.warnings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Layout":
+        index = SheetIndex(data['kv_quantity'])
+        index.payment_rows = data['payment_rows']
+        index.ledger_rows = data['ledger_rows']
+        index.warnings = data['warnings']
+        return cls(data['header_row'], LedgerColumns(*data['columns']),
+                   {month: (row, 1) for month, row in data['months'].items()}, index, data['kv_column'])
+
+
+def fingerprint(path_ved: str, sheet_payment, sheet_list, kv_quantity: int) -> str:
+    """Отпечаток книги для кэша разметки: путь, количество квартир и размеры листов."""
+    key = f'{os.path.realpath(path_ved)}|{kv_quantity}|{sheet_payment.max_row}|{sheet_list.max_row}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class LayoutCache:
+    """Кэш разметки ведомостей (SQLite в каталоге кэша пользователя, см. `bank_cache.cache_dir`)"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str | None): Файл базы SQLite (по умолчанию в `bank_cache.cache_dir()`).
+        """
+        if path is None:
+            os.makedirs(bank_cache.cache_dir(), exist_ok=True)
+            path = os.path.join(bank_cache.cache_dir(), CACHE_FILE)
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS layouts (key TEXT PRIMARY KEY, data TEXT NOT NULL, used REAL NOT NULL)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Соединение с базой: транзакция фиксируется и соединение закрывается на выходе."""
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def key(workbook_fingerprint: str) -> str:
+        return f'{LAYOUT_VERSION}:{workbook_fingerprint}'
+
+    def get(self, workbook_fingerprint: str):
+        """
+        Returns:
+            Layout | None: Сохранённая разметка или None.
+        """
+        key = self.key(workbook_fingerprint)
+        with self._connect() as connection:
+            row = connection.execute('SELECT data FROM layouts WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE layouts SET used = ? WHERE key = ?', (time(), key))
+        return Layout.from_dict(json.loads(row[0]))
+
+    def put(self, workbook_fingerprint: str, layout: Layout) -> None:
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO layouts (key, data, used) VALUES (?, ?, ?)',
+                               (self.key(workbook_fingerprint), json.dumps(layout.to_dict(), ensure_ascii=False),
+                                time()))
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM layouts')
+
+
+def load_layout(path_ved: str, sheet_payment, sheet_list, kv_quantity: int, use_cache=True) -> tuple:
+    """
+    Разметка ведомости из кэша (после проверки) или определённая заново.
+
+    Returns:
+        tuple: (Layout, True, если разметка взята из кэша).
+    """
+    cache = None
+    key = None
+    if use_cache:
+        try:
+            cache = LayoutCache()
+            key = fingerprint(path_ved, sheet_payment, sheet_list, kv_quantity)
+            layout = cache.get(key)
+        except (OSError, sqlite3.Error, ValueError, KeyError, TypeError) as exc:
+            logger.warning(f'Кэш разметки ведомости недоступен: {exc}')
+            cache = layout = None
+        if layout is not None and layout.matches(sheet_payment, sheet_list):
+            logger.debug('Разметка ведомости взята из кэша')
+            for message in layout.index.warnings:
+                logger.warning(message)
+            return layout, True
+
+    layout = Layout.detect(sheet_payment, sheet_list, kv_quantity)
+    if cache is not None:
+        try:
+            cache.put(key, layout)
+        except sqlite3.Error as exc:
+            logger.warning(f'Ошибка записи в кэш разметки ведомости: {exc}')
+    return layout, False
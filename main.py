@@ -6,22 +6,52 @@
 - Управление режимом логирования (INFO/DEBUG) с возможностью переключения "на лету".
 - Запуск обработки данных через модуль `statement`.
 - Отображение логов и результатов в GUI.
+- Обработка в рабочем потоке с индикатором этапов и кнопкой отмены.
+- Предварительный просмотр изменений по квартирам и запись просмотренных изменений без пересчёта.
+- Быстрый старт: модули обработки (`statement`, openpyxl) загружаются при первом запуске обработки,
+  а не при открытии окна; `--startup-check [файл]` замеряет время до появления окна (см. build.py).
 
 Особенности:
 - В режиме запуска из IDE логирование по умолчанию DEBUG.
 - В режиме exe логирование по умолчанию INFO.
 """
+from time import perf_counter
 
+STARTED = perf_counter()  # для замера времени до появления окна (--startup-check)
+
+import json
+import os
 import sys
+import multiprocessing
+import queue
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 import logging
 from time import time
 
 from config_logging import settings_logging
-import statement  # твой модуль с Assistant
+
+statement = None  # модуль с Assistant, загружается load_statement() при первом запуске обработки
 
 VERSION = "1.2.0.2"
+BANK_PATHS_SEPARATOR = " | "  # разделитель путей к файлам банка в поле ввода
+PROGRESS_POLL_MS = 100  # интервал опроса событий рабочего потока, мс
+LOG_MAX_LINES = 5000  # максимум строк в окне логов
+LOG_FILE = os.path.join(os.path.expanduser("~"), "osi_assistant.log")  # полный лог с ротацией
+STARTUP_CHECK_ARG = "--startup-check"
+
+
+def load_statement():
+    """
+    Загружает модули обработки (`statement` и openpyxl) — около 0,2-0,3 сек.,
+    поэтому не при открытии окна, а при первом запуске обработки.
+    """
+    global statement
+    if statement is None:
+        import statement as module
+        statement = module
+    return statement
 
 
 class OSIAssistantApp(tk.Tk):
@@ -46,12 +76,18 @@ class OSIAssistantApp(tk.Tk):
         # Определяем, запущен ли exe или исходники
         self.is_frozen = getattr(sys, "frozen", False)
 
+        # Рабочий поток обработки и его события
+        self.worker = None
+        self.cancel_event = None
+        self.events = queue.SimpleQueue()
+
         # GUI-элементы
         self._build_interface()
 
         # Уровень логов: INFO для exe, DEBUG для кода
         initial_level = logging.INFO if self.is_frozen else default_level
-        self.logger = settings_logging(initial_level, text_widget=self.output)
+        self.logger = settings_logging(initial_level, text_widget=self.output,
+                                       max_lines=LOG_MAX_LINES, log_file=LOG_FILE)
 
     def _build_interface(self) -> None:
         """Создаёт интерфейс приложения (виджеты и кнопки)."""
@@ -75,7 +111,12 @@ class OSIAssistantApp(tk.Tk):
         tk.Button(self, text="Выбрать", command=self.select_ved_file).grid(row=2, column=2)
 
         # Кнопки управления
-        tk.Button(self, text="Запустить", command=self.run_assistant).grid(row=3, column=0)
+        run_frame = tk.Frame(self)
+        run_frame.grid(row=3, column=0)
+        self.run_button = tk.Button(run_frame, text="Запустить", command=self.run_assistant)
+        self.run_button.pack(side="left")
+        self.preview_button = tk.Button(run_frame, text="Просмотр", command=self.preview_assistant)
+        self.preview_button.pack(side="left", padx=5)
         tk.Button(self, text="Очистить", command=self.clear_output).grid(row=3, column=1)
         tk.Button(self, text="Выход", command=self.quit).grid(row=3, column=2)
 
@@ -87,6 +128,16 @@ class OSIAssistantApp(tk.Tk):
         )
         self.flag_checkbox.grid(row=4, column=0, sticky="w")
 
+        # Индикатор выполнения и отмена
+        progress_frame = tk.Frame(self)
+        progress_frame.grid(row=4, column=1, sticky="we")
+        self.progress_bar = ttk.Progressbar(progress_frame, length=200)  # maximum — при запуске обработки
+        self.progress_bar.pack(side="left")
+        self.stage_label = tk.Label(progress_frame, text="")
+        self.stage_label.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(self, text="Отмена", command=self.cancel_assistant, state="disabled")
+        self.cancel_button.grid(row=4, column=2)
+
         # Окно логов
         self.output = scrolledtext.ScrolledText(self, width=80, height=20, state="disabled")
         self.output.grid(row=5, column=0, columnspan=3, padx=5, pady=5)
@@ -107,8 +158,12 @@ class OSIAssistantApp(tk.Tk):
         Args:
             level (int): Новый уровень логирования (logging.INFO или logging.DEBUG).
         """
-        self.logger.setLevel(level)
+        has_file = any(isinstance(handler, logging.FileHandler) for handler in self.logger.handlers)
+        # при записи полного лога в файл корневой логгер должен пропускать DEBUG
+        self.logger.setLevel(logging.DEBUG if has_file else level)
         for handler in self.logger.handlers:
+            if isinstance(handler, logging.FileHandler):
+                continue
             handler.setLevel(level)
             if level == logging.DEBUG:
                 handler.setFormatter(self.logger._formatter_debug)
@@ -116,11 +171,16 @@ class OSIAssistantApp(tk.Tk):
                 handler.setFormatter(self.logger._formatter_info)
 
     def select_bank_file(self) -> None:
-        """Открывает диалог выбора файла и устанавливает путь к файлу оплаты."""
-        path = filedialog.askopenfilename()
-        if path:
+        """
+        Открывает диалог выбора файлов и устанавливает пути к файлам оплаты.
+
+        Можно выбрать несколько файлов — они будут обработаны пакетно
+        (одна загрузка и одно сохранение ведомости).
+        """
+        paths = filedialog.askopenfilenames()
+        if paths:
             self.bank_path.delete(0, tk.END)
-            self.bank_path.insert(0, path)
+            self.bank_path.insert(0, BANK_PATHS_SEPARATOR.join(paths))
 
     def select_ved_file(self) -> None:
         """Открывает диалог выбора файла и устанавливает путь к файлу ведомости."""
@@ -129,6 +189,35 @@ class OSIAssistantApp(tk.Tk):
             self.ved_path.delete(0, tk.END)
             self.ved_path.insert(0, path)
 
+    def _read_inputs(self):
+        """
+        Читает параметры из полей ввода.
+
+        Returns:
+            tuple | None: (путь к ведомости, пути к файлам банка, количество квартир) или None при ошибке.
+        """
+        try:
+            paths_bank = [path.strip() for path in self.bank_path.get().split(BANK_PATHS_SEPARATOR.strip())
+                          if path.strip()]
+            path_ved = self.ved_path.get()
+            kv_count = int(self.kv_entry.get())
+            if not paths_bank:
+                raise ValueError("Не выбран файл с оплатой")
+        except ValueError as exc:
+            messagebox.showerror("Ошибка", str(exc))
+            return None
+        return path_ved, paths_bank, kv_count
+
+    def _start_worker(self, target, args) -> None:
+        """Запускает рабочий поток обработки и опрос его событий."""
+        load_statement()
+        self.cancel_event = threading.Event()
+        self.progress_bar.configure(maximum=len(statement.STAGES), value=0)
+        self._set_running(True)
+        self.worker = threading.Thread(target=target, args=args, daemon=True)
+        self.worker.start()
+        self.after(PROGRESS_POLL_MS, self._poll_events)
+
     def run_assistant(self) -> None:
         """
         Запускает обработку данных или тестовый режим в зависимости от чекбокса.
@@ -142,19 +231,136 @@ class OSIAssistantApp(tk.Tk):
             self.logger.info("Тестирование будет добавлено позже.")
         else:
             # Боевой запуск
+            if self.worker is not None and self.worker.is_alive():
+                return
+            inputs = self._read_inputs()
+            if inputs is None:
+                return
+
+            self.logger.info("Запуск обработки...")
+            if len(inputs[1]) > 1:
+                self.logger.info(f"Пакетная обработка файлов банка: {len(inputs[1])}")
+            self._start_worker(self._process, inputs)
+
+    def preview_assistant(self) -> None:
+        """Рассчитывает изменения без сохранения ведомости и показывает их по квартирам."""
+        if self.worker is not None and self.worker.is_alive():
+            return
+        inputs = self._read_inputs()
+        if inputs is None:
+            return
+        self.logger.info("Расчёт изменений (ведомость не сохраняется)...")
+        self._start_worker(self._process, inputs + (True,))
+
+    def commit_preview(self, assistant) -> None:
+        """
+        Записывает просмотренные изменения в ведомость (без повторного расчёта).
+
+        Args:
+            assistant (statement.Assistant): Помощник после `preview()`.
+        """
+        if self.worker is not None and self.worker.is_alive():
+            return
+        self.logger.info("Запись изменений в ведомость...")
+        self._start_worker(self._commit, (assistant,))
+
+    def _assistant(self, path_ved: str, paths_bank: list, kv_count: int):
+        """Помощник для одного или нескольких файлов банка (с событиями этапов и отменой)."""
+        options = dict(progress=lambda stage: self.events.put(("stage", stage)),
+                       cancel_event=self.cancel_event)
+        if len(paths_bank) > 1:
+            return statement.BatchAssistant(path_ved, paths_bank, kv_count, **options)
+        return statement.Assistant(path_ved, paths_bank[0], kv_count, **options)
+
+    def _process(self, path_ved: str, paths_bank: list, kv_count: int, preview=False) -> None:
+        """
+        Обработка в рабочем потоке. С GUI общается только через очередь `self.events`.
+
+        Args:
+            path_ved (str): Путь к ведомости.
+            paths_bank (list): Пути к файлам банка.
+            kv_count (int): Количество квартир.
+            preview (bool): Только рассчитать изменения (`Assistant.preview`), не сохраняя ведомость.
+        """
+        start = time()
+
+        def run():
+            assistant = self._assistant(path_ved, paths_bank, kv_count)
+            if preview:
+                assistant.preview()
+                self.events.put(("preview", assistant, round(time() - start, 2)))
+            else:
+                saved = assistant.launch()
+                self.events.put(("done", saved, round(time() - start, 2)))
+
+        self._run_safely(run)
+
+    def _commit(self, assistant) -> None:
+        """Запись просмотренных изменений в рабочем потоке."""
+        start = time()
+        assistant.cancel_event = self.cancel_event  # отмена — до начала сохранения
+        self._run_safely(lambda: self.events.put(("done", assistant.commit(), round(time() - start, 2))))
+
+    def _run_safely(self, run) -> None:
+        """Выполняет обработку, ошибки и отмену передаёт в GUI событиями."""
+        try:
+            run()
+        except statement.Cancelled as exc:
+            self.events.put(("cancelled", str(exc)))
+        except statement.PreflightError as exc:
+            self.logger.error(str(exc))
+            self.events.put(("error", exc))
+        except Exception as exc:
+            self.logger.exception("Ошибка при запуске обработки")
+            self.events.put(("error", exc))
+
+    def _poll_events(self) -> None:
+        """Забирает события рабочего потока: этапы обработки и итог."""
+        while True:
             try:
-                path_bank = self.bank_path.get()
-                path_ved = self.ved_path.get()
-                kv_count = int(self.kv_entry.get())
-
-                self.logger.info("Запуск обработки...")
-                start = time()
-                statement.Assistant(path_ved, path_bank, kv_count).launch()
-                elapsed = round(time() - start, 2)
-                self.logger.info(f"Готово! Время выполнения: {elapsed} сек.")
-            except Exception as exc:
-                messagebox.showerror("Ошибка", str(exc))
-                self.logger.exception("Ошибка при запуске обработки")
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = event[0]
+            if kind == "stage":
+                stage = event[1]
+                self.progress_bar["value"] = list(statement.STAGES).index(stage) + 1
+                self.stage_label.configure(text=statement.STAGES[stage])
+                self.logger.debug(f"Этап: {statement.STAGES[stage]}")
+                continue
+
+            self._set_running(False)
+            if kind == "done":
+                _, saved, elapsed = event
+                if saved:
+                    self.logger.info(f"Готово! Время выполнения: {elapsed} сек.")
+                else:
+                    self.logger.error("Ведомость не сохранена: закройте файл и запустите снова")
+            elif kind == "preview":
+                _, assistant, elapsed = event
+                self.logger.info(f"Изменения рассчитаны за {elapsed} сек., ведомость не изменена")
+                PreviewWindow(self, assistant)
+            elif kind == "cancelled":
+                self.stage_label.configure(text="Отменено")
+                self.logger.info(event[1])
+            elif kind == "error":
+                messagebox.showerror("Ошибка", str(event[1]))
+            return
+
+        self.after(PROGRESS_POLL_MS, self._poll_events)
+
+    def cancel_assistant(self) -> None:
+        """Запрашивает отмену обработки (сработает перед следующим этапом, но не после начала сохранения)."""
+        if self.cancel_event is not None and self.worker is not None and self.worker.is_alive():
+            self.cancel_event.set()
+            self.logger.info("Отмена обработки...")
+
+    def _set_running(self, running: bool) -> None:
+        """Переключает кнопки на время обработки."""
+        self.run_button.configure(state="disabled" if running else "normal")
+        self.preview_button.configure(state="disabled" if running else "normal")
+        self.cancel_button.configure(state="normal" if running else "disabled")
 
     def clear_output(self) -> None:
         """Очищает окно вывода логов."""
@@ -163,7 +369,101 @@ class OSIAssistantApp(tk.Tk):
         self.output.configure(state="disabled")
 
 
+class PreviewWindow(tk.Toplevel):
+    """Окно просмотра изменений ведомости по квартирам (было -> стало) с записью без пересчёта"""
+
+    def __init__(self, app: OSIAssistantApp, assistant):
+        """
+        Args:
+            app (OSIAssistantApp): Главное окно.
+            assistant (statement.Assistant): Помощник после `preview()`.
+        """
+        super().__init__(app)
+        self.app = app
+        self.assistant = assistant
+        changes = assistant.preview_result
+        self.title(f"Просмотр: {assistant.name_ved}")
+
+        reconciliation = assistant.reconciliation
+        summary = (f"Платежей: {len(changes.allocations)}, квартир: {len(changes.apartments)}, "
+                   f"ячеек: {changes.cells}. {reconciliation.message() if reconciliation else ''}")
+        tk.Label(self, text=summary, anchor="w", justify="left", wraplength=600).pack(fill="x", padx=5, pady=5)
+
+        tree_frame = tk.Frame(self)
+        tree_frame.pack(fill="both", expand=True, padx=5)
+        tree = ttk.Treeview(tree_frame, columns=("cell", "old", "new"), height=20)
+        tree.heading("#0", text="Квартира / ячейка")
+        tree.heading("cell", text="Лист, ячейка")
+        tree.heading("old", text="Было")
+        tree.heading("new", text="Стало")
+        tree.column("#0", width=200)
+        tree.column("cell", width=180)
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        for kv, kv_changes in changes.apartments.items():
+            node = tree.insert("", tk.END, text=f"кв {kv}", values=("", "", f"ячеек: {len(kv_changes)}"))
+            for change in kv_changes:
+                tree.insert(node, tk.END, text=change.label,
+                            values=(f"{change.sheet} {change.coordinate}", self._format(change.old),
+                                    self._format(change.new)))
+        for change in changes.other:
+            tree.insert("", tk.END, text=change.label,
+                        values=(f"{change.sheet} {change.coordinate}", self._format(change.old),
+                                self._format(change.new)))
+
+        buttons = tk.Frame(self)
+        buttons.pack(fill="x", padx=5, pady=5)
+        self.commit_button = tk.Button(buttons, text="Записать в ведомость", command=self.commit,
+                                       state="normal" if changes.cells else "disabled")
+        self.commit_button.pack(side="left")
+        tk.Button(buttons, text="Закрыть", command=self.destroy).pack(side="right")
+
+    @staticmethod
+    def _format(value) -> str:
+        return "—" if value is None else str(value)
+
+    def commit(self) -> None:
+        """Записывает изменения, рассчитанные при просмотре."""
+        self.app.commit_preview(self.assistant)
+        self.destroy()
+
+
+def startup_check(app: OSIAssistantApp, path=None) -> dict:
+    """
+    Замер запуска: окно отрисовывается и закрывается, результат пишется в JSON-файл (или в stdout).
+
+    Args:
+        app (OSIAssistantApp): Созданное окно.
+        path (str | None): Файл для результата (в exe без консоли stdout недоступен).
+
+    Returns:
+        dict: Время до появления окна, количество загруженных модулей и загружен ли openpyxl.
+    """
+    app.update()
+    report = {
+        "window_seconds": round(perf_counter() - STARTED, 3),
+        "modules": len(sys.modules),
+        "openpyxl_loaded": "openpyxl" in sys.modules,
+    }
+    app.destroy()
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file)
+    elif sys.stdout is not None:
+        print(json.dumps(report))
+    return report
+
+
 if __name__ == "__main__":
+    # Нужно для процессов чтения файлов банка в exe (PyInstaller)
+    multiprocessing.freeze_support()
     # При запуске из IDE → DEBUG, при запуске из exe → INFO
     app = OSIAssistantApp(default_level=logging.DEBUG)
-    app.mainloop()
+    if STARTUP_CHECK_ARG in sys.argv:
+        arguments = sys.argv[sys.argv.index(STARTUP_CHECK_ARG) + 1:]
+        startup_check(app, arguments[0] if arguments else None)
+    else:
+        app.mainloop()
@@ -0,0 +1,300 @@
+"""
+Журнал записанных платежей банка (SQLite рядом с ведомостью: `<ведомость>.ledger.sqlite3`).
+
+Каждый платёж получает стабильный идентификатор — отпечаток квартиры, суммы, даты и времени
+(с номером повтора для одинаковых платежей в одном файле), поэтому одна и та же операция
+в разных выгрузках банка (расширенной, пересекающейся) распознаётся как уже записанная.
+Для каждой записи хранятся хэш и имя файла банка и номер строки, для каждого запуска — набор изменений.
+
+Кроме того, журнал хранит историю для запросов без загрузки ведомости (`cli.py history`):
+- `allocations` — как распределён каждый записанный платёж квартиры за дату
+  (погашено долга за прошлый год, оплаченные месяцы);
+- `balances` — строки квартир листа "список как должн" после последнего запуска
+  (взнос, долг за прошлый год и его оплата, суммы по месяцам).
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import sqlite3
+from time import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SUFFIX = '.ledger.sqlite3'
+QUERY_CHUNK = 500  # параметров в одном запросе IN (...)
+
+
+class HistoryEntry(NamedTuple):
+    """Платёж квартиры из журнала"""
+    kv: str
+    date: str  # ГГГГ.ММ.ДД
+    time: str  # дата и время как в файле банка
+    summ: float
+    source: str  # имя файла банка
+    row: int  # строка в файле банка
+    # распределение платежей квартиры за дату (они записываются в ведомость одной суммой) — у первого из них,
+    # у остальных платежей той же даты 0 и ''
+    debt: float  # погашено долга за прошлый год
+    months: str  # оплаченный период ('' — в месяцы не попало, None — платёж не записан в ведомость)
+    run_id: int
+
+
+class Balance(NamedTuple):
+    """Строка квартиры на листе "список как должн" после последнего запуска"""
+    kv: str
+    fee: float  # ежемесячный взнос
+    debt: float  # долг за прошлый год
+    debt_paid: float  # оплата долга за прошлый год
+    months: list  # пары (название месяца, сумма)
+    run_id: int
+    updated: float  # время запуска
+
+    @property
+    def debt_left(self) -> float:
+        """Остаток долга за прошлый год."""
+        return max(self.debt - self.debt_paid, 0)
+
+    @property
+    def paid(self) -> float:
+        """Оплачено по месяцам."""
+        return sum(summ for _, summ in self.months if isinstance(summ, (int, float)))
+
+    def to_dict(self) -> dict:
+        data = self._asdict()
+        data['months'] = [list(month) for month in self.months]  # названия могут повторяться (январь)
+        data.update(debt_left=self.debt_left, paid=self.paid)
+        return data
+
+
+def normalize_date(date: str) -> str:
+    """'2025-01-31', '2025.01.31', '31.01.2025' -> '2025.01.31' (формат дат журнала)."""
+    parts = date.strip().replace('-', '.').replace('/', '.').split('.')
+    if len(parts) == 3 and len(parts[2]) == 4:
+        parts.reverse()
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f'Дата "{date}" не в формате ГГГГ.ММ.ДД')
+    return f'{int(parts[0]):04d}.{int(parts[1]):02d}.{int(parts[2]):02d}'
+
+
+def transaction_ids(records) -> list:
+    """
+    Стабильные идентификаторы платежей одного файла банка.
+
+    Args:
+        records: Платежи `bank_xlsx.Payment` в порядке строк файла.
+
+    Returns:
+        list[str]: Идентификаторы в том же порядке.
+    """
+    seen = {}
+    ids = []
+    for record in records:
+        fingerprint = f'{record.kv}|{record.summ}|{record.date}|{record.time}'
+        seen[fingerprint] = seen.get(fingerprint, 0) + 1
+        ids.append(hashlib.sha1(f'{fingerprint}|{seen[fingerprint]}'.encode('utf-8')).hexdigest())
+    return ids
+
+
+def _chunks(items: list):
+    for start in range(0, len(items), QUERY_CHUNK):
+        yield items[start:start + QUERY_CHUNK]
+
+
+class PaymentsLedger:
+    """Журнал записанных в ведомость платежей"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Файл базы SQLite.
+        """
+        self.path = path
+        with self._connect() as connection:
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created REAL NOT NULL,
+                    ved TEXT NOT NULL,
+                    bank TEXT NOT NULL,
+                    transactions INTEGER NOT NULL,
+                    changes TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id TEXT PRIMARY KEY,
+                    run_id INTEGER NOT NULL REFERENCES runs(id),
+                    file_hash TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    kv TEXT NOT NULL,
+                    summ REAL NOT NULL,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS transactions_date_kv ON transactions (date, kv);
+                CREATE TABLE IF NOT EXISTS allocations (
+                    run_id INTEGER NOT NULL REFERENCES runs(id),
+                    kv TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    summ REAL NOT NULL,
+                    debt REAL NOT NULL,
+                    months TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS allocations_kv_date ON allocations (kv, date);
+                CREATE TABLE IF NOT EXISTS balances (
+                    kv TEXT PRIMARY KEY,
+                    run_id INTEGER NOT NULL REFERENCES runs(id),
+                    fee REAL NOT NULL,
+                    debt REAL NOT NULL,
+                    debt_paid REAL NOT NULL,
+                    months TEXT NOT NULL
+                );
+            ''')
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(transactions)')}
+            if 'source' not in columns:  # журнал, созданный до хранения имени файла банка
+                connection.execute("ALTER TABLE transactions ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+            connection.execute('CREATE INDEX IF NOT EXISTS transactions_kv_date ON transactions (kv, date)')
+
+    @classmethod
+    def for_ved(cls, path_ved: str) -> "PaymentsLedger":
+        """Журнал, который хранится рядом с ведомостью."""
+        return cls(f'{path_ved}{LEDGER_SUFFIX}')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Соединение с базой: транзакция фиксируется и соединение закрывается на выходе."""
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def known(self, ids: list) -> set:
+        """Идентификаторы, которые уже есть в журнале."""
+        found = set()
+        with self._connect() as connection:
+            for chunk in _chunks(list(ids)):
+                placeholders = ','.join('?' * len(chunk))
+                found.update(row[0] for row in connection.execute(
+                    f'SELECT id FROM transactions WHERE id IN ({placeholders})', chunk))
+        return found
+
+    def known_dates(self, dates) -> set:
+        """Пары (квартира, дата), платежи за которые уже записаны через журнал."""
+        found = set()
+        with self._connect() as connection:
+            for chunk in _chunks(sorted(set(dates))):
+                placeholders = ','.join('?' * len(chunk))
+                found.update(connection.execute(
+                    f'SELECT DISTINCT kv, date FROM transactions WHERE date IN ({placeholders})', chunk))
+        return found
+
+    def record_run(self, path_ved: str, path_bank: str, transactions: list, changes: list, allocations=(),
+                   state=None, sources=None) -> int:
+        """
+        Сохраняет запуск: новые платежи, набор изменений ведомости и историю для запросов.
+
+        Args:
+            path_ved (str): Ведомость.
+            path_bank (str): Файл (файлы) банка.
+            transactions (list): Тройки (идентификатор, хэш файла банка, Payment).
+            changes (list): Изменения `allocation.Change`.
+            allocations: Распределение записанных платежей `allocation.Allocation`.
+            state (VedState | None): Состояние ведомости после распределения (остатки квартир).
+            sources (dict | None): {хэш файла банка: имя файла}.
+
+        Returns:
+            int: Номер запуска.
+        """
+        sources = sources if sources is not None else {}
+        with self._connect() as connection:
+            run_id = connection.execute(
+                'INSERT INTO runs (created, ved, bank, transactions, changes) VALUES (?, ?, ?, ?, ?)',
+                (time(), path_ved, path_bank, len(transactions),
+                 json.dumps([list(change) for change in changes], ensure_ascii=False, default=str))).lastrowid
+            connection.executemany(
+                'INSERT OR IGNORE INTO transactions (id, run_id, file_hash, row, kv, summ, date, time, source) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(transaction_id, run_id, file_hash, record.row, record.kv, record.summ, record.date, record.time,
+                  sources.get(file_hash, path_bank))
+                 for transaction_id, file_hash, record in transactions])
+            connection.executemany(
+                'INSERT INTO allocations (run_id, kv, date, summ, debt, months) VALUES (?, ?, ?, ?, ?, ?)',
+                [(run_id, item.kv, item.date, item.summ, item.debt, item.months) for item in allocations])
+            if state is not None:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO balances (kv, run_id, fee, debt, debt_paid, months) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(kv, run_id, row.fee, row.debt, row.debt_paid,
+                      json.dumps([[str(name), summ] for name, summ in zip(state.month_names, row.months)],
+                                 ensure_ascii=False, default=str))
+                     for kv, row in state.ledger.items()])
+        return run_id
+
+    def history(self, kv=None, since=None, until=None) -> list:
+        """
+        Платежи из журнала с оплаченными периодами.
+
+        Args:
+            kv (str | int | None): Квартира (по умолчанию все).
+            since (str | None): Начальная дата ГГГГ.ММ.ДД (включительно).
+            until (str | None): Конечная дата ГГГГ.ММ.ДД (включительно).
+
+        Returns:
+            list[HistoryEntry]: Платежи по дате и времени.
+        """
+        conditions, parameters = [], []
+        if kv is not None:
+            conditions.append('t.kv = ?')
+            parameters.append(str(kv))
+        if since is not None:
+            conditions.append('t.date >= ?')
+            parameters.append(normalize_date(since))
+        if until is not None:
+            conditions.append('t.date <= ?')
+            parameters.append(normalize_date(until))
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT t.kv, t.date, t.time, t.summ, t.source, t.row, COALESCE(a.debt, 0), a.months, t.run_id '
+                'FROM transactions t LEFT JOIN allocations a '
+                'ON a.run_id = t.run_id AND a.kv = t.kv AND a.date = t.date '
+                f'{where} ORDER BY t.date, t.time, t.kv, t.row', parameters).fetchall()
+        history = []
+        allocated = set()  # (запуск, квартира, дата), распределение которых уже выведено
+        for row in rows:
+            entry = HistoryEntry(*row)
+            key = (entry.run_id, entry.kv, entry.date)
+            if entry.months is not None and key in allocated:
+                entry = entry._replace(debt=0, months='')
+            allocated.add(key)
+            history.append(entry)
+        return history
+
+    def balances(self, kv=None, debtors=False) -> list:
+        """
+        Остатки квартир после последнего запуска.
+
+        Args:
+            kv (str | int | None): Квартира (по умолчанию все).
+            debtors (bool): Только квартиры с непогашенным долгом за прошлый год.
+
+        Returns:
+            list[Balance]: Остатки по номерам квартир.
+        """
+        query = 'SELECT b.kv, b.fee, b.debt, b.debt_paid, b.months, b.run_id, r.created ' \
+                'FROM balances b JOIN runs r ON r.id = b.run_id'
+        conditions, parameters = [], []
+        if kv is not None:
+            conditions.append('b.kv = ?')
+            parameters.append(str(kv))
+        if debtors:
+            conditions.append('b.debt > b.debt_paid')
+        if conditions:
+            query += f' WHERE {" AND ".join(conditions)}'
+        with self._connect() as connection:
+            rows = connection.execute(query, parameters).fetchall()
+        balances = [Balance(kv, fee, debt, debt_paid, [tuple(month) for month in json.loads(months)], run_id, updated)
+                    for kv, fee, debt, debt_paid, months, run_id, updated in rows]
+        return sorted(balances, key=lambda balance: int(balance.kv) if balance.kv.isdigit() else 0)
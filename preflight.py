@@ -0,0 +1,166 @@
+"""
+Быстрая проверка файлов перед обработкой (до загрузки книг).
+
+Проверяется то, из-за чего обработка раньше падала только в конце или на середине:
+- ведомость существует, это xlsx, файл доступен для записи и не открыт в Excel/LibreOffice;
+- в ведомости есть листы "оплата" и "список как должн" (по карте листов архива),
+  на листе "список как должн" есть строка с названиями месяцев, а количество квартир
+  совпадает с указанным (по первым строкам листа);
+- файл банка имеет известный формат (`bank.formats`) и в первой строке платежей
+  есть назначение с полями через ";".
+
+Все проверки читают только заголовки и первые строки, поэтому занимают миллисекунды.
+"""
+import csv
+import logging
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+
+import allocation
+import bank_xlsx
+import layout
+import ved_reader
+import xlsx_patch
+from bank import formats
+
+logger = logging.getLogger(__name__)
+
+BANK_PEEK_ROWS = 3  # заголовок, итоговая сумма и первый платёж
+MAX_APARTMENTS = 2000  # строк квартир, которые читает count_apartments без указанного количества
+
+
+class PreflightError(Exception):
+    """Файлы не прошли предварительную проверку"""
+
+    def __init__(self, problems: list):
+        self.problems = problems
+        super().__init__(problems)  # args = (problems,): исключение передаётся из процесса пула (pickle)
+
+    def __str__(self) -> str:
+        return '\n'.join(self.problems)
+
+
+def lock_files(path: str) -> list:
+    """Файлы-блокировки, которые Excel (~$имя) и LibreOffice (.~lock.имя#) создают рядом с открытой книгой."""
+    directory, name = os.path.split(os.path.abspath(path))
+    # Excel добавляет "~$" к полному имени книги (замена первых двух символов имени — правило Word,
+    # для книг Excel она давала ложные срабатывания на чужие файлы "~$...")
+    candidates = [f'~${name}', f'.~lock.{name}#']
+    return [os.path.join(directory, candidate) for candidate in candidates
+            if os.path.exists(os.path.join(directory, candidate))]
+
+
+def check_writable(path_ved: str) -> list:
+    """Ведомость существует, доступна для записи и не открыта в другой программе."""
+    name = os.path.basename(path_ved)
+    if not os.path.isfile(path_ved):
+        return [f'Файл ведомости "{name}" не найден']
+    if lock_files(path_ved):
+        return [f'Ошибка! Вы не закрыли файл "{name}"']
+    try:
+        with open(path_ved, 'r+b'):  # в Windows открытый в Excel файл не открывается на запись
+            pass
+    except PermissionError:
+        return [f'Ошибка! Вы не закрыли файл "{name}" (или нет прав на запись)']
+    if not os.access(os.path.dirname(os.path.abspath(path_ved)), os.W_OK):
+        return [f'Нет прав на запись в папку ведомости "{name}"']
+    return []
+
+
+def count_apartments(path_ved: str, limit=MAX_APARTMENTS):
+    """
+    Количество квартир в ведомости: строки с номером квартиры подряд после строки месяцев
+    на листе "список как должн" (читаются только первые строки листа).
+
+    Args:
+        path_ved (str): Путь к ведомости.
+        limit (int): Сколько строк квартир читать не больше.
+
+    Returns:
+        int | None: Количество квартир или None, если строка месяцев не найдена.
+    """
+    ledger = ved_reader.peek_sheet(path_ved, allocation.LEDGER_SHEET, max_row=layout.HEADER_SCAN_ROWS + limit,
+                                   max_col=layout.HEADER_SCAN_COLUMNS)
+    header_row, first_month = layout.ledger_header(ledger)
+    if header_row is None:
+        return None
+
+    kv_column = layout.KV_COLUMN + first_month - allocation.LEDGER_FIRST_MONTH_COLUMN
+    found = 0
+    for row in range(header_row + 1, ledger.max_row + 1):
+        value = ledger.value(row, kv_column)
+        if not isinstance(value, (int, float)) and not str(value).isdigit():
+            break
+        found += 1
+    return found
+
+
+def check_ved(path_ved: str, kv_quantity: int) -> list:
+    """Листы ведомости, строка месяцев и количество квартир."""
+    name = os.path.basename(path_ved)
+    if not zipfile.is_zipfile(path_ved):
+        return [f'Файл ведомости "{name}" не является книгой xlsx']
+    with zipfile.ZipFile(path_ved) as archive:
+        try:
+            sheets = xlsx_patch.sheet_parts(archive)
+        except (KeyError, ET.ParseError) as exc:
+            return [f'Не удалось прочитать список листов ведомости "{name}": {exc}']
+    missing = [sheet for sheet in (allocation.PAYMENT_SHEET, allocation.LEDGER_SHEET) if sheet not in sheets]
+    if missing:
+        return [f'В ведомости "{name}" нет листов: {", ".join(missing)}']
+
+    found = count_apartments(path_ved, kv_quantity + 1)
+    if found is None:
+        return [f'На листе "{allocation.LEDGER_SHEET}" ведомости "{name}" не найдена строка с названиями месяцев']
+    if found != kv_quantity:
+        return [f'В ведомости "{name}" квартир: {found}, указано: {kv_quantity}']
+    return []
+
+
+def check_bank(path_bank: str) -> list:
+    """Формат файла банка и первая строка платежей."""
+    name = os.path.basename(path_bank)
+    if not os.path.isfile(path_bank):
+        return [f'Файл банка "{name}" не найден']
+    try:
+        bank_format = formats.detect(path_bank)
+    except formats.UnknownFormat as exc:
+        return [str(exc)]
+
+    if isinstance(bank_format, formats.XlsxFormat):
+        try:
+            rows = list(ved_reader.peek_sheet(path_bank, max_row=BANK_PEEK_ROWS, max_col=5)
+                        .iter_rows(min_row=BANK_PEEK_ROWS, max_row=BANK_PEEK_ROWS, min_col=2, max_col=5))
+        except (KeyError, zipfile.BadZipFile) as exc:
+            return [f'Не удалось прочитать файл банка "{name}": {exc}']
+        purpose = rows[0][0]
+    else:
+        statement = bank_format.statement(path_bank, name)
+        with open(path_bank, encoding=statement.encoding, newline='') as file:
+            rows = [row for _, row in zip(range(BANK_PEEK_ROWS), csv.reader(file, delimiter=statement.delimiter))]
+        fields = rows[-1] if len(rows) == BANK_PEEK_ROWS else []
+        purpose = (fields[1] or None) if len(fields) > 1 else None
+
+    if purpose is None:
+        return []  # выписка без платежей
+    if not isinstance(purpose, str) or len(purpose.split(';')) <= bank_xlsx.KV_FIELD:
+        return [f'Файл от банка "{name}" выбран не верно: в строке {BANK_PEEK_ROWS} нет назначения платежа '
+                f'с номером квартиры']
+    return []
+
+
+def preflight(path_ved: str, paths_bank: list, kv_quantity: int) -> None:
+    """
+    Проверяет ведомость и файлы банка.
+
+    Raises:
+        PreflightError: Со списком всех найденных проблем.
+    """
+    problems = check_writable(path_ved)
+    if not problems:
+        problems = check_ved(path_ved, kv_quantity)
+    for path_bank in paths_bank:
+        problems.extend(check_bank(path_bank))
+    if problems:
+        raise PreflightError(problems)
@@ -0,0 +1,123 @@
+"""
+Предварительный просмотр изменений ведомости (без сохранения).
+
+`build` сопоставляет набор изменений `allocation.Change` со старыми значениями ячеек
+загруженной книги и группирует их по квартирам: для каждой квартиры — список
+`CellChange` (лист, ячейка, что это за ячейка, было -> стало).
+"""
+from typing import NamedTuple
+
+import allocation
+from layout import MONTHS
+from xlsx_patch import column_letter
+
+PAYMENT_LABELS = {
+    allocation.PAYMENT_DATE_COLUMN: 'дата оплаты',
+    allocation.PAYMENT_PERIOD_COLUMN: 'период',
+    allocation.PAYMENT_SUMM_COLUMN: 'сумма оплаты',
+}
+
+
+class CellChange(NamedTuple):
+    """Изменение ячейки: старое и новое значение"""
+    sheet: str
+    row: int
+    col: int
+    label: str  # что записано в ячейке ('июль: сумма оплаты', 'оплата долга', 'март')
+    old: object
+    new: object
+
+    @property
+    def coordinate(self) -> str:
+        return f'{column_letter(self.col)}{self.row}'
+
+
+def _format(value) -> str:
+    if value is None:
+        return '—'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class ChangePreview:
+    """Изменения ведомости по квартирам"""
+
+    def __init__(self, apartments: dict, other: list, allocations: list):
+        """
+        Args:
+            apartments (dict): {квартира: [CellChange]} в порядке номеров квартир.
+            other (list): Изменения ячеек, не относящихся к строкам квартир.
+            allocations (list): Распределение платежей `allocation.Allocation`.
+        """
+        self.apartments = apartments
+        self.other = other
+        self.allocations = allocations
+
+    @property
+    def cells(self) -> int:
+        """Количество изменяемых ячеек."""
+        return sum(len(changes) for changes in self.apartments.values()) + len(self.other)
+
+    def lines(self) -> list:
+        """Текстовое представление: квартира и её ячейки 'было -> стало'."""
+        lines = []
+        for kv, changes in self.apartments.items():
+            lines.append(f'кв {kv}:')
+            lines.extend(f'    {change.sheet} {change.coordinate} ({change.label}): '
+                         f'{_format(change.old)} -> {_format(change.new)}' for change in changes)
+        for change in self.other:
+            lines.append(f'{change.sheet} {change.coordinate}: {_format(change.old)} -> {_format(change.new)}')
+        return lines
+
+    def to_dict(self) -> dict:
+        return {
+            'cells': self.cells,
+            'apartments': {kv: [change._asdict() for change in changes] for kv, changes in self.apartments.items()},
+            'other': [change._asdict() for change in self.other],
+            'allocations': [item._asdict() for item in self.allocations],
+        }
+
+
+def build(changes: list, workbook, index, state, allocations=()) -> ChangePreview:
+    """
+    Собирает просмотр изменений до их записи в книгу.
+
+    Args:
+        changes (list): Изменения `allocation.Change`.
+        workbook: Загруженная ведомость (книга openpyxl или `ved_reader.VedSheets`) со старыми значениями.
+        index (SheetIndex): Строки квартир.
+        state (VedState): Состояние ведомости (столбцы и названия месяцев листа "список как должн").
+        allocations: Распределение платежей `allocation.Allocation`.
+
+    Returns:
+        ChangePreview: Изменения по квартирам.
+    """
+    rows = {(allocation.LEDGER_SHEET, row): (kv, None) for kv, row in index.ledger_rows.items()}
+    for month, block in index.payment_rows.items():
+        rows.update({(allocation.PAYMENT_SHEET, row): (kv, month) for kv, row in block.items()})
+
+    columns = state.columns
+    apartments = {}
+    other = []
+    for change in changes:
+        old = workbook[change.sheet].cell(row=change.row, column=change.col).value
+        kv, month = rows.get((change.sheet, change.row), (None, None))
+        if change.sheet == allocation.PAYMENT_SHEET:
+            label = f'{MONTHS.get(month, month)}: {PAYMENT_LABELS.get(change.col, column_letter(change.col))}'
+        elif change.col == columns.debt_paid:
+            label = 'оплата долга'
+        elif columns.first_month <= change.col <= columns.last_month:
+            label = str(state.month_names[change.col - columns.first_month])
+        else:
+            label = column_letter(change.col)
+        cell_change = CellChange(change.sheet, change.row, change.col, label, old, change.value)
+        if kv is None:
+            other.append(cell_change)
+        else:
+            apartments.setdefault(kv, []).append(cell_change)
+
+    ordered = dict(sorted(apartments.items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0))
+    for kv_changes in ordered.values():
+        kv_changes.sort(key=lambda item: (item.sheet != allocation.PAYMENT_SHEET, item.row, item.col))
+    return ChangePreview(ordered, other, list(allocations))
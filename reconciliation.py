@@ -0,0 +1,96 @@
+"""
+Сверка сумм из файла банка с листом "оплата" по состоянию ведомости в памяти.
+
+Не перечитывает файл ведомости: используются суммы блока месяца
+после распределения платежей (`allocation.VedState`).
+"""
+from typing import NamedTuple
+
+
+class Discrepancy(NamedTuple):
+    """Расхождение по квартире"""
+    kv: str
+    month: str
+    bank: float  # сумма по файлу банка
+    recorded: float  # сумма на листе "оплата"
+
+
+class Reconciliation:
+    """Результат сверки файла банка и листа "оплата" """
+
+    def __init__(self, expected, recorded, discrepancies: list):
+        """
+        Args:
+            expected: Итоговая сумма из файла банка.
+            recorded: Сумма блоков месяцев на листе "оплата".
+            discrepancies (list[Discrepancy]): Расхождения по квартирам.
+        """
+        self.expected = expected
+        self.recorded = recorded
+        self.discrepancies = discrepancies
+
+    @property
+    def difference(self):
+        """Разница: сумма банка минус сумма на листе "оплата"."""
+        return self.expected - self.recorded
+
+    @property
+    def is_ok(self) -> bool:
+        return self.difference == 0
+
+    def message(self) -> str:
+        """Текстовый итог сверки."""
+        if self.difference == 0:
+            return 'Оплаты всех квартир занесены верно'
+        elif self.difference > 0:
+            return f'В листе "оплата" не хватает суммы {self.difference}'
+        return f'В листе "оплата" сумма больше на {self.difference * (-1)}'
+
+    def to_dict(self) -> dict:
+        """Результат сверки в виде словаря (для JSON)."""
+        return {
+            'expected': self.expected,
+            'recorded': self.recorded,
+            'difference': self.difference,
+            'discrepancies': [item._asdict() for item in self.discrepancies],
+        }
+
+
+def _sort_key(key: tuple) -> tuple:
+    month, kv = key
+    return month, int(kv) if kv.isdigit() else 0, kv
+
+
+def reconcile(state, payments, expected) -> Reconciliation:
+    """
+    Сверяет платежи банка с листом "оплата".
+
+    Args:
+        state (allocation.VedState): Состояние ведомости после распределения.
+        payments: Все платежи файла банка (`bank_xlsx.Payment`).
+        expected: Итоговая сумма из файла банка (None — считается 0).
+
+    Returns:
+        Reconciliation: Результат сверки.
+    """
+    bank_by_kv = {}
+    for payment in payments:
+        key = (payment.date.split('.')[1], payment.kv)
+        bank_by_kv[key] = bank_by_kv.get(key, 0) + payment.summ
+
+    recorded = 0
+    recorded_by_kv = {}
+    for month in sorted({month for month, _ in bank_by_kv}):
+        for kv, payment_row in state.payment_rows.get(month, {}).items():
+            summ = payment_row.summ if payment_row.summ is not None else 0
+            recorded += summ
+            recorded_by_kv[(month, kv)] = summ
+
+    discrepancies = []
+    for (month, kv) in sorted(set(bank_by_kv) | set(recorded_by_kv), key=_sort_key):
+        bank = bank_by_kv.get((month, kv), 0)
+        summ = recorded_by_kv.get((month, kv), 0)
+        if bank != summ:
+            discrepancies.append(Discrepancy(kv, month, bank, summ))
+
+    return Reconciliation(expected if expected is not None else 0, recorded, discrepancies)
@@ -0,0 +1,432 @@
+"""
+Локальный HTTP-сервис обработки ведомостей (только стандартная библиотека).
+
+Один запущенный сервис заменяет несколько копий программы на общих файлах:
+модули обработки загружаются один раз в процессах пула, задания одной ведомости
+выполняются по очереди (блокировка по пути ведомости), разных ведомостей — параллельно.
+
+Запросы и ответы — JSON:
+    GET  /health                  — сервис работает;
+    GET  /metrics                 — счётчики заданий, время обработки, очередь, занятые ведомости;
+    POST /jobs                    — задание {"ved": ..., "bank": ... | [...], "kv": 60,
+                                    "writer": "openpyxl" | "patch", "dry_run": false} -> 202 {"id": ...};
+    GET  /jobs                    — все задания;
+    GET  /jobs/<id>?wait=<сек>    — состояние и результат задания (wait — дождаться завершения);
+    PUT  /files/<имя>             — загрузка файла (тело запроса) в папку загрузок;
+    GET  /files/<имя>             — скачивание файла из папки загрузок (например, обработанной ведомости).
+
+Относительные пути ved и bank в задании считаются именами файлов в папке загрузок.
+"""
+import contextlib
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import bank_cache
+import statement
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_WAIT = 300  # секунд ожидания в GET /jobs/<id>?wait=
+
+
+class RequestError(ValueError):
+    """Неверный запрос (ответ 400)"""
+
+
+def run_request(request: dict) -> dict:
+    """
+    Выполняет задание в процессе пула, исключения не пробрасывает.
+
+    Args:
+        request (dict): Проверенное задание (`Service.validate`).
+
+    Returns:
+        dict: Сохранена ли ведомость, ошибка, сверка, замеры и (для dry_run) изменения по квартирам.
+    """
+    options = dict(writer=request['writer'], concurrent_loading=False)
+    assistant = None
+    saved = False
+    changes = None
+    error = None
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # print() модулей обработки — в лог сервиса
+            if len(request['bank']) > 1:
+                assistant = statement.BatchAssistant(request['ved'], request['bank'], request['kv'], 1, **options)
+            else:
+                assistant = statement.Assistant(request['ved'], request['bank'][0], request['kv'], **options)
+            if request['dry_run']:
+                changes = assistant.preview().to_dict()
+            else:
+                saved = assistant.launch()
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+    reconciliation = assistant.reconciliation if assistant is not None else None
+    return {
+        'saved': saved,
+        'error': error,
+        'reconciliation': reconciliation.to_dict() if reconciliation is not None else None,
+        'changes': changes,
+        'report': assistant.report.to_dict() if assistant is not None else None,
+    }
+
+
+class ServiceJob:
+    """Задание сервиса"""
+
+    def __init__(self, job_id: str, request: dict):
+        self.id = job_id
+        self.request = request
+        self.status = 'queued'  # queued, running, done, failed
+        self.created = time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.completed = threading.Event()
+
+    @property
+    def ved_key(self) -> str:
+        return os.path.normcase(os.path.realpath(self.request['ved']))
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'request': self.request,
+            'created': datetime.fromtimestamp(self.created).isoformat(timespec='seconds'),
+            'wait_seconds': round((self.started or time()) - self.created, 3),
+            'run_seconds': round((self.finished or time()) - self.started, 3) if self.started else None,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class Service:
+    """Очередь заданий, пул процессов и блокировки ведомостей"""
+
+    def __init__(self, workers=None, upload_dir=None):
+        """
+        Args:
+            workers (int | None): Количество процессов (по умолчанию — число доступных ядер).
+            upload_dir (str | None): Папка загрузок (по умолчанию `<кэш>/uploads`, см. `bank_cache.cache_dir`).
+        """
+        self.workers = workers or bank_cache.usable_cpus()
+        self.upload_dir = upload_dir or os.path.join(bank_cache.cache_dir(), 'uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.started = monotonic()
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.jobs = {}  # {id: ServiceJob}
+        self._queue = []  # задания, ждущие процесса или своей ведомости
+        self._busy = set()  # ведомости выполняемых заданий
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def upload_path(self, name: str) -> str:
+        """Путь файла в папке загрузок (имя без каталогов)."""
+        name = os.path.basename(unquote(name))
+        if not name or name in ('.', '..'):
+            raise RequestError('Не указано имя файла')
+        return os.path.join(self.upload_dir, name)
+
+    def _resolve(self, path) -> str:
+        if not isinstance(path, str) or not path:
+            raise RequestError(f'Неверный путь к файлу: {path!r}')
+        path = path if os.path.isabs(path) else self.upload_path(path)
+        if not os.path.isfile(path):
+            raise RequestError(f'Файл не найден: {path}')
+        return path
+
+    def validate(self, data) -> dict:
+        """
+        Проверяет задание.
+
+        Raises:
+            RequestError: Если задание неверное.
+        """
+        if not isinstance(data, dict):
+            raise RequestError('Задание должно быть объектом JSON')
+        missing = [field for field in ('ved', 'bank', 'kv') if field not in data]
+        if missing:
+            raise RequestError(f'В задании нет полей: {", ".join(missing)}')
+        banks = data['bank'] if isinstance(data['bank'], list) else [data['bank']]
+        if not banks:
+            raise RequestError('Не указан файл банка')
+        try:
+            kv = int(data['kv'])
+        except (TypeError, ValueError):
+            raise RequestError(f'Неверное количество квартир: {data["kv"]!r}') from None
+        writer = data.get('writer', 'openpyxl')
+        if writer not in statement.WRITERS:
+            raise RequestError(f'Неизвестный способ сохранения: {writer}')
+        return {
+            'ved': self._resolve(data['ved']),
+            'bank': [self._resolve(path) for path in banks],
+            'kv': kv,
+            'writer': writer,
+            'dry_run': bool(data.get('dry_run', False)),
+        }
+
+    def submit(self, data) -> ServiceJob:
+        """Ставит задание в очередь."""
+        request = self.validate(data)
+        with self._lock:
+            job = ServiceJob(str(next(self._ids)), request)
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            started = self._dispatch()
+        logger.info(f'Задание {job.id}: {os.path.basename(request["ved"])} в очереди')
+        self._start(started)
+        return job
+
+    def is_busy(self, path: str) -> bool:
+        """Ведомость обрабатывается или ждёт в очереди."""
+        key = os.path.normcase(os.path.realpath(path))
+        with self._lock:
+            return key in self._busy or any(job.ved_key == key for job in self._queue)
+
+    def _dispatch(self) -> list:
+        """
+        Выбирает задания для запуска: не больше workers одновременно и одно на ведомость (под self._lock).
+
+        Returns:
+            list[ServiceJob]: Задания, которые нужно отправить в пул (`_start`, уже без блокировки).
+        """
+        waiting = []
+        started = []
+        for job in self._queue:
+            if len(self._busy) >= self.workers or job.ved_key in self._busy:
+                waiting.append(job)
+                continue
+            self._busy.add(job.ved_key)
+            job.status = 'running'
+            job.started = time()
+            started.append(job)
+        self._queue = waiting
+        return started
+
+    def _start(self, jobs: list) -> None:
+        """
+        Отправляет задания в пул. Вызывается без self._lock: обратный вызов уже завершённого future
+        выполняется сразу и сам берёт блокировку.
+        """
+        pending = list(jobs)
+        while pending:
+            job = pending.pop(0)
+            try:
+                future = self.executor.submit(run_request, job.request)
+            except RuntimeError as exc:  # пул сломан (BrokenProcessPool) или остановлен
+                job.status = 'failed'
+                job.error = f'{type(exc).__name__}: {exc}'
+                pending.extend(self._complete(job))
+                continue
+            future.add_done_callback(lambda done, job=job: self._finished(job, done))
+
+    def _finished(self, job: ServiceJob, future) -> None:
+        try:
+            job.result = future.result()
+            if job.result['error'] is not None:
+                job.status = 'failed'
+                job.error = job.result['error']
+            elif job.result['saved'] or job.request['dry_run']:
+                job.status = 'done'
+            else:
+                job.status = 'failed'
+                job.error = 'Не удалось сохранить ведомость (файл открыт в другой программе?)'
+        except Exception as exc:
+            job.status = 'failed'
+            job.error = f'{type(exc).__name__}: {exc}'
+        self._start(self._complete(job))
+
+    def _complete(self, job: ServiceJob) -> list:
+        """
+        Освобождает ведомость завершённого задания.
+
+        Returns:
+            list[ServiceJob]: Задания очереди, которые теперь можно запустить.
+        """
+        job.finished = time()
+        with self._lock:
+            self._busy.discard(job.ved_key)
+            started = self._dispatch()
+        job.completed.set()
+        if job.status == 'done':
+            logger.info(f'Задание {job.id}: готово за {job.finished - job.started:.2f} сек.')
+        else:
+            logger.error(f'Задание {job.id}: {job.error}')
+        return started
+
+    def metrics(self) -> dict:
+        with self._lock:
+            jobs = list(self.jobs.values())
+            busy = len(self._busy)
+            queued = len(self._queue)
+        statuses = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        for job in jobs:
+            statuses[job.status] += 1
+        durations = [job.finished - job.started for job in jobs if job.finished and job.started]
+        return {
+            'uptime_seconds': round(monotonic() - self.started, 3),
+            'workers': self.workers,
+            'jobs': statuses,
+            'queue_length': queued,
+            'busy_veds': busy,
+            'run_seconds_avg': round(sum(durations) / len(durations), 3) if durations else None,
+            'run_seconds_max': round(max(durations), 3) if durations else None,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Обработчик запросов (сервис — `self.server.service`)"""
+
+    server_version = 'OSIService/1.0'
+
+    @property
+    def service(self) -> Service:
+        return self.server.service
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(f'{self.address_string()} {format % args}')
+
+    def _send(self, status: int, data) -> None:
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {'error': message})
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_UPLOAD_BYTES:
+            raise RequestError(f'Файл больше {MAX_UPLOAD_BYTES // 1024 // 1024} МБ')
+        return self.rfile.read(length)
+
+    def _route(self):
+        url = urlsplit(self.path)
+        return [part for part in url.path.split('/') if part], parse_qs(url.query)
+
+    def do_GET(self) -> None:
+        parts, query = self._route()
+        if parts == ['health']:
+            self._send(HTTPStatus.OK, {'ok': True})
+        elif parts == ['metrics']:
+            self._send(HTTPStatus.OK, self.service.metrics())
+        elif parts == ['jobs']:
+            self._send(HTTPStatus.OK, [job.to_dict() for job in list(self.service.jobs.values())])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.service.jobs.get(parts[1])
+            if job is None:
+                self._error(HTTPStatus.NOT_FOUND, f'Задание {parts[1]} не найдено')
+                return
+            try:
+                wait = min(float(query.get('wait', ['0'])[0]), MAX_WAIT)
+            except ValueError:
+                self._error(HTTPStatus.BAD_REQUEST, 'Неверное значение wait')
+                return
+            if wait > 0:
+                job.completed.wait(wait)
+            self._send(HTTPStatus.OK, job.to_dict())
+        elif len(parts) == 2 and parts[0] == 'files':
+            self._download(parts[1])
+        else:
+            self._error(HTTPStatus.NOT_FOUND, 'Неизвестный адрес')
+
+    def _download(self, name: str) -> None:
+        try:
+            path = self.service.upload_path(name)
+        except RequestError as exc:
+            self._error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        if not os.path.isfile(path):
+            self._error(HTTPStatus.NOT_FOUND, f'Файл {os.path.basename(path)} не найден')
+            return
+        if self.service.is_busy(path):
+            self._error(HTTPStatus.CONFLICT, f'Файл {os.path.basename(path)} сейчас обрабатывается')
+            return
+        with open(path, 'rb') as file:
+            body = file.read()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            self._error(HTTPStatus.NOT_FOUND, 'Неизвестный адрес')
+            return
+        try:
+            job = self.service.submit(json.loads(self._body() or b'null'))
+        except (RequestError, json.JSONDecodeError) as exc:
+            self._error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        self._send(HTTPStatus.ACCEPTED, {'id': job.id, 'status': job.status})
+
+    def do_PUT(self) -> None:
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'files':
+            self._error(HTTPStatus.NOT_FOUND, 'Неизвестный адрес')
+            return
+        try:
+            path = self.service.upload_path(parts[1])
+            body = self._body()
+        except RequestError as exc:
+            self._error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        if self.service.is_busy(path):  # ведомость пишет задание — не подменяем файл под ним
+            self._error(HTTPStatus.CONFLICT, f'Файл {os.path.basename(path)} сейчас обрабатывается')
+            return
+        temporary = f'{path}.upload'
+        with open(temporary, 'wb') as file:
+            file.write(body)
+        os.replace(temporary, path)
+        self._send(HTTPStatus.CREATED, {'name': os.path.basename(path), 'path': path, 'bytes': len(body)})
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, upload_dir=None) -> ThreadingHTTPServer:
+    """
+    Создаёт HTTP-сервер с сервисом (`server.service`); port=0 — свободный порт.
+
+    Returns:
+        ThreadingHTTPServer: Сервер (запуск — `serve_forever()`, остановка — `shutdown()` и `service.close()`).
+    """
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    httpd.service = Service(workers, upload_dir)
+    return httpd
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, upload_dir=None) -> None:
+    """Запускает сервис до Ctrl+C."""
+    httpd = make_server(host, port, workers, upload_dir)
+    logger.info(f'Сервис обработки ведомостей: http://{host}:{httpd.server_address[1]}/ '
+                f'(процессов: {httpd.service.workers}, загрузки: {httpd.service.upload_dir})')
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.service.close()
+        logger.info('Сервис остановлен')
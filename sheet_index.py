@@ -0,0 +1,111 @@
+"""
+Индекс строк квартир в ведомости.
+
+Строится один раз за запуск и заменяет линейный поиск квартиры:
+- на листе "оплата" — по каждому блоку месяца;
+- на листе "список как должн" — по строкам ведомости.
+
+При построении сообщает о повторяющихся и отсутствующих квартирах.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FIRST_ROW = 8  # первая строка квартир на листе "список как должн"
+KV_COLUMN = 2  # столбец с номером квартиры на листе "список как должн"
+
+
+class SheetIndex:
+    """Индекс: квартира -> строка для листов "оплата" и "список как должн" """
+
+    def __init__(self, kv_quantity: int):
+        """
+        Args:
+            kv_quantity (int): Количество квартир.
+        """
+        self.kv_quantity = kv_quantity
+        self.payment_rows = {}  # {месяц: {квартира: строка}}
+        self.ledger_rows = {}  # {квартира: строка}
+        self.duplicates = []  # (лист, месяц, квартира, строка)
+        self.missing = []  # (лист, месяц, квартира)
+        self.warnings = []  # сообщения о повторах и пропусках (для повторного вывода из кэша разметки)
+
+    @classmethod
+    def build(cls, sheet_payment, sheet_list, mon_coord_dict: dict, kv_quantity: int,
+              ledger_first_row=LEDGER_FIRST_ROW, kv_column=KV_COLUMN) -> "SheetIndex":
+        """
+        Строит индекс по листам ведомости.
+
+        Args:
+            sheet_payment: Лист "оплата".
+            sheet_list: Лист "список как должн".
+            mon_coord_dict (dict): {месяц: (строка, столбец)} начала блоков на листе "оплата".
+            kv_quantity (int): Количество квартир.
+            ledger_first_row (int): Первая строка квартир на листе "список как должн".
+            kv_column (int): Столбец с номером квартиры на листе "список как должн".
+
+        Returns:
+            SheetIndex: Построенный индекс.
+        """
+        index = cls(kv_quantity)
+
+        for month, (coord_row, coord_colu) in mon_coord_dict.items():
+            first_row = coord_row + 2
+            values = (row[0] for row in sheet_payment.iter_rows(
+                min_row=first_row, max_row=first_row + kv_quantity - 1,
+                min_col=coord_colu + 1, max_col=coord_colu + 1, values_only=True))
+            index.payment_rows[month] = index._collect('оплата', month, first_row, values)
+
+        values = (row[0] for row in sheet_list.iter_rows(
+            min_row=ledger_first_row, max_row=ledger_first_row + kv_quantity - 1,
+            min_col=kv_column, max_col=kv_column, values_only=True))
+        index.ledger_rows = index._collect('список как должн', None, ledger_first_row, values)
+
+        return index
+
+    def _collect(self, sheet_name: str, month, first_row: int, values) -> dict:
+        """Собирает {квартира: строка} для одного блока, запоминая повторы и пропуски."""
+        rows = {}
+        for row, value in enumerate(values, start=first_row):
+            if value is None:
+                continue
+            kv = str(value)
+            if kv in rows:
+                self.duplicates.append((sheet_name, month, kv, row))
+                self._warn(f'Лист "{sheet_name}"{self._month_label(month)}: квартира {kv} '
+                           f'повторяется в строке {row} (используется строка {rows[kv]})')
+                continue
+            rows[kv] = row
+
+        missing = [str(kv) for kv in range(1, self.kv_quantity + 1) if str(kv) not in rows]
+        if missing:
+            self.missing.extend((sheet_name, month, kv) for kv in missing)
+            self._warn(f'Лист "{sheet_name}"{self._month_label(month)}: '
+                       f'не найдены квартиры {", ".join(missing)}')
+        return rows
+
+    def _warn(self, message: str) -> None:
+        self.warnings.append(message)
+        logger.warning(message)
+
+    @staticmethod
+    def _month_label(month) -> str:
+        return f', месяц {month}' if month is not None else ''
+
+    def payment_row(self, month: str, kv: str):
+        """
+        Строка квартиры в блоке месяца на листе "оплата".
+
+        Returns:
+            int | None: Номер строки или None, если квартира не найдена.
+        """
+        return self.payment_rows.get(month, {}).get(kv)
+
+    def ledger_row(self, kv: str):
+        """
+        Строка квартиры на листе "список как должн".
+
+        Returns:
+            int | None: Номер строки или None, если квартира не найдена.
+        """
+        return self.ledger_rows.get(kv)
@@ -1,284 +1,358 @@
+import logging
+import sqlite3
+
 import openpyxl as op
 import bank_xlsx
+import bank_cache
+import payments_ledger
+from layout import LEDGER_MAX_COLUMN, load_layout
+import allocation
+import ved_io
+import ved_reader
+import os
+import preflight
+import preview
+from preflight import PreflightError
+import xlsx_patch
+from reconciliation import reconcile
+from instrumentation import RunReport
 
 from time import time
 
+logger = logging.getLogger(__name__)
+
+# Этапы обработки (для индикатора выполнения)
+STAGES = {
+    'preflight': 'Проверка файлов',
+    'loading': 'Загрузка ведомости',
+    'bank': 'Чтение файла банка',
+    'indexing': 'Поиск месяцев и квартир',
+    'allocating': 'Распределение платежей',
+    'saving': 'Сохранение ведомости',
+    'reconciling': 'Сверка сумм',
+}
+
+
+# Способы сохранения ведомости
+WRITERS = ('openpyxl', 'patch')
+
+
+class Cancelled(Exception):
+    """Обработка отменена пользователем (до сохранения ведомости)"""
+
 
 class Assistant:
     """Класс помощник"""
 
-    def __init__(self, path_ved: str, path_bank: str, kv_quantity: int):
+    def __init__(self, path_ved: str, path_bank: str, kv_quantity: int, progress=None, cancel_event=None,
+                 trace_memory=False, report_json=False, use_cache=True, use_ledger=True, writer='openpyxl',
+                 concurrent_loading=True, check_files=True):
+        """
+        :param path_ved: путь к ведомости
+        :param path_bank: путь к файлу банка
+        :param kv_quantity: колличесво квартир
+        :param progress: функция progress(stage), вызывается в начале каждого этапа из STAGES
+        :param cancel_event: threading.Event — отмена обработки до сохранения ведомости
+        :param trace_memory: замерять пиковую память этапов (tracemalloc, замедляет работу)
+        :param report_json: сохранить отчёт о замерах рядом с ведомостью (<ведомость>.report.json)
+        :param use_cache: брать разобранный файл банка (bank_cache) и разметку ведомости (layout) из кэша
+        :param use_ledger: вести журнал платежей рядом с ведомостью и записывать только новые платежи
+        :param writer: способ сохранения: 'openpyxl' — полное сохранение книги,
+                       'patch' — загрузка только нужных листов (ved_reader) и точечная запись изменённых ячеек
+                       (xlsx_patch), при ошибке — полное сохранение
+        :param concurrent_loading: разбирать файл банка в отдельном процессе, пока загружается ведомость
+        :param check_files: быстро проверить файлы до загрузки (preflight): ведомость не открыта в Excel,
+                            есть нужные листы, совпадает количество квартир, файл банка нужного формата
+        """
+        if writer not in WRITERS:
+            raise ValueError(f'Неизвестный способ сохранения: {writer}')
 
         self.path_ved = path_ved
         self.path_bank = path_bank
         self.kv_quantity = kv_quantity  # колличесво квартир
-
-        wb_ved = op.load_workbook(path_ved)  # открываем фаил с ведомостью
-        wb_bank = op.load_workbook(path_bank, data_only=True)  # открываем фаил от банка
-        self.wb_ved = wb_ved
-        self.wb_bank = wb_bank
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.report_json = report_json
+        self.use_cache = use_cache
+        self.use_ledger = use_ledger
+        self.writer = writer
+        self.concurrent_loading = concurrent_loading
+        self.check_files = check_files
+        self.paths_bank = [path_bank]  # файлы банка
+        self.workers = 1  # процессов для разбора файлов банка
+        self.report = RunReport(trace_memory)  # замеры этапов и счётчики
 
         self.name_ved = path_ved.split('/')[-1]
         self.name_bank = path_bank.split('/')[-1]
 
+        self.wb_ved = None  # книга с ведомостью (загружается при запуске)
+        self.ved_sheet_list = None  # лист с ведомостью
+        self.ved_sheet_payment = None  # лист с оплатой
+
+        self.bank_dict = None  # словарь квартир с суммой и датой оплаты (только новые платежи)
+        self.bank_records = None  # все платежи из файла банка
+        self.transactions = None  # записываемые платежи: (идентификатор, хэш файла банка, Payment)
+        self.sources = None  # {хэш файла банка: имя файла}
+        self.ledger = None  # журнал платежей ведомости
+        self.known_dates = None  # (квартира, дата), записанные через журнал
+        self.layout = None  # разметка ведомости (layout.Layout)
+        self.mon_coord_dict = None  # словарь с числом месяца и координатами ячейки
+        self.sheet_index = None  # индекс строк квартир
+        self.bank_total = None  # итоговая сумма из файла банка
+        self.state = None  # состояние ведомости в памяти
+        self.changes = None  # набор изменений ведомости
+        self.allocations = None  # распределение записанных платежей (allocation.Allocation)
+        self.reconciliation = None  # результат сверки
+        self.preview_result = None  # изменения по квартирам (preview.ChangePreview) после preview()
+        self.ved_signature = None  # (размер, время изменения) ведомости при загрузке
+
+    def _stage(self, stage: str, cancellable=True):
+        """Сообщаем о начале этапа и проверяем отмену"""
+        if cancellable and self.cancel_event is not None and self.cancel_event.is_set():
+            raise Cancelled(f'Обработка отменена перед этапом "{STAGES[stage]}"')
+        self.report.start(stage)
+        if self.progress is not None:
+            self.progress(stage)
+
+    def _ved_signature(self):
+        stat = os.stat(self.path_ved)
+        return stat.st_size, stat.st_mtime_ns
+
+    def loading(self):
+        """Загружаем ведомость"""
+        self.ved_signature = self._ved_signature()
+        if self.writer == 'patch':
+            # только значения листов "список как должн" и "оплата"; книга openpyxl не нужна.
+            # Лист "список как должн" читается с запасом: в сдвинутом шаблоне месяцы правее столбца 22
+            wb_ved = ved_reader.load_sheets(self.path_ved, {
+                allocation.LEDGER_SHEET: LEDGER_MAX_COLUMN,
+                allocation.PAYMENT_SHEET: allocation.PAYMENT_SUMM_COLUMN,
+            })
+        else:
+            wb_ved = op.load_workbook(self.path_ved)  # открываем фаил с ведомостью
+        self.wb_ved = wb_ved
+
         self.ved_sheet_list = wb_ved['список как должн']  # открываем лист с ведомостью
         self.ved_sheet_payment = wb_ved['оплата']  # открываем лист с оплатой
-        self.bank_sheet = wb_bank.active  # открываем активный лист в файле от банка
 
-        self.bank_dict = None  # словарь квартир с суммой и датой оплаты
-        self.mon_coord_dict = None  # словарь с числом месяца и координатами ячейки
-        self.summ_bank = None  # сумма из файла банка
-        self.payments_row = None
-        self.payments_coord_colu = None
-        self.payments_coord_row = None
-
-    def bank_reading(self):
-        """Получаем словарь с квартирами суммой и датами  """
-        self.bank_dict = bank_xlsx.payments(self.bank_sheet, self.name_bank)
-        # print('bank_reading', self.bank_dict)
-
-    def month_coordin(self):  # получаем словарь с месяцем и координатами
-        """Получаем словарь с числом месяц и координаты ячейки """
-        maxrow_sheet_paym = self.ved_sheet_payment.max_row
-        month_dict = {'01': 'январь',
-                      '02': 'февраль',
-                      '03': 'март',
-                      '04': 'апрель',
-                      '05': 'май',
-                      '06': 'июнь',
-                      '07': 'июль',
-                      '08': 'август',
-                      '09': 'сентябрь',
-                      '10': 'октябрь',
-                      '11': 'ноябрь',
-                      '12': 'декабрь'
-                      }
-        inv_month_dict = {v: k for k, v in month_dict.items()}  # переворачиваем словарь
-        # print(inv_month_dict.keys())
-
-        self.mon_coord_dict = {}
-        for row in range(1, maxrow_sheet_paym):
-            value_sheet_paym = self.ved_sheet_payment.cell(row=row, column=1).value
-
-            if value_sheet_paym in inv_month_dict.keys():
-                key = inv_month_dict.get(value_sheet_paym)
-
-                # print(f'month_coordin  {value_sheet_paym} {inv_month_dict.get(value_sheet_paym)} row {row} {1}')
-                self.mon_coord_dict[key] = (row, 1)
-
-        # print(self.mon_coord_dict)
+    def start_bank_reading(self) -> bank_cache.StatementReader:
+        """Запускаем чтение файлов банка (при concurrent_loading — в отдельных процессах, пока грузится ведомость)"""
+        cache = bank_cache.open_cache() if self.use_cache else None
+        return bank_cache.StatementReader(self.paths_bank, self.workers, cache, background=self.concurrent_loading)
+
+    def bank_reading(self, reader: bank_cache.StatementReader):
+        """Получаем платежи банка, отбрасываем записанные ранее (журнал), группируем новые по квартирам"""
+        statements = reader.result()
+        self.bank_total = sum(total for total, _, _ in statements if total is not None)
+
+        self.sources = {content_hash: path.split('/')[-1]
+                        for content_hash, path in zip(reader.hashes, self.paths_bank)}
+        transactions = []
+        for content_hash, (_, records, _) in zip(reader.hashes, statements):
+            ids = payments_ledger.transaction_ids(records) if self.use_ledger else [None] * len(records)
+            transactions.extend(zip(ids, [content_hash] * len(records), records))
+        if len(self.paths_bank) > 1:
+            transactions.sort(key=lambda transaction: transaction[2].date)  # порядок дат (при равных — порядок файлов)
+        self.bank_records = [record for _, _, record in transactions]
+        self.report.count('bank_rows', len(self.bank_records))
+
+        self.transactions = self._new_transactions(transactions)
+        self.bank_dict = bank_xlsx.group_payments(record for _, _, record in self.transactions)
+
+    def _new_transactions(self, transactions: list) -> list:
+        """Отбираем платежи, которых нет в журнале ведомости"""
+        if not self.use_ledger:
+            return transactions
+        try:
+            self.ledger = payments_ledger.PaymentsLedger.for_ved(self.path_ved)
+            known = self.ledger.known([transaction_id for transaction_id, _, _ in transactions])
+            new = [transaction for transaction in transactions if transaction[0] not in known]
+            self.known_dates = self.ledger.known_dates(record.date for _, _, record in new)
+        except sqlite3.Error as exc:
+            logger.warning(f'Журнал платежей недоступен, повторы проверяются по датам: {exc}')
+            self.ledger = None
+            return transactions
+
+        self.report.count('transactions_known', len(transactions) - len(new))
+        self.report.count('transactions_new', len(new))
+        if known:
+            logger.info(f'Уже записано ранее (по журналу): {len(transactions) - len(new)}, новых платежей: {len(new)}')
+        return new
+
+    def indexing(self):
+        """Разметка ведомости: блоки месяцев, строки квартир и столбцы (из кэша разметки или поиском по листам)"""
+        self.layout, cached = load_layout(self.path_ved, self.ved_sheet_payment, self.ved_sheet_list,
+                                          self.kv_quantity, self.use_cache)
+        self.mon_coord_dict = self.layout.mon_coord_dict
+        self.sheet_index = self.layout.index
+        self.report.count('layout_cached', int(cached))
+
+    def allocating(self):
+        """Распределяем платежи по ведомости в памяти, получаем набор изменений"""
+        months = {record.date.split('.')[1] for record in self.bank_records}
+        self.state = ved_io.read_state(self.ved_sheet_payment, self.ved_sheet_list, self.sheet_index,
+                                       self.mon_coord_dict, self.kv_quantity, months,
+                                       self.layout.columns, self.layout.header_row)
+        allocator = allocation.Allocator(self.state, self.known_dates)
+        self.changes = allocator.apply(self.bank_dict.items())
+        self.allocations = allocator.allocations
+        self.report.count('payments_applied', allocator.applied)
+        # в журнал попадают только записанные платежи: пропущенные (нет блока месяца, квартиры нет в ведомости,
+        # повтор даты) не должны считаться записанными при следующем запуске
+        self.transactions = [transaction for transaction in self.transactions
+                             if (transaction[2].kv, transaction[2].date) in allocator.applied_keys]
 
     def record_payments(self):
-        """Запись платежей"""
-        re = []
-        for t in range(1, self.kv_quantity + 1):
-            re.append(str(t))
-
-        for kv in self.bank_dict.keys():
-            self.summ_bank = self.bank_dict[kv][0]
-            date = self.bank_dict[kv][1]
-            month = date.split('.')[1]
-
-            kv = kv.split("-")[0]
-            if kv in re:
-
-                # print('record_payments',month)
-
-                coord_row = self.mon_coord_dict[month][0]
-                coord_colu = self.mon_coord_dict[month][1]
-                self.payments_coord_row = coord_row
-                self.payments_coord_colu = coord_colu
-                # print('record_payments',coord_row,coord_colu)
-
-                for i in range(2, self.kv_quantity + 2):
-
-                    kv_payment = self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu + 1).value
-
-                    if kv == str(kv_payment):
-                        date_payment = self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu).value
-                        date_payment = date_payment if date_payment is not None else str(0)
-                        date_payment = str(date_payment)
-                        # print('kv_payment',date_payment)
-
-                        if date_payment == "0":
-                            self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu, value=date)
-                            self.record_payments_summ(coord_row, coord_colu, i)
-                            self.record_ved(kv)
-
-                            break
-
-                        elif date not in date_payment.split('/'):
-
-                            record_date = f'{str(date_payment)}/{date}'
-                            self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu, value=record_date)
-                            self.record_payments_summ(coord_row, coord_colu, i)
-                            self.record_ved(kv)
-                            break
-
-                        else:
-                            break
-
-                    else:
-                        pass
-
-    def record_payments_summ(self, coord_row, coord_colu, i):
-        """Записываем в листе оплата сумму из банковского файла """
-        summ_pyment = self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu + 3).value
-        summ_pyment = summ_pyment if summ_pyment is not None else 0
-        summ_pyment_bank = summ_pyment + self.summ_bank
-        self.ved_sheet_payment.cell(row=coord_row + i, column=coord_colu + 3,
-                                    value=summ_pyment_bank)
-        # print('kv_payment', type(date_payment),type(date))
-        self.payments_row = coord_row + i
-
-    def record_ved(self, kv):
-        """Запись ведомости за должности"""
-        for row in range(8, self.kv_quantity + 8):
-            kv_ved = str(self.ved_sheet_list.cell(row=row, column=2).value)
-            if kv == kv_ved:
-                summ_ved_fee = self.ved_sheet_list.cell(row=row, column=6).value  # ежемесячный взнос
-                summ_ved_duty = self.ved_sheet_list.cell(row=row, column=8).value  # долг за прошлый год
-                summ_ved_duty = summ_ved_duty if summ_ved_duty is not None else 0
-                summ_ved_duty_defrayal = self.ved_sheet_list.cell(row=row,
-                                                                  column=9).value  # оплата долга за прошлый год
-                summ_ved_duty_defrayal = summ_ved_duty_defrayal if summ_ved_duty_defrayal is not None else 0
-
-                summ_difference = summ_ved_duty - summ_ved_duty_defrayal
-                # if kv =='12':
-                #     print(kv)
-                if summ_difference > 0:
-
-                    if self.summ_bank > summ_difference:
-
-                        summ_ved_duty_defrayal += summ_difference
-                        self.summ_bank -= summ_difference
-                        self.ved_sheet_list.cell(row=row, column=9,
-                                                 value=summ_ved_duty_defrayal)  # записываем в ячейку оплаты долга
-
-                        if self.summ_bank > 0:
-                            self.record_ved_month(row, summ_ved_fee)
-
-                    elif self.summ_bank <= summ_difference:
-                        summ_ved_duty_defrayal += self.summ_bank
-                        self.summ_bank -= self.summ_bank
-                        self.ved_sheet_list.cell(row=row, column=9,
-                                                 value=summ_ved_duty_defrayal)  # записываем в ячейку оплаты долга
-                        if self.summ_bank > 0:
-                            self.record_ved_month(row, summ_ved_fee)
-                    break
-
-
-                else:
-                    self.record_ved_month(row, summ_ved_fee)
-                    break
-            else:
-                pass
-
-    def record_ved_month(self, row, summ_ved_fee):  # Разбиваем сумму с банка по месяцам
-        """Разбиваем сумму с банка по месяцам"""
-        month_ved_start = ''
-        month_ved_end = ''
-        for coll in range(10, 23):
-
-            summ_ved = self.ved_sheet_list.cell(row=row, column=coll).value  # сумма за месяц
-            summ_ved = summ_ved if summ_ved is not None else 0
-
-            if summ_ved != summ_ved_fee and self.summ_bank > 0:
-
-                month_ved_start = self.ved_sheet_list.cell(row=7, column=coll).value  # название месяца
-                summ_ved_bank = self.summ_bank + summ_ved
-
-                while summ_ved_bank > 0:
-                    if coll <= 21:
-
-                        if summ_ved_bank >= summ_ved_fee and self.summ_bank > 0:
-
-                            self.ved_sheet_list.cell(row=row, column=coll, value=summ_ved_fee)
-                            month_ved_end = self.ved_sheet_list.cell(row=7, column=coll).value
-                            summ_ved_bank -= summ_ved_fee
-                            self.summ_bank = 0
-                            coll += 1
-
-                        elif summ_ved_bank >= summ_ved_fee:
-
-                            self.ved_sheet_list.cell(row=row, column=coll, value=summ_ved_fee)
-                            month_ved_end = self.ved_sheet_list.cell(row=7, column=coll).value
-                            summ_ved_bank -= summ_ved_fee
-                            self.summ_bank = 0
-                            coll += 1
-
-                        else:
-                            self.ved_sheet_list.cell(row=row, column=coll, value=summ_ved_bank)
-                            month_ved_end = self.ved_sheet_list.cell(row=7, column=coll).value
-                            summ_ved_bank -= summ_ved_bank
-                            self.summ_bank = 0
-                            coll += 1
-
-                    elif coll > 21:
-                        sum_jan = self.ved_sheet_list.cell(row=row, column=coll).value
-                        sum_jan = sum_jan if sum_jan is not None else 0
-
-                        self.ved_sheet_list.cell(row=row, column=coll, value=summ_ved_bank + sum_jan)
-                        month_ved_end = self.ved_sheet_list.cell(row=7, column=coll).value
-                        self.summ_bank = 0
-                        summ_ved_bank -= summ_ved_bank
-                else:
-                    break
-            else:
-                pass
-
-
-        payments_period = self.ved_sheet_payment.cell(row=self.payments_row, column=3).value
-        payments_period = payments_period if payments_period is not None else 0
-
-        if payments_period == 0:
-            if month_ved_start != month_ved_end:
-                month_range = f'{month_ved_start} - {month_ved_end}'
-                self.ved_sheet_payment.cell(row=self.payments_row, column=3, value=month_range)
-            elif month_ved_start == '':
-                pass
-            else:
-                self.ved_sheet_payment.cell(row=self.payments_row, column=3, value=month_ved_start)
-        else:
-            month_range = f'{payments_period} - {month_ved_end}'
-            self.ved_sheet_payment.cell(row=self.payments_row, column=3, value=month_range)
+        """Запись платежей (применяем набор изменений к ведомости)"""
+        self.report.count('cells_written', ved_io.apply_changes(self.wb_ved, self.changes))
+
+    def saving(self):
+        """Сохраняем ведомость: точечно (writer='patch') или полностью через openpyxl"""
+        if self.writer == 'patch':
+            try:
+                self.report.count('cells_written', xlsx_patch.patch_workbook(self.path_ved, self.changes))
+                self.wb_ved.close()
+                return
+            except xlsx_patch.PatchError as exc:
+                logger.warning(f'Точечная запись невозможна, ведомость сохраняется полностью: {exc}')
+            self.wb_ved = op.load_workbook(self.path_ved)
+            self.record_payments()
+        self.wb_ved.save(self.path_ved)
+        self.wb_ved.close()
 
-    def comparison(self):
-        """Проверяем суммы из файла банка и оплаты"""
-        wb_ved = op.load_workbook(self.path_ved, read_only=True, )  # открываем фаил с ведомостью
-        ved_sheet_payment = wb_ved['оплата']  # открываем лист с оплато
-        summ_payments = 0
-        for row in range(self.payments_coord_row + 2, self.payments_coord_row + 2 + self.kv_quantity):
-            s_pa = ved_sheet_payment.cell(row=row, column=4).value
-            s_pa = s_pa if s_pa is not None else 0
-            summ_payments += s_pa
-        summ_bank = self.bank_sheet.cell(row=2, column=4).value
-        summ_comparison = summ_bank - summ_payments
-
-        if summ_comparison == 0:
-            print('Оплаты всех квартир занесены верно\n')
-        elif summ_comparison > 0:
-            print(f'В листе "оплата" не хватает суммы {summ_comparison}\n')
-        elif summ_comparison < 0:
-            print(f'В листе "оплата" сумма больше на {summ_comparison * (-1)}\n')
+    def record_ledger(self):
+        """Записываем новые платежи и изменения в журнал ведомости (после сохранения)"""
+        if self.ledger is None:
+            return
+        try:
+            self.ledger.record_run(self.path_ved, self.name_bank, self.transactions, self.changes, self.allocations,
+                                   self.state, self.sources)
+        except sqlite3.Error as exc:
+            logger.warning(f'Не удалось записать журнал платежей: {exc}')
 
-        self.wb_ved.close()
+    def comparison(self):
+        """Проверяем суммы из файла банка и оплаты (по состоянию ведомости в памяти)"""
+        self.reconciliation = reconcile(self.state, self.bank_records, self.bank_total)
+        logger.info(f'{self.reconciliation.message()}\n')
+        for item in self.reconciliation.discrepancies:
+            logger.debug(f'Расхождение кв {item.kv} (месяц {item.month}): банк {item.bank}, '
+                         f'лист "оплата" {item.recorded}')
+        return self.reconciliation
 
     def launch(self):
-        """Запуск асистента (чтение и запись)"""
-
-        self.bank_reading()
-        self.month_coordin()
-        self.record_payments()
+        """
+        Запуск асистента (чтение и запись)
+        :return: True, если ведомость сохранена
+        """
+        return self._reported(self._launch)
+
+    def preview(self):
+        """
+        Расчёт без сохранения: чтение, распределение и сверка по состоянию в памяти.
+        Книга остаётся загруженной, изменения записываются вызовом commit() без повторного расчёта.
+        :return: preview.ChangePreview — изменения ячеек (было -> стало) по квартирам
+        """
+        return self._reported(self._preview)
+
+    def commit(self):
+        """
+        Запись изменений, рассчитанных preview()
+        :return: True, если ведомость сохранена
+        """
+        if self.preview_result is None:
+            raise RuntimeError('Нет рассчитанных изменений: сначала вызовите preview()')
+        self.report = RunReport(self.report.trace_memory)  # отдельный отчёт для записи
+        return self._reported(self._commit)
+
+    def _reported(self, run):
+        """Выполняет этапы и выводит (сохраняет) отчёт о замерах"""
+        try:
+            return run()
+        finally:
+            self.report.finish()
+            self.report.log()
+            if self.report_json:
+                self.report.save_json(f'{self.path_ved}.report.json')
+
+    def _prepare(self):
+        """Этапы до записи: проверка файлов, загрузка, чтение банка, разметка и распределение"""
+        if self.check_files:
+            self._stage('preflight')
+            preflight.preflight(self.path_ved, self.paths_bank, self.kv_quantity)
+        self._stage('loading')
+        with self.start_bank_reading() as reader:
+            self.loading()
+            self._stage('bank')
+            self.bank_reading(reader)
+        self._stage('indexing')
+        self.indexing()
+        self._stage('allocating')
+        self.allocating()
+
+    def _launch(self):
+        """Этапы обработки"""
+        self._prepare()
+        return self._save()
+
+    def _preview(self):
+        self._prepare()
+        self._stage('reconciling', cancellable=False)
+        self.comparison()
+        self.preview_result = preview.build(self.changes, self.wb_ved, self.sheet_index, self.state,
+                                            self.allocations)
+        logger.info(f'Будет записано платежей: {len(self.allocations)}, квартир: '
+                    f'{len(self.preview_result.apartments)}, ячеек: {self.preview_result.cells}')
+        return self.preview_result
+
+    def _commit(self):
+        if self._ved_signature() != self.ved_signature:
+            raise PreflightError([f'Ведомость "{self.name_ved}" изменилась после просмотра, '
+                                  f'рассчитайте изменения заново'])
+        return self._save(reconcile_after=False)
+
+    def _save(self, reconcile_after=True):
+        """Запись изменений в ведомость, журнал платежей и сверка"""
+        if self.writer == 'openpyxl':
+            self.record_payments()
 
         try:
-            self.wb_ved.save(self.path_ved)
-            self.wb_ved.close()
-            self.comparison()
+            self._stage('saving')
+            self.saving()
+            self.record_ledger()
+            if reconcile_after:
+                self._stage('reconciling', cancellable=False)
+                self.comparison()
             print('Программа завершила работу \n')
+            return True
         except PermissionError:
             print(f'Ошибка! Вы не закрыли файл "{self.name_ved}"\n')
             print('Программа завершила работу с ошибками\n')
+            return False
+
+
+class BatchAssistant(Assistant):
+    """Помощник для нескольких файлов банка: одна загрузка и одно сохранение ведомости"""
+
+    def __init__(self, path_ved: str, paths_bank: list, kv_quantity: int, workers=None, **kwargs):
+        """
+        :param path_ved: путь к ведомости
+        :param paths_bank: пути к файлам банка
+        :param kv_quantity: колличесво квартир
+        :param workers: количество процессов для чтения файлов банка (1 — последовательно)
+        :param kwargs: progress, cancel_event, trace_memory, report_json, use_cache, use_ledger, writer,
+                       concurrent_loading, check_files (см. Assistant)
+        """
+        super().__init__(path_ved, paths_bank[0], kv_quantity, **kwargs)
+        self.paths_bank = list(paths_bank)
+        self.name_bank = ', '.join(path.split('/')[-1] for path in self.paths_bank)
+        self.workers = workers
+
+
+def launch_batch(path_ved: str, paths_bank: list, kv_quantity: int, workers=None, **kwargs):
+    """Запуск помощника для нескольких файлов банка"""
+    assistant = BatchAssistant(path_ved, paths_bank, kv_quantity, workers, **kwargs)
+    assistant.launch()
+    return assistant
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+"""
+Генератор синтетических файлов для тестов и замеров производительности.
+
+- `bank_workbook` — выгрузка банка в формате xlsx (`bank.formats`):
+  строка 2 — итоговая сумма (D2), далее платежи: столбец 2 — поля через ";"
+  (квартира в 6-м поле), столбец 4 — сумма, столбец 5 — дата и время.
+- `ved_workbook` — ведомость с листами "список как должн" и "оплата"
+  (плюс при необходимости лишние листы, как в многолетних файлах).
+"""
+import random
+from datetime import datetime
+
+import openpyxl as op
+
+MONTHS = ['январь', 'февраль', 'март', 'апрель', 'май', 'июнь',
+          'июль', 'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь']
+FEE = 1000  # ежемесячный взнос по умолчанию
+MONTH_BLOCK_GAP = 4  # строк между блоками месяцев на листе "оплата" (название, шапка, пустые)
+
+
+def ved_workbook(path: str, kv_quantity: int, seed=0, fee=FEE, extra_sheets=0) -> None:
+    """
+    Создаёт ведомость.
+
+    Args:
+        path (str): Куда сохранить файл.
+        kv_quantity (int): Количество квартир.
+        seed (int): Зерно генератора случайных чисел.
+        fee: Ежемесячный взнос.
+        extra_sheets (int): Количество дополнительных листов (архив прошлых лет).
+    """
+    rnd = random.Random(seed)
+    wb = op.Workbook()
+    ledger = wb.active
+    ledger.title = 'список как должн'
+
+    ledger.cell(row=6, column=2, value='кв')
+    ledger.cell(row=6, column=6, value='взнос')
+    ledger.cell(row=6, column=8, value='долг')
+    ledger.cell(row=6, column=9, value='оплата долга')
+    for number, month in enumerate(MONTHS + [MONTHS[0]]):
+        ledger.cell(row=7, column=10 + number, value=month)
+
+    for kv in range(1, kv_quantity + 1):
+        row = 7 + kv
+        ledger.cell(row=row, column=2, value=kv)
+        ledger.cell(row=row, column=6, value=fee)
+        if rnd.random() < 0.3:
+            ledger.cell(row=row, column=8, value=rnd.choice([fee // 2, fee * 2, fee * 5]))
+        paid_months = rnd.randint(0, 6)
+        for column in range(10, 10 + paid_months):
+            ledger.cell(row=row, column=column, value=fee)
+        if rnd.random() < 0.2:
+            ledger.cell(row=row, column=10 + paid_months, value=fee * rnd.choice([0.3, 0.5]))
+
+    payment = wb.create_sheet('оплата')
+    row = 1
+    for month in MONTHS:
+        payment.cell(row=row, column=1, value=month)
+        for column, title in enumerate(['дата', 'кв', 'период', 'сумма'], start=1):
+            payment.cell(row=row + 1, column=column, value=title)
+        for kv in range(1, kv_quantity + 1):
+            payment.cell(row=row + 1 + kv, column=2, value=kv)
+        row += kv_quantity + MONTH_BLOCK_GAP
+
+    for number in range(extra_sheets):
+        archive = wb.create_sheet(f'архив {number + 1}')
+        for archive_row in range(1, kv_quantity + 1):
+            for column in range(1, 23):
+                archive.cell(row=archive_row, column=column, value=rnd.randint(0, fee * 3))
+
+    wb.save(path)
+
+
+def bank_workbook(path: str, kv_quantity: int, payments: int, month=7, year=2025, seed=0,
+                  wrong_kv_share=0.01) -> None:
+    """
+    Создаёт выгрузку банка.
+
+    Args:
+        path (str): Куда сохранить файл.
+        kv_quantity (int): Количество квартир.
+        payments (int): Количество платежей.
+        month (int): Месяц платежей.
+        year (int): Год платежей.
+        seed (int): Зерно генератора случайных чисел.
+        wrong_kv_share (float): Доля платежей с номером квартиры вне ведомости.
+    """
+    rnd = random.Random(seed)
+    wb = op.Workbook()
+    sheet = wb.active
+    sheet.title = 'Выписка'
+    for column, title in enumerate(['№', 'Назначение', 'Плательщик', 'Сумма', 'Дата'], start=1):
+        sheet.cell(row=1, column=column, value=title)
+
+    total = 0
+    for number in range(payments):
+        row = 3 + number
+        if rnd.random() < wrong_kv_share:
+            kv = kv_quantity + rnd.randint(1, 5)
+        else:
+            kv = rnd.randint(1, kv_quantity)
+        summ = rnd.choice([FEE // 2, FEE, FEE, FEE * 2, FEE * 3, FEE * 12])
+        date = datetime(year, month, rnd.randint(1, 28), rnd.randint(8, 20), rnd.randint(0, 59))
+        purpose = f'KZ{rnd.randint(10 ** 9, 10 ** 10)};Взнос ОСИ;{year};ИИН{rnd.randint(10 ** 11, 10 ** 12)};' \
+                  f'Кенжебаев А.;кв. {kv:02d};{month:02d}.{year}'
+
+        sheet.cell(row=row, column=1, value=number + 1)
+        sheet.cell(row=row, column=2, value=purpose)
+        sheet.cell(row=row, column=4, value=summ)
+        sheet.cell(row=row, column=5, value=date.strftime('%Y-%m-%d %H:%M:%S'))
+        total += summ
+
+    sheet.cell(row=2, column=4, value=total)
+    wb.save(path)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Кэш банка и разметки — во временной папке теста"""
+    monkeypatch.setenv('OSI_CACHE_DIR', str(tmp_path / 'cache'))
@@ -0,0 +1,118 @@
+"""Распределение платежей по состоянию ведомости (без Excel)"""
+from allocation import (LEDGER_COLUMNS, LEDGER_MONTHS, LEDGER_SHEET, PAYMENT_DATE_COLUMN, PAYMENT_PERIOD_COLUMN,
+                        PAYMENT_SHEET, PAYMENT_SUMM_COLUMN, Allocation, Allocator, LedgerRow, PaymentRow, VedState)
+
+FEE = 1000
+NAMES = ['январь', 'февраль', 'март', 'апрель', 'май', 'июнь', 'июль', 'август', 'сентябрь', 'октябрь',
+         'ноябрь', 'декабрь', 'январь']
+LEDGER_ROW = 8
+PAYMENT_ROW = 3
+OVERFLOW = LEDGER_MONTHS - 1
+
+
+def state(months=(), debt=0, debt_paid=0, date=None):
+    """Одна квартира '1' с блоком июля на листе "оплата" """
+    months = list(months) + [0] * (LEDGER_MONTHS - len(months))
+    ledger = {'1': LedgerRow(LEDGER_ROW, FEE, debt, debt_paid, months)}
+    payments = {'07': {'1': PaymentRow(PAYMENT_ROW, date, None, None)}}
+    return VedState(ledger, payments, NAMES)
+
+
+def month_cell(index):
+    return LEDGER_SHEET, LEDGER_ROW, LEDGER_COLUMNS.first_month + index
+
+
+def cells(changes):
+    return {(change.sheet, change.row, change.col): change.value for change in changes}
+
+
+def test_overflow_column_keeps_growing():
+    ved = state([FEE] * OVERFLOW)
+    allocator = Allocator(ved)
+    changes = cells(allocator.apply([('1', (1000, '2025.07.01')), ('1-2', (5000, '2025.07.02'))]))
+
+    assert ved.ledger['1'].months[OVERFLOW] == 6000
+    assert changes[month_cell(OVERFLOW)] == 6000
+    assert ved.payment_rows['07']['1'].summ == 6000
+    assert [item.months for item in allocator.allocations] == ['январь', 'январь']
+
+
+def test_debt_first_then_months_in_order():
+    ved = state(debt=1500, debt_paid=0)
+    allocator = Allocator(ved)
+    changes = cells(allocator.apply([('1', (3500, '2025.07.05'))]))
+
+    row = ved.ledger['1']
+    assert row.debt_paid == 1500
+    assert row.months[:3] == [FEE, FEE, 0]
+    assert changes[(LEDGER_SHEET, LEDGER_ROW, LEDGER_COLUMNS.debt_paid)] == 1500
+    assert changes[(PAYMENT_SHEET, PAYMENT_ROW, PAYMENT_DATE_COLUMN)] == '2025.07.05'
+    assert changes[(PAYMENT_SHEET, PAYMENT_ROW, PAYMENT_SUMM_COLUMN)] == 3500
+    assert changes[(PAYMENT_SHEET, PAYMENT_ROW, PAYMENT_PERIOD_COLUMN)] == 'январь - февраль'
+    assert allocator.allocations == [Allocation('1', '2025.07.05', 3500, 1500, 'январь - февраль')]
+
+
+def test_payment_smaller_than_debt():
+    ved = state(debt=3000, debt_paid=1000)
+    allocator = Allocator(ved)
+    allocator.apply([('1', (500, '2025.07.05'))])
+
+    assert ved.ledger['1'].debt_paid == 1500
+    assert ved.ledger['1'].months == [0] * LEDGER_MONTHS
+    assert allocator.allocations == [Allocation('1', '2025.07.05', 500, 500, '')]
+
+
+def test_partly_paid_month_is_completed_first():
+    ved = state([FEE, 400])
+    changes = cells(Allocator(ved).apply([('1', (1000, '2025.07.05'))]))
+
+    assert ved.ledger['1'].months[:3] == [FEE, FEE, 400]
+    assert changes[month_cell(1)] == FEE
+    assert changes[month_cell(2)] == 400
+    assert month_cell(0) not in changes
+    assert ved.payment_rows['07']['1'].period == 'февраль - март'
+
+
+def test_months_spill_into_overflow_column():
+    ved = state([FEE] * 11 + [500, 200])
+    changes = cells(Allocator(ved).apply([('1', (2000, '2025.07.05'))]))
+
+    assert ved.ledger['1'].months[11:] == [FEE, 1700]
+    assert changes[month_cell(11)] == FEE
+    assert changes[month_cell(OVERFLOW)] == 1700
+
+
+def test_repeated_date_is_skipped_unless_known():
+    ved = state(date='2025.07.05')
+    allocator = Allocator(ved)
+    assert allocator.apply([('1', (1000, '2025.07.05'))]) == []
+    assert allocator.applied == 0
+    assert allocator.applied_keys == set()
+
+    ved = state(date='2025.07.05')
+    allocator = Allocator(ved, known_dates={('1', '2025.07.05')})  # журнал: новый платёж за записанную дату
+    allocator.apply([('1', (1000, '2025.07.05'))])
+    assert allocator.applied_keys == {('1', '2025.07.05')}
+    assert ved.payment_rows['07']['1'].date == '2025.07.05'
+    assert ved.ledger['1'].months[0] == FEE
+
+
+def test_split_payments_of_one_apartment():
+    ved = state()
+    allocator = Allocator(ved)
+    allocator.apply([('1', (1000, '2025.07.01')), ('1-2', (500, '2025.07.15'))])
+
+    payment = ved.payment_rows['07']['1']
+    assert payment.date == '2025.07.01/2025.07.15'
+    assert payment.summ == 1500
+    assert ved.ledger['1'].months[:2] == [FEE, 500]
+    assert allocator.applied_keys == {('1', '2025.07.01'), ('1', '2025.07.15')}
+    assert [item.months for item in allocator.allocations] == ['январь', 'февраль']
+
+
+def test_payment_without_row_or_month_block_is_not_applied():
+    ved = state()
+    allocator = Allocator(ved)
+    assert allocator.apply([('2', (1000, '2025.07.01')), ('1', (1000, '2025.08.01'))]) == []
+    assert allocator.applied == 0
+    assert ved.ledger['1'].months[0] == 0
@@ -0,0 +1,95 @@
+"""Разбор строк файла банка и группировка платежей по квартирам"""
+import pytest
+
+import bank_xlsx
+from bank_xlsx import Payment
+
+
+def recursive_grouping(records):
+    """Прежняя рекурсивная группировка (check_date) для квартир из 1-2 цифр — эталон для сравнения"""
+    kv_su = {}
+    for record in records:
+        su = record.summ
+        date = record.date
+        n = 2
+
+        def check_date(kv):
+            nonlocal su, n
+            if kv in kv_su:
+                if kv_su[kv][1] != date:
+                    kv_n = kv
+                    while kv_n in kv_su:
+                        if len(kv_n) <= 2:
+                            kv_n = f'{kv}-{n}'
+                        else:
+                            kv_n = kv_n.split('-')
+                            kv_n[-1] = str(n)
+                            kv_n = '-'.join(kv_n)
+                        n += 1
+                        return check_date(kv_n)
+                else:
+                    su = su + kv_su[kv][0]
+                kv_su[kv] = (su, date)
+            else:
+                kv_su[kv] = (su, date)
+
+        check_date(record.kv)
+    return kv_su
+
+
+def payments(*items):
+    return [Payment(row, kv, summ, date) for row, (kv, summ, date) in enumerate(items, start=3)]
+
+
+CASES = [
+    payments(('1', 1000, '2025.07.01'), ('2', 500, '2025.07.01')),
+    payments(('1', 1000, '2025.07.01'), ('1', 500, '2025.07.01')),
+    payments(('1', 1000, '2025.07.01'), ('1', 500, '2025.07.02'), ('1', 300, '2025.07.01')),
+    payments(('7', 100, '2025.07.01'), ('7', 200, '2025.07.02'), ('7', 300, '2025.07.03'), ('7', 400, '2025.07.02'),
+             ('12', 50, '2025.07.03'), ('7', 500, '2025.07.04')),
+    payments(('12', 1000, '2025.07.05'), ('3', 1000, '2025.07.05'), ('12', 2000, '2025.07.06'),
+             ('3', 1000, '2025.07.05'), ('12', 10, '2025.07.07')),
+]
+
+
+@pytest.mark.parametrize('records', CASES)
+def test_grouping_matches_recursive_version(records):
+    assert bank_xlsx.group_payments(records) == recursive_grouping(records)
+
+
+def test_three_digit_apartment_dates():
+    """Прежняя версия для кв из трёх цифр писала вторую дату под ключ '2' (чужая квартира)"""
+    records = payments(('123', 1000, '2025.07.01'), ('123', 500, '2025.07.02'), ('2', 700, '2025.07.01'))
+    assert bank_xlsx.group_payments(records) == {'123': (1000, '2025.07.01'), '123-2': (500, '2025.07.02'),
+                                                 '2': (700, '2025.07.01')}
+
+
+def test_repeats_are_counted():
+    repeats = {}
+    bank_xlsx.group_records(payments(('5', 1, '2025.07.01'), ('5', 1, '2025.07.02'), ('6', 1, '2025.07.01')),
+                            repeats)
+    assert repeats == {'5': 2}
+
+
+def rows(*purposes):
+    """Значения столбцов 2-5 строк файла банка"""
+    return [(purpose, None, 1000, '2025-07-05 10:00:00') for purpose in purposes]
+
+
+def purpose(kv):
+    return f'KZ123;Взнос ОСИ;2025;ИИН1;Иванов;{kv};07.2025'
+
+
+@pytest.mark.parametrize('field, kv', [('кв. 05', '5'), ('кв.012', '12'), ('123', '123'), ('7', '7')])
+def test_apartment_number(field, kv):
+    records = list(bank_xlsx.iter_payments(rows(purpose(field))))
+    assert [(record.kv, record.date) for record in records] == [(kv, '2025.07.05')]
+
+
+def test_missing_or_wrong_apartment_is_reported():
+    warnings = []
+    records = list(bank_xlsx.iter_payments(rows(purpose(''), purpose('кв 12345')), warnings=warnings))
+    assert [record.kv for record in records] == ['', '12345']
+    assert len(warnings) == 2
+    # пустой номер пропускается, неверный (больше трёх цифр) остаётся, как раньше, — его нет в ведомости
+    assert bank_xlsx.group_payments(records) == {'12345': (1000, '2025.07.05')}
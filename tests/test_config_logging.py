@@ -0,0 +1,42 @@
+"""Настройка логирования окна"""
+import logging
+import logging.handlers
+
+import pytest
+
+from config_logging import settings_logging
+
+
+class FakeText:
+    """Виджет Text без Tkinter: вывод из очереди не нужен"""
+
+    def after(self, interval, callback):
+        pass
+
+
+@pytest.fixture
+def root_logger():
+    logger = logging.getLogger()
+    handlers, level = list(logger.handlers), logger.level
+    yield logger
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+
+
+def file_handlers(logger):
+    return [handler for handler in logger.handlers if isinstance(handler, logging.handlers.RotatingFileHandler)]
+
+
+def test_log_file(root_logger, tmp_path):
+    logger = settings_logging(text_widget=FakeText(), log_file=str(tmp_path / 'osi.log'))
+    assert len(file_handlers(logger)) == 1
+
+
+def test_unwritable_log_file_is_skipped(root_logger, tmp_path):
+    widget = FakeText()
+    logger = settings_logging(text_widget=widget, log_file=str(tmp_path / 'нет папки' / 'osi.log'))
+    assert file_handlers(logger) == []
+    text_handler = logger.handlers[0]
+    assert 'не ведётся' in text_handler.queue.get_nowait()
@@ -0,0 +1,41 @@
+"""Пакетная обработка домов"""
+import openpyxl as op
+
+import allocation
+import jobs
+import synthetic
+
+KV_QUANTITY = 20
+
+
+def payment_dates(path):
+    sheet = op.load_workbook(path)[allocation.PAYMENT_SHEET]
+    return {str(value) for (value,) in sheet.iter_rows(min_col=allocation.PAYMENT_DATE_COLUMN,
+                                                        max_col=allocation.PAYMENT_DATE_COLUMN, values_only=True)
+            if value is not None}
+
+
+def test_same_ved_jobs_run_in_turn(tmp_path):
+    ved = tmp_path / 'ved.xlsx'
+    other = tmp_path / 'other.xlsx'
+    synthetic.ved_workbook(str(ved), KV_QUANTITY)
+    synthetic.ved_workbook(str(other), KV_QUANTITY, seed=1)
+    for month in 7, 8:
+        synthetic.bank_workbook(str(tmp_path / f'bank{month}.xlsx'), KV_QUANTITY, 40, month=month, wrong_kv_share=0)
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('ved;bank;kv\n'
+                        f'{ved};{tmp_path / "bank7.xlsx"};{KV_QUANTITY}\n'
+                        f'{other};{tmp_path / "bank7.xlsx"};{KV_QUANTITY}\n'
+                        f'{tmp_path / "." / "ved.xlsx"};{tmp_path / "bank8.xlsx"};{KV_QUANTITY}\n', encoding='utf-8')
+
+    job_list = jobs.load_manifest(str(manifest))
+    results = jobs.run_jobs(job_list, workers=3)
+    assert [result.job for result in results] == job_list
+    assert all(result.ok for result in results), [result.error for result in results]
+
+    dates = payment_dates(ved)  # в ведомости записаны оба файла банка
+    assert any(date.startswith('2025.07') for date in dates)
+    assert any(date.startswith('2025.08') for date in dates)
+
+    summary = jobs.summary(results, 1.5)
+    assert (summary['total'], summary['ok'], summary['failed'], summary['elapsed']) == (3, 3, 0, 1.5)
@@ -0,0 +1,42 @@
+"""Кэш разметки ведомости"""
+import openpyxl as op
+
+import allocation
+import synthetic
+from layout import Layout, load_layout
+
+KV_QUANTITY = 20
+
+
+def sheets(path):
+    wb = op.load_workbook(path)
+    return wb[allocation.PAYMENT_SHEET], wb[allocation.LEDGER_SHEET]
+
+
+def test_cached_layout(tmp_path):
+    path = str(tmp_path / 'ved.xlsx')
+    synthetic.ved_workbook(path, KV_QUANTITY)
+    detected, cached = load_layout(path, *sheets(path), KV_QUANTITY)
+    assert not cached
+    layout, cached = load_layout(path, *sheets(path), KV_QUANTITY)
+    assert cached
+    assert layout.to_dict() == detected.to_dict()
+
+
+def test_rows_moved_inside_table(tmp_path):
+    """Строка вставлена и удалена внутри таблицы: размеры листов те же, строки квартир сдвинуты"""
+    path = str(tmp_path / 'ved.xlsx')
+    synthetic.ved_workbook(path, KV_QUANTITY)
+    load_layout(path, *sheets(path), KV_QUANTITY)
+
+    wb = op.load_workbook(path)
+    for sheet in wb[allocation.PAYMENT_SHEET], wb[allocation.LEDGER_SHEET]:
+        max_row = sheet.max_row
+        sheet.insert_rows(allocation.LEDGER_HEADER_ROW + 5)
+        sheet.delete_rows(allocation.LEDGER_HEADER_ROW + 12)
+        assert sheet.max_row == max_row
+    wb.save(path)
+
+    layout, cached = load_layout(path, *sheets(path), KV_QUANTITY)
+    assert not cached
+    assert layout.to_dict() == Layout.detect(*sheets(path), KV_QUANTITY).to_dict()
@@ -0,0 +1,51 @@
+"""Сдвинутый шаблон ведомости: оба способа сохранения дают одинаковый результат"""
+import shutil
+
+import openpyxl as op
+
+import allocation
+import statement
+import synthetic
+
+KV_QUANTITY = 20
+SHIFT = 2  # столбцов слева от таблицы
+
+
+def shifted_ved(path):
+    """Ведомость со сдвигом столбцов листа "список как должн" и полностью оплаченным годом у квартир 1-5"""
+    synthetic.ved_workbook(str(path), KV_QUANTITY)
+    wb = op.load_workbook(path)
+    ledger = wb[allocation.LEDGER_SHEET]
+    ledger.insert_cols(1, SHIFT)
+    for row in range(allocation.LEDGER_HEADER_ROW + 1, allocation.LEDGER_HEADER_ROW + 6):
+        for column in range(allocation.LEDGER_FIRST_MONTH_COLUMN, allocation.LEDGER_LAST_MONTH_COLUMN):
+            ledger.cell(row=row, column=column + SHIFT, value=synthetic.FEE)
+        ledger.cell(row=row, column=allocation.LEDGER_DEBT_COLUMN + SHIFT, value=None)
+    wb.save(path)
+
+
+def ledger_values(path):
+    sheet = op.load_workbook(path)[allocation.LEDGER_SHEET]
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_shifted_template_both_writers(tmp_path):
+    ved = tmp_path / 'ved.xlsx'
+    bank = tmp_path / 'bank.xlsx'
+    shifted_ved(ved)
+    synthetic.bank_workbook(str(bank), KV_QUANTITY, payments=60, wrong_kv_share=0)
+
+    results = {}
+    for writer in statement.WRITERS:
+        path = tmp_path / f'ved_{writer}.xlsx'
+        shutil.copy(ved, path)
+        assert statement.Assistant(str(path), str(bank), KV_QUANTITY, writer=writer, use_cache=False,
+                                   use_ledger=False, concurrent_loading=False).launch()
+        results[writer] = ledger_values(path)
+
+    assert results['patch'] == results['openpyxl']
+    overflow = allocation.LEDGER_LAST_MONTH_COLUMN + SHIFT
+    before = ledger_values(ved)
+    # переплата квартир с оплаченным годом добавляется к уже записанной в столбце переплаты
+    assert any(after[overflow - 1] != old[overflow - 1]
+               for after, old in zip(results['patch'][7:12], before[7:12]))
@@ -0,0 +1,23 @@
+"""Журнал платежей ведомости"""
+import allocation
+import payments_ledger
+from bank_xlsx import Payment
+
+
+def test_history_counts_group_allocation_once(tmp_path):
+    """Платежи квартиры за одну дату распределяются одной суммой — долг и период выводятся один раз"""
+    ledger = payments_ledger.PaymentsLedger(str(tmp_path / 'ledger.sqlite3'))
+    records = [Payment(3, '5', 1500, '2025.07.02', '2025-07-02 09:00:00'),
+               Payment(4, '5', 2500, '2025.07.02', '2025-07-02 18:30:00'),
+               Payment(5, '7', 1000, '2025.07.02', '2025-07-02 10:00:00'),
+               Payment(6, '8', 1000, '2025.07.03', '2025-07-03 10:00:00')]
+    transactions = list(zip(payments_ledger.transaction_ids(records), ['hash'] * len(records), records))
+    allocations = [allocation.Allocation('5', '2025.07.02', 4000, 3000, 'июль'),
+                   allocation.Allocation('7', '2025.07.02', 1000, 0, 'июль')]
+    ledger.record_run(str(tmp_path / 'ved.xlsx'), 'bank.xlsx', transactions, [], allocations,
+                      sources={'hash': 'bank.xlsx'})
+
+    history = ledger.history(kv=5)
+    assert [(entry.summ, entry.debt, entry.months) for entry in history] == [(1500, 3000, 'июль'), (2500, 0, '')]
+    assert sum(entry.debt for entry in ledger.history()) == 3000
+    assert [entry.months for entry in ledger.history(since='2025.07.03')] == [None]  # не записан в ведомость
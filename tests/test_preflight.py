@@ -0,0 +1,86 @@
+"""Предварительная проверка файлов"""
+import openpyxl as op
+import pytest
+
+import allocation
+import preflight
+import synthetic
+
+KV_QUANTITY = 20
+
+
+@pytest.fixture
+def ved(tmp_path):
+    path = tmp_path / 'ved.xlsx'
+    synthetic.ved_workbook(str(path), KV_QUANTITY)
+    return path
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = tmp_path / 'bank.xlsx'
+    synthetic.bank_workbook(str(path), KV_QUANTITY, 10)
+    return path
+
+
+def problems(ved, bank, kv_quantity=KV_QUANTITY):
+    try:
+        preflight.preflight(str(ved), [str(bank)], kv_quantity)
+    except preflight.PreflightError as exc:
+        return exc.problems
+    return []
+
+
+def test_files_pass(ved, bank):
+    assert problems(ved, bank) == []
+    assert preflight.count_apartments(str(ved)) == KV_QUANTITY
+
+
+@pytest.mark.parametrize('lock', ['~$ved.xlsx', '.~lock.ved.xlsx#'])
+def test_locked_ved(ved, bank, lock):
+    (ved.parent / lock).write_bytes(b'')
+    assert problems(ved, bank) == ['Ошибка! Вы не закрыли файл "ved.xlsx"']
+
+
+def test_unrelated_lock_file(tmp_path, bank):
+    path = tmp_path / 'abved.xlsx'
+    synthetic.ved_workbook(str(path), KV_QUANTITY)
+    (tmp_path / '~$ved.xlsx').write_bytes(b'')  # блокировка другой книги
+    assert problems(path, bank) == []
+
+
+def test_missing_sheet(ved, bank):
+    wb = op.load_workbook(ved)
+    del wb[allocation.PAYMENT_SHEET]
+    wb.save(ved)
+    assert problems(ved, bank) == [f'В ведомости "ved.xlsx" нет листов: {allocation.PAYMENT_SHEET}']
+
+
+def test_apartment_count_mismatch(ved, bank):
+    assert problems(ved, bank, KV_QUANTITY + 5) == [f'В ведомости "ved.xlsx" квартир: {KV_QUANTITY}, '
+                                                    f'указано: {KV_QUANTITY + 5}']
+
+
+@pytest.mark.parametrize('name, content', [
+    ('bank.xlsx', None),
+    ('bank.csv', '№;Назначение;Плательщик;Сумма;Дата\n;;;1000;\n1;оплата за июль;;1000;2025-07-05 10:00:00\n'),
+])
+def test_bank_purpose_without_fields(ved, tmp_path, name, content):
+    path = tmp_path / name
+    if content is None:
+        wb = op.Workbook()
+        sheet = wb.active
+        sheet.append(['№', 'Назначение', 'Плательщик', 'Сумма', 'Дата'])
+        sheet.append([None, None, None, 1000])
+        sheet.append([1, 'оплата за июль', None, 1000, '2025-07-05 10:00:00'])
+        wb.save(path)
+    else:
+        path.write_text(content, encoding='utf-8')
+    assert problems(ved, path) == [f'Файл от банка "{name}" выбран не верно: в строке {preflight.BANK_PEEK_ROWS} '
+                                   f'нет назначения платежа с номером квартиры']
+
+
+def test_unknown_bank_format(ved, tmp_path):
+    path = tmp_path / 'bank.xls'
+    path.write_bytes(b'\xd0\xcf\x11\xe0' + b'\x00' * 100)
+    assert 'xls' in problems(ved, path)[0]
@@ -0,0 +1,165 @@
+"""HTTP-сервис обработки: загрузка файлов, задания, очередь по ведомости и счётчики"""
+import http.client
+import json
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import server
+import synthetic
+
+KV_QUANTITY = 20
+WAIT = 60
+
+
+@pytest.fixture
+def httpd(tmp_path):
+    httpd = server.make_server('127.0.0.1', 0, workers=2, upload_dir=str(tmp_path / 'uploads'))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.service.close()
+    thread.join()
+
+
+def request(httpd, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=WAIT + 10)
+    try:
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        data = response.read()
+        if response.getheader('Content-Type', '').startswith('application/json'):
+            data = json.loads(data)
+        return response.status, data
+    finally:
+        connection.close()
+
+
+def upload(httpd, tmp_path, name, make):
+    path = tmp_path / name
+    make(str(path))
+    status, data = request(httpd, 'PUT', f'/files/{name}', path.read_bytes())
+    assert status == 201
+    assert data['bytes'] == path.stat().st_size
+    return path
+
+
+@pytest.fixture
+def files(httpd, tmp_path):
+    upload(httpd, tmp_path, 'ved.xlsx', lambda path: synthetic.ved_workbook(path, KV_QUANTITY))
+    upload(httpd, tmp_path, 'ved2.xlsx', lambda path: synthetic.ved_workbook(path, KV_QUANTITY, seed=1))
+    upload(httpd, tmp_path, 'bank.xlsx', lambda path: synthetic.bank_workbook(path, KV_QUANTITY, 60))
+    upload(httpd, tmp_path, 'bank2.xlsx', lambda path: synthetic.bank_workbook(path, KV_QUANTITY, 60, month=8))
+
+
+def post_job(httpd, **job):
+    status, data = request(httpd, 'POST', '/jobs', dict({'kv': KV_QUANTITY}, **job))
+    assert status == 202
+    return data['id']
+
+
+def wait_job(httpd, job_id):
+    status, data = request(httpd, 'GET', f'/jobs/{job_id}?wait={WAIT}')
+    assert status == 200
+    return data
+
+
+def test_health(httpd):
+    assert request(httpd, 'GET', '/health') == (200, {'ok': True})
+
+
+def test_job_saves_ved(httpd, files, tmp_path):
+    job_id = post_job(httpd, ved='ved.xlsx', bank='bank.xlsx')
+    job = wait_job(httpd, job_id)
+    assert job['status'] == 'done', job['error']
+    assert job['result']['saved']
+    assert job['result']['reconciliation'] is not None
+
+    status, body = request(httpd, 'GET', '/files/ved.xlsx')
+    assert status == 200
+    assert body != (tmp_path / 'ved.xlsx').read_bytes()
+
+
+def test_dry_run_keeps_file(httpd, files, tmp_path):
+    job = wait_job(httpd, post_job(httpd, ved='ved.xlsx', bank='bank.xlsx', dry_run=True))
+    assert job['status'] == 'done', job['error']
+    assert job['result']['changes']['cells'] > 0
+    assert request(httpd, 'GET', '/files/ved.xlsx')[1] == (tmp_path / 'ved.xlsx').read_bytes()
+
+
+def test_failed_job_reports_error(httpd, files):
+    job = wait_job(httpd, post_job(httpd, ved='ved.xlsx', bank='bank.xlsx', kv=KV_QUANTITY + 1))
+    assert job['status'] == 'failed'
+    assert 'PreflightError' in job['error']
+
+
+def test_same_ved_runs_in_turn(httpd, files):
+    first = post_job(httpd, ved='ved.xlsx', bank='bank.xlsx')
+    second = post_job(httpd, ved='ved.xlsx', bank='bank2.xlsx')
+    other = post_job(httpd, ved='ved2.xlsx', bank='bank.xlsx')
+    for job_id in (first, second, other):
+        assert wait_job(httpd, job_id)['status'] == 'done'
+
+    jobs = httpd.service.jobs
+    assert jobs[second].started >= jobs[first].finished
+    assert jobs[other].started < jobs[first].finished  # другая ведомость — параллельно
+
+
+def test_upload_over_busy_ved(httpd, files, tmp_path):
+    job_id = post_job(httpd, ved='ved.xlsx', bank='bank.xlsx')
+    status, data = request(httpd, 'PUT', '/files/ved.xlsx', b'new content')
+    assert status == 409
+    assert request(httpd, 'GET', '/files/ved.xlsx')[0] in (200, 409)
+    assert wait_job(httpd, job_id)['status'] == 'done'
+    assert request(httpd, 'PUT', '/files/ved.xlsx', (tmp_path / 'ved.xlsx').read_bytes())[0] == 201
+
+
+def test_broken_pool_fails_job(httpd, files, monkeypatch):
+    def broken(*args):
+        raise BrokenProcessPool('процесс пула завершился')
+
+    monkeypatch.setattr(httpd.service.executor, 'submit', broken)
+    job = wait_job(httpd, post_job(httpd, ved='ved.xlsx', bank='bank.xlsx'))
+    assert job['status'] == 'failed'
+    assert 'BrokenProcessPool' in job['error']
+    assert not httpd.service.is_busy(httpd.service.upload_path('ved.xlsx'))
+
+
+def test_completed_future_starts_next_job(httpd, files, monkeypatch):
+    def completed(function, *args):  # обратный вызов уже завершённого future выполняется сразу
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+    monkeypatch.setattr(httpd.service.executor, 'submit', completed)
+    first = post_job(httpd, ved='ved.xlsx', bank='bank.xlsx', dry_run=True)
+    second = post_job(httpd, ved='ved.xlsx', bank='bank2.xlsx', dry_run=True)
+    assert wait_job(httpd, first)['status'] == 'done'
+    assert wait_job(httpd, second)['status'] == 'done'
+
+
+def test_bad_requests(httpd, files):
+    assert request(httpd, 'POST', '/jobs', {'ved': 'ved.xlsx'})[0] == 400
+    assert request(httpd, 'POST', '/jobs', {'ved': 'missing.xlsx', 'bank': 'bank.xlsx', 'kv': 1})[0] == 400
+    assert request(httpd, 'POST', '/jobs', b'not json')[0] == 400
+    assert request(httpd, 'GET', '/jobs/999')[0] == 404
+    assert request(httpd, 'GET', '/files/missing.xlsx')[0] == 404
+
+
+def test_metrics(httpd, files):
+    for job_id in (post_job(httpd, ved='ved.xlsx', bank='bank.xlsx'),
+                   post_job(httpd, ved='ved2.xlsx', bank='bank.xlsx', kv=KV_QUANTITY + 1)):
+        wait_job(httpd, job_id)
+    status, metrics = request(httpd, 'GET', '/metrics')
+    assert status == 200
+    assert metrics['jobs'] == {'queued': 0, 'running': 0, 'done': 1, 'failed': 1}
+    assert metrics['workers'] == 2
+    assert metrics['queue_length'] == 0
+    assert metrics['busy_veds'] == 0
+    assert metrics['run_seconds_max'] >= metrics['run_seconds_avg'] > 0
@@ -0,0 +1,93 @@
+"""Папка входящих выгрузок банка"""
+import json
+import os
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+import synthetic
+import watcher
+
+KV_QUANTITY = 20
+
+
+def test_unreadable_ved_moves_file_to_failed(tmp_path):
+    inbox = tmp_path / 'inbox'
+    ved_dir = tmp_path / 'ved'
+    inbox.mkdir()
+    ved_dir.mkdir()
+    (ved_dir / 'дом.xlsx').write_bytes(b'not a zip file')
+    synthetic.bank_workbook(str(inbox / 'дом__июль.xlsx'), KV_QUANTITY, 10)
+
+    assert watcher.Watcher(str(inbox), ved_dir=str(ved_dir), workers=1).run(once=True) == 1
+    result = f'дом__июль.xlsx{watcher.RESULT_SUFFIX}'
+    assert sorted(os.listdir(inbox / watcher.FAILED_DIR)) == ['дом__июль.xlsx', result]
+    with open(inbox / watcher.FAILED_DIR / result, encoding='utf-8') as file:
+        assert 'BadZipFile' in json.load(file)['error']
+
+
+def test_file_not_moved_is_not_processed_again(tmp_path, monkeypatch):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    (inbox / 'неизвестный.xlsx').write_bytes(b'bank')
+    folder = watcher.Watcher(str(inbox), settle=0)
+
+    def locked(source, target):
+        raise PermissionError(13, 'файл занят', source)
+
+    monkeypatch.setattr(watcher.os, 'replace', locked)
+    assert folder.scan() == []
+    assert folder.scan() == ['неизвестный.xlsx']
+    folder._enqueue('неизвестный.xlsx')
+    assert folder.processed == 1
+    assert folder.scan() == []
+    assert folder.scan() == []
+
+    (inbox / 'неизвестный.xlsx').write_bytes(b'new bank export')  # новый файл с тем же именем
+    assert folder.scan() == []
+    assert folder.scan() == ['неизвестный.xlsx']
+
+
+def test_scan_checks_changed_names(tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    (inbox / 'старый.xlsx').write_bytes(b'bank')
+    folder = watcher.Watcher(str(inbox), settle=0)
+
+    assert folder.scan([]) == []  # событий не было — папка не просматривается
+    assert folder._seen == {}
+    (inbox / 'новый.xlsx').write_bytes(b'bank')
+    assert folder.scan(['новый.xlsx']) == []
+    assert folder.scan([]) == ['новый.xlsx']  # дописываемые файлы проверяются и без новых событий
+    (inbox / 'новый.xlsx').unlink()  # обработан и перенесён
+    assert folder.scan() == []
+    assert folder.scan() == ['старый.xlsx']
+
+
+def test_routes_and_inotify_run(tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    if watcher.open_inotify(str(inbox)) is None:
+        pytest.skip('inotify недоступен')
+    ved = tmp_path / 'ved.xlsx'
+    synthetic.ved_workbook(str(ved), KV_QUANTITY)
+    routes_path = tmp_path / 'routes.csv'
+    routes_path.write_text(f'pattern;ved;kv\nдом_*.xlsx;{ved};{KV_QUANTITY}\n', encoding='utf-8')
+    routes = watcher.load_routes(str(routes_path))
+    assert routes == [watcher.Route('дом_*.xlsx', str(ved), KV_QUANTITY)]
+
+    folder = watcher.Watcher(str(inbox), routes, workers=1, settle=0.2, interval=0.2)
+    stop = threading.Event()
+    thread = threading.Thread(target=folder.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        synthetic.bank_workbook(str(tmp_path / 'bank.xlsx'), KV_QUANTITY, 10)
+        os.replace(tmp_path / 'bank.xlsx', inbox / 'дом_июль.xlsx')
+        deadline = monotonic() + 60
+        while folder.processed == 0 and monotonic() < deadline:
+            sleep(0.1)
+    finally:
+        stop.set()
+        thread.join()
+    assert os.path.isfile(inbox / watcher.DONE_DIR / 'дом_июль.xlsx')
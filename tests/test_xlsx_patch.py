@@ -0,0 +1,59 @@
+"""Точечная запись в xlsx"""
+import zipfile
+
+import openpyxl as op
+import pytest
+
+import allocation
+import synthetic
+import xlsx_patch
+
+KV_QUANTITY = 20
+
+
+def test_untouched_parts_copied_compressed(tmp_path):
+    """Нетронутые части не сжимаются заново: сохраняется их исходное сжатие"""
+    path = level1_workbook(tmp_path)
+    output = patch(tmp_path, path)
+
+    with zipfile.ZipFile(path) as before, zipfile.ZipFile(output) as after:
+        patched = {xlsx_patch.sheet_parts(before)[allocation.PAYMENT_SHEET], 'xl/workbook.xml'}
+        for info in before.infolist():
+            copied = after.getinfo(info.filename)
+            if info.filename in patched:
+                continue
+            assert (copied.CRC, copied.compress_size) == (info.CRC, info.compress_size), info.filename
+
+
+def test_zipfile_without_internals_recompresses(tmp_path, monkeypatch):
+    """Другое устройство zipfile: части записываются через открытый API"""
+    monkeypatch.setattr(xlsx_patch, 'RAW_COPY_ATTRIBUTES', xlsx_patch.RAW_COPY_ATTRIBUTES + ('_missing',))
+    monkeypatch.setattr(xlsx_patch, '_copy_compressed', pytest.fail)
+    patch(tmp_path, level1_workbook(tmp_path))
+
+
+def level1_workbook(tmp_path):
+    """Ведомость, сжатая не так, как сжимает zipfile по умолчанию"""
+    source = tmp_path / 'source.xlsx'
+    synthetic.ved_workbook(str(source), KV_QUANTITY, extra_sheets=1)
+    path = tmp_path / 'ved.xlsx'
+    with zipfile.ZipFile(source) as original, zipfile.ZipFile(path, 'w') as archive:
+        for info in original.infolist():
+            archive.writestr(info, original.read(info), compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+    return path
+
+
+def patch(tmp_path, path):
+    """Записывает две ячейки, проверяет архив и значения; возвращает путь к результату"""
+    changes = [allocation.Change(allocation.PAYMENT_SHEET, 3, allocation.PAYMENT_SUMM_COLUMN, 1500),
+               allocation.Change(allocation.PAYMENT_SHEET, 3, allocation.PAYMENT_DATE_COLUMN, '2025.01.05')]
+    output = tmp_path / 'patched.xlsx'
+    assert xlsx_patch.patch_workbook(str(path), changes, str(output)) == 2
+
+    with zipfile.ZipFile(path) as before, zipfile.ZipFile(output) as after:
+        assert after.testzip() is None
+        assert after.namelist() == before.namelist()
+    sheet = op.load_workbook(output)[allocation.PAYMENT_SHEET]
+    assert sheet.cell(row=3, column=allocation.PAYMENT_SUMM_COLUMN).value == 1500
+    assert sheet.cell(row=3, column=allocation.PAYMENT_DATE_COLUMN).value == '2025.01.05'
+    return output
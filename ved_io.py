@@ -0,0 +1,87 @@
+"""
+Чтение состояния ведомости для `allocation` и запись набора изменений в книгу openpyxl.
+"""
+import allocation
+from allocation import LedgerRow, PaymentRow, VedState
+
+
+def read_state(sheet_payment, sheet_list, index, mon_coord_dict: dict, kv_quantity: int, months=None,
+               columns=allocation.LEDGER_COLUMNS, header_row=allocation.LEDGER_HEADER_ROW) -> VedState:
+    """
+    Читает компактное состояние ведомости по индексу строк.
+
+    Args:
+        sheet_payment: Лист "оплата".
+        sheet_list: Лист "список как должн".
+        index (SheetIndex): Индекс строк квартир.
+        mon_coord_dict (dict): {месяц: (строка, столбец)} начала блоков на листе "оплата".
+        kv_quantity (int): Количество квартир.
+        months: Месяцы, для которых нужны блоки листа "оплата" (по умолчанию все).
+        columns (LedgerColumns): Столбцы листа "список как должн" (`layout.Layout.columns`).
+        header_row (int): Строка с названиями месяцев на листе "список как должн".
+
+    Returns:
+        VedState: Состояние ведомости.
+    """
+    kv_valid = {str(kv) for kv in range(1, kv_quantity + 1)}
+
+    month_names = list(next(sheet_list.iter_rows(
+        min_row=header_row, max_row=header_row,
+        min_col=columns.first_month, max_col=columns.last_month, values_only=True)))
+
+    ledger = {}
+    if index.ledger_rows:
+        first_row = min(index.ledger_rows.values())
+        ledger_values = list(sheet_list.iter_rows(
+            min_row=first_row, max_row=max(index.ledger_rows.values()),
+            min_col=1, max_col=columns.last_month, values_only=True))
+        for kv, row in index.ledger_rows.items():
+            if kv not in kv_valid:
+                continue
+            values = ledger_values[row - first_row]
+            ledger[kv] = LedgerRow(
+                row,
+                values[columns.fee - 1],
+                values[columns.debt - 1],
+                values[columns.debt_paid - 1],
+                values[columns.first_month - 1:])
+
+    payment_rows = {}
+    for month, (coord_row, _) in mon_coord_dict.items():
+        if months is not None and month not in months:
+            continue
+        first_row = coord_row + 2
+        block_values = list(sheet_payment.iter_rows(
+            min_row=first_row, max_row=first_row + kv_quantity - 1,
+            min_col=1, max_col=allocation.PAYMENT_SUMM_COLUMN, values_only=True))
+        block = {}
+        for kv, row in index.payment_rows.get(month, {}).items():
+            if kv not in kv_valid:
+                continue
+            values = block_values[row - first_row]
+            block[kv] = PaymentRow(
+                row,
+                values[allocation.PAYMENT_DATE_COLUMN - 1],
+                values[allocation.PAYMENT_PERIOD_COLUMN - 1],
+                values[allocation.PAYMENT_SUMM_COLUMN - 1])
+        payment_rows[month] = block
+
+    return VedState(ledger, payment_rows, month_names, columns)
+
+
+def apply_changes(workbook, changes) -> int:
+    """
+    Записывает набор изменений в книгу.
+
+    Args:
+        workbook: Книга openpyxl с ведомостью.
+        changes: Изменения `allocation.Change`.
+
+    Returns:
+        int: Количество записанных ячеек.
+    """
+    count = 0
+    for change in changes:
+        workbook[change.sheet].cell(row=change.row, column=change.col, value=change.value)
+        count += 1
+    return count
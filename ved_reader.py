@@ -0,0 +1,322 @@
+"""
+Облегчённая загрузка ведомости: читаются только нужные листы.
+
+Из архива xlsx берутся карта листов (workbook.xml и его связи), общие строки,
+форматы дат из styles.xml и XML выбранных листов. Листы разбираются потоково
+(`iterparse`), в памяти остаются только значения ячеек:
+{строка: {столбец: значение}}. Значения совпадают с тем, что возвращает
+`openpyxl.load_workbook` (числа, строки, даты, формулы в виде '=...').
+
+Листы дают тот же интерфейс чтения, что и листы openpyxl, который используют
+`statement`, `sheet_index` и `ved_io`: `cell(row, column).value`, `max_row`,
+`iter_rows(..., values_only=True)`.
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import NamedTuple
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.cell import coordinate_to_tuple, get_column_letter
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+from xlsx_patch import NS_MAIN, sheet_parts, workbook_rels
+
+
+def _local(tag: str) -> str:
+    """Имя тега без пространства имён."""
+    return tag.rsplit('}', 1)[-1]
+
+
+class _Cell(NamedTuple):
+    value: object
+
+
+class SheetValues:
+    """Значения ячеек одного листа (только чтение)"""
+
+    def __init__(self, title: str, rows: dict, max_row: int, max_column: int):
+        """
+        Args:
+            title (str): Имя листа.
+            rows (dict): {строка: {столбец: значение}}.
+            max_row (int): Последняя строка с ячейками.
+            max_column (int): Последний столбец с ячейками.
+        """
+        self.title = title
+        self.rows = rows
+        self.max_row = max_row
+        self.max_column = max_column
+
+    def value(self, row: int, column: int):
+        return self.rows.get(row, {}).get(column)
+
+    def cell(self, row: int, column: int) -> _Cell:
+        return _Cell(self.value(row, column))
+
+    def iter_rows(self, min_row=1, max_row=None, min_col=1, max_col=None, values_only=True):
+        """Кортежи значений строк (как `Worksheet.iter_rows(values_only=True)`)."""
+        if not values_only:
+            raise ValueError('SheetValues хранит только значения ячеек')
+        max_row = self.max_row if max_row is None else max_row
+        max_col = self.max_column if max_col is None else max_col
+        for row in range(min_row, max_row + 1):
+            values = self.rows.get(row, {})
+            yield tuple(values.get(column) for column in range(min_col, max_col + 1))
+
+
+class VedSheets:
+    """Листы ведомости, загруженные `load_sheets` (доступ по имени, как у книги openpyxl)"""
+
+    def __init__(self, sheets: dict):
+        self.sheets = sheets
+
+    def __getitem__(self, name: str) -> SheetValues:
+        return self.sheets[name]
+
+    @property
+    def sheetnames(self) -> list:
+        return list(self.sheets)
+
+    def close(self) -> None:
+        """Для совместимости с книгой openpyxl (файл уже закрыт)."""
+
+
+def _shared_strings(archive: zipfile.ZipFile, part, count=None) -> list:
+    """
+    Таблица общих строк (текст `<t>` каждого `<si>`, без фонетических подсказок).
+
+    Args:
+        count (int | None): Прочитать только первые count строк.
+    """
+    if part is None or part not in archive.namelist():
+        return []
+    strings = []
+    with archive.open(part) as source:
+        parts = []
+        skip = 0
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            tag = _local(element.tag)
+            if tag == 'rPh':
+                skip += 1 if event == 'start' else -1
+            elif event == 'end' and tag == 't' and not skip:
+                parts.append(element.text or '')
+            elif event == 'end' and tag == 'si':
+                strings.append(''.join(parts))
+                parts = []
+                element.clear()
+                if count is not None and len(strings) >= count:
+                    break
+    return strings
+
+
+def _date_styles(archive: zipfile.ZipFile, part) -> tuple:
+    """
+    Индексы стилей ячеек с форматом даты.
+
+    Returns:
+        tuple: (стили дат, стили интервалов времени).
+    """
+    if part is None or part not in archive.namelist():
+        return set(), set()
+    root = ET.fromstring(archive.read(part))
+    formats = dict(BUILTIN_FORMATS)
+    for num_fmt in root.iter(f'{{{NS_MAIN}}}numFmt'):
+        formats[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode')
+
+    dates, timedeltas = set(), set()
+    cell_xfs = root.find(f'{{{NS_MAIN}}}cellXfs')
+    if cell_xfs is None:
+        return dates, timedeltas
+    for style_id, xf in enumerate(cell_xfs.iter(f'{{{NS_MAIN}}}xf')):
+        number_format = formats.get(int(xf.get('numFmtId', 0)))
+        if number_format and is_date_format(number_format):
+            dates.add(style_id)
+            if number_format.startswith('[h]') or number_format.startswith('[hh]'):
+                timedeltas.add(style_id)
+    return dates, timedeltas
+
+
+class _SheetParser:
+    """Потоковый разбор XML одного листа"""
+
+    def __init__(self, shared_strings: list, date_styles: set, timedelta_styles: set, epoch, max_col=None,
+                 max_row=None):
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.timedelta_styles = timedelta_styles
+        self.epoch = epoch
+        self.max_col = max_col
+        self.max_row = max_row  # разбор останавливается после этой строки
+        self.shared_formulas = {}  # {si: (формула, ячейка)}
+
+    def parse(self, source, title: str) -> SheetValues:
+        rows = {}
+        max_row = max_column = 0
+        row_number = column_number = 0
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            tag = _local(element.tag)
+            if event == 'start':
+                if tag == 'row':
+                    row_number = int(element.get('r', row_number + 1))
+                    column_number = 0
+                    if self.max_row is not None and row_number > self.max_row:
+                        break
+                continue
+            if tag == 'c':
+                coordinate = element.get('r')
+                if coordinate:
+                    row, column = coordinate_to_tuple(coordinate)
+                else:
+                    row, column = row_number, column_number + 1
+                column_number = column
+                max_row = max(max_row, row)
+                max_column = max(max_column, column)
+                if self.max_col is None or column <= self.max_col:
+                    value = self._value(element, row, column)
+                    if value is not None:
+                        rows.setdefault(row, {})[column] = value
+                element.clear()
+            elif tag == 'row':
+                element.clear()
+        return SheetValues(title, rows, max(max_row, 1), max(max_column, 1))
+
+    def _value(self, element, row: int, column: int):
+        """Значение ячейки (по правилам openpyxl при data_only=False)."""
+        data_type = element.get('t', 'n')
+        formula = element.find(f'{{{NS_MAIN}}}f')
+        if formula is not None:
+            return self._formula(formula, row, column)
+        if data_type == 'inlineStr':
+            inline = element.find(f'{{{NS_MAIN}}}is')
+            if inline is None:
+                return None
+            return ''.join(text.text or '' for text in inline.iter(f'{{{NS_MAIN}}}t'))
+
+        value = element.findtext(f'{{{NS_MAIN}}}v') or None
+        if value is None:
+            return None
+        if data_type == 'n':
+            value = float(value) if '.' in value or 'E' in value or 'e' in value else int(value)
+            style_id = int(element.get('s', 0))
+            if style_id in self.date_styles:
+                try:
+                    return from_excel(value, self.epoch, timedelta=style_id in self.timedelta_styles)
+                except (OverflowError, ValueError):
+                    return '#VALUE!'
+            return value
+        if data_type == 's':
+            return self.shared_strings[int(value)]
+        if data_type == 'b':
+            return bool(int(value))
+        return value
+
+    def _formula(self, formula, row: int, column: int) -> str:
+        value = '=' + (formula.text or '')
+        if formula.get('t') != 'shared':
+            return value
+        coordinate = f'{get_column_letter(column)}{row}'
+        shared_index = formula.get('si')
+        if formula.text is not None:
+            self.shared_formulas[shared_index] = (value, coordinate)
+            return value
+        if shared_index in self.shared_formulas:
+            master, origin = self.shared_formulas[shared_index]
+            return Translator(master, origin).translate_formula(coordinate)
+        return value
+
+
+def load_sheets(path: str, sheets: dict) -> VedSheets:
+    """
+    Загружает значения выбранных листов книги, не разбирая остальные части.
+
+    Args:
+        path (str): Путь к xlsx.
+        sheets (dict): {имя листа: последний нужный столбец или None (все столбцы)}.
+
+    Returns:
+        VedSheets: Листы по именам.
+
+    Raises:
+        KeyError: Если в книге нет одного из листов.
+    """
+    with zipfile.ZipFile(path) as archive:
+        parts = sheet_parts(archive)
+        missing = [name for name in sheets if name not in parts]
+        if missing:
+            raise KeyError(f'Worksheet {", ".join(missing)} does not exist.')
+
+        rels = workbook_rels(archive).values()
+        shared_strings = _shared_strings(archive, next(
+            (part for rel_type, part in rels if rel_type.endswith('/sharedStrings')), None))
+        date_styles, timedelta_styles = _date_styles(archive, next(
+            (part for rel_type, part in rels if rel_type.endswith('/styles')), None))
+
+        workbook_pr = ET.fromstring(archive.read('xl/workbook.xml')).find(f'{{{NS_MAIN}}}workbookPr')
+        date1904 = workbook_pr is not None and workbook_pr.get('date1904') in ('1', 'true')
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        result = {}
+        for name, max_col in sheets.items():
+            parser = _SheetParser(shared_strings, date_styles, timedelta_styles, epoch, max_col)
+            with archive.open(parts[name]) as source:
+                result[name] = parser.parse(source, name)
+    return VedSheets(result)
+
+
+class _SharedString(int):
+    """Номер общей строки, текст которой подставляется после разбора (`peek_sheet`)"""
+
+
+class _SharedStringRefs:
+    """Вместо таблицы общих строк: запоминает нужные номера, не читая sharedStrings.xml целиком"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __getitem__(self, index: int) -> _SharedString:
+        self.count = max(self.count, index + 1)
+        return _SharedString(index)
+
+
+def peek_sheet(path: str, name=None, max_row=10, max_col=None) -> SheetValues:
+    """
+    Первые строки листа без загрузки книги: разбор листа останавливается после max_row,
+    из общих строк читаются только нужные. Форматы дат не применяются (даты остаются числами).
+
+    Args:
+        path (str): Путь к xlsx.
+        name (str | None): Имя листа (по умолчанию активный лист).
+        max_row (int): Последняя нужная строка.
+        max_col (int | None): Последний нужный столбец.
+
+    Returns:
+        SheetValues: Значения первых строк (`max_row` — последняя строка с ячейками среди прочитанных).
+
+    Raises:
+        KeyError: Если в книге нет листа.
+    """
+    with zipfile.ZipFile(path) as archive:
+        parts = sheet_parts(archive)
+        if name is None:
+            book_view = ET.fromstring(archive.read('xl/workbook.xml')).find(f'.//{{{NS_MAIN}}}workbookView')
+            active = int(book_view.get('activeTab', 0)) if book_view is not None else 0
+            names = list(parts)
+            name = names[active] if active < len(names) else names[0]
+        if name not in parts:
+            raise KeyError(f'Worksheet {name} does not exist.')
+
+        refs = _SharedStringRefs()
+        parser = _SheetParser(refs, set(), set(), CALENDAR_WINDOWS_1900, max_col, max_row)
+        with archive.open(parts[name]) as source:
+            sheet = parser.parse(source, name)
+
+        if refs.count:
+            part = next((part for rel_type, part in workbook_rels(archive).values()
+                         if rel_type.endswith('/sharedStrings')), None)
+            strings = _shared_strings(archive, part, refs.count)
+            for values in sheet.rows.values():
+                for column, value in values.items():
+                    if isinstance(value, _SharedString):
+                        values[column] = strings[value] if value < len(strings) else None
+    return sheet
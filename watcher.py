@@ -0,0 +1,364 @@
+"""
+Папка входящих выгрузок банка: новые файлы обрабатываются без оператора.
+
+`Watcher` следит за папкой (inotify в Linux — проверяются только файлы из событий,
+иначе — опрос всей папки раз в `interval` секунд),
+ждёт, пока файл перестанет меняться (`settle` секунд без изменения размера и времени),
+находит ведомость дома и ставит задание `jobs.Job` в пул процессов ограниченного размера.
+Задания одной ведомости выполняются по очереди, разных ведомостей — параллельно.
+
+Ведомость для файла банка определяется:
+- по маршрутам (`load_routes`): CSV с заголовком `pattern;ved;kv` или JSON-список объектов
+  `{"pattern": ..., "ved": ..., "kv": ...}`, pattern — шаблон имени файла (`fnmatch`);
+- по правилу имени: `<имя ведомости>__<что угодно>.<расширение>` -> `<папка ведомостей>/<имя ведомости>.xlsx`,
+  количество квартир определяется по ведомости (`preflight.count_apartments`).
+
+Обработанный файл переносится в `done/` или `failed/` внутри папки, рядом кладётся
+`<файл>.result.json` с результатом (`jobs.JobResult.to_dict`).
+"""
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import logging
+import os
+import select
+import struct
+from stat import S_ISREG
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime
+from time import monotonic, sleep, time
+from typing import NamedTuple
+
+import bank_cache
+import jobs
+import preflight
+
+logger = logging.getLogger(__name__)
+
+BANK_EXTENSIONS = ('.xlsx', '.csv', '.txt')
+NAME_SEPARATOR = '__'  # <имя ведомости>__<что угодно>.xlsx
+RESULT_SUFFIX = '.result.json'
+DONE_DIR = 'done'
+FAILED_DIR = 'failed'
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Route(NamedTuple):
+    """Маршрут: файлы банка с именем по шаблону относятся к ведомости"""
+    pattern: str  # шаблон имени файла банка (fnmatch), например 'кокжал_*.xlsx'
+    path_ved: str
+    kv_quantity: int
+
+
+def load_routes(path: str) -> list:
+    """
+    Читает маршруты файлов банка.
+
+    Args:
+        path (str): Путь к CSV (`pattern;ved;kv`) или JSON файлу.
+
+    Returns:
+        list[Route]: Маршруты в порядке проверки.
+
+    Raises:
+        ValueError: Если в записи нет нужных полей.
+    """
+    routes = []
+    for number, record in enumerate(jobs.read_records(path), start=1):
+        try:
+            routes.append(Route(record['pattern'], record['ved'], int(record['kv'])))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f'Маршруты {path}: неверная запись №{number} ({exc})') from exc
+    return routes
+
+
+class _Inotify:
+    """Уведомления Linux об изменениях в папке (через libc, без сторонних модулей)"""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, 'inotify_add_watch')
+
+    def wait(self, timeout: float) -> list:
+        """
+        Ждёт событий не дольше timeout секунд.
+
+        Returns:
+            list[str] | None: Имена изменившихся файлов или None, если очередь событий переполнилась
+                (часть событий потеряна — нужно проверить всю папку).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            if mask & IN_Q_OVERFLOW:
+                return None
+            offset += EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def open_inotify(directory: str):
+    """
+    Returns:
+        _Inotify | None: Уведомления об изменениях или None (не Linux, нет inotify) — тогда опрос папки.
+    """
+    if not hasattr(select, 'select') or not ctypes.util.find_library('c'):
+        return None
+    try:
+        return _Inotify(directory)
+    except (OSError, AttributeError) as exc:
+        logger.debug(f'inotify недоступен, папка опрашивается: {exc}')
+        return None
+
+
+def _free_path(path: str) -> str:
+    """Путь, не занятый другим файлом (к имени добавляется время)."""
+    if not os.path.exists(path):
+        return path
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{datetime.now():%Y%m%d-%H%M%S-%f}{extension}'
+
+
+class Watcher:
+    """Обработка файлов банка, появляющихся в папке"""
+
+    def __init__(self, inbox: str, routes=(), ved_dir=None, workers=None, settle=2.0, interval=1.0,
+                 use_inotify=True):
+        """
+        Args:
+            inbox (str): Папка входящих файлов банка.
+            routes: Маршруты `Route` (проверяются по порядку до правила имени).
+            ved_dir (str | None): Папка ведомостей для правила имени (None — правило не используется).
+            workers (int | None): Количество процессов (по умолчанию — число доступных ядер).
+            settle (float): Сколько секунд файл не должен меняться, чтобы считаться записанным.
+            interval (float): Период опроса папки, сек.
+            use_inotify (bool): Использовать inotify, если он доступен.
+        """
+        self.inbox = inbox
+        self.routes = list(routes)
+        self.ved_dir = ved_dir
+        self.workers = workers or bank_cache.usable_cpus()
+        self.settle = settle
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.done_dir = os.path.join(inbox, DONE_DIR)
+        self.failed_dir = os.path.join(inbox, FAILED_DIR)
+
+        self._seen = {}  # {имя: ((размер, время изменения), время последнего изменения)}
+        self._stuck = {}  # {имя: (размер, время изменения)} — обработаны, но не перенесены из папки
+        self._queue = []  # [(имя, Job)] — файлы, ждущие свободного процесса или своей ведомости
+        self._running = {}  # {future: (имя, Job, время постановки)}
+        self.processed = 0  # обработано файлов (успешно и с ошибкой)
+
+    def resolve(self, name: str):
+        """
+        Задание для файла банка.
+
+        Returns:
+            Job | None: Задание или None, если ведомость не найдена.
+        """
+        path_bank = os.path.join(self.inbox, name)
+        for route in self.routes:
+            if fnmatch.fnmatch(name.lower(), route.pattern.lower()):
+                return jobs.Job(route.path_ved, path_bank, route.kv_quantity)
+        if self.ved_dir is None or NAME_SEPARATOR not in name:
+            return None
+        path_ved = os.path.join(self.ved_dir, name.split(NAME_SEPARATOR, 1)[0] + '.xlsx')
+        if not os.path.isfile(path_ved):
+            return None
+        kv_quantity = preflight.count_apartments(path_ved)
+        return jobs.Job(path_ved, path_bank, kv_quantity) if kv_quantity else None
+
+    @staticmethod
+    def _is_bank_file(name: str) -> bool:
+        return (name.lower().endswith(BANK_EXTENSIONS) and not name.startswith(('~$', '.'))
+                and not name.endswith(RESULT_SUFFIX))
+
+    def _queued(self, name: str) -> bool:
+        return (any(queued == name for queued, _ in self._queue)
+                or any(running == name for running, _, _ in self._running.values()))
+
+    def scan(self, changed=None) -> list:
+        """
+        Проверяет папку.
+
+        Args:
+            changed (list[str] | None): Имена файлов из событий inotify — проверяются только они и файлы,
+                ещё не прошедшие settle; None — проверяется вся папка.
+
+        Returns:
+            list[str]: Файлы, которые не менялись settle секунд (готовы к обработке).
+        """
+        now = monotonic()
+        if changed is None:
+            names = {entry.name for entry in os.scandir(self.inbox) if entry.is_file()}
+        else:
+            names = set(changed)
+        ready = []
+        for name in sorted(names | set(self._seen)):
+            if not self._is_bank_file(name) or self._queued(name):
+                continue
+            path = os.path.join(self.inbox, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # файл удалён или переименован до обработки
+                self._seen.pop(name, None)
+                continue
+            if not S_ISREG(stat.st_mode):
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._stuck.get(name) == signature:
+                continue  # тот же файл уже обработан, повторно не берём
+            self._stuck.pop(name, None)
+            previous = self._seen.get(name)
+            if previous is None or previous[0] != signature:
+                self._seen[name] = (signature, now)
+            elif stat.st_size and now - previous[1] >= self.settle and self._readable(path):
+                ready.append(name)
+                del self._seen[name]
+        return ready
+
+    @staticmethod
+    def _readable(path: str) -> bool:
+        """Файл не открыт на запись другой программой (в Windows такой файл не открывается)."""
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+    def _finish(self, name: str, result: jobs.JobResult, queued: float) -> None:
+        """Переносит файл банка в done/failed и сохраняет результат рядом."""
+        directory = self.done_dir if result.ok else self.failed_dir
+        os.makedirs(directory, exist_ok=True)
+        target = _free_path(os.path.join(directory, name))
+        path = os.path.join(self.inbox, name)
+        try:
+            os.replace(path, target)
+        except OSError as exc:
+            logger.error(f'Не удалось перенести "{name}" в {directory}: {exc}')
+            target = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+                self._stuck[name] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                pass
+        data = result.to_dict()
+        data.update(bank=name, finished=datetime.now().isoformat(timespec='seconds'),
+                    turnaround=round(time() - queued, 3))
+        try:
+            with open(f'{target}{RESULT_SUFFIX}', 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=2, default=str)
+        except OSError as exc:
+            logger.error(f'Не удалось сохранить результат "{name}": {exc}')
+        self.processed += 1
+        if result.ok:
+            logger.info(f'{name} -> {os.path.basename(result.job.path_ved)}: готово за {result.elapsed:.2f} сек.')
+        else:
+            logger.error(f'{name}: {result.error}')
+
+    def _enqueue(self, name: str) -> None:
+        try:
+            job = self.resolve(name)
+            error = None if job is not None else f'Не найдена ведомость для файла банка "{name}"'
+        except Exception as exc:  # ведомость не читается (повреждённый xlsx, неверный XML, нет доступа)
+            job = None
+            error = f'Не удалось определить ведомость для файла банка "{name}": {type(exc).__name__}: {exc}'
+        if job is None:
+            self._finish(name, jobs.JobResult(jobs.Job('', os.path.join(self.inbox, name), 0), False, 0.0,
+                                              error=error), time())
+            return
+        logger.info(f'{name}: в очереди, ведомость {os.path.basename(job.path_ved)}')
+        self._queue.append((name, job))
+
+    def _dispatch(self, executor) -> None:
+        """Отправляет задания в пул: не больше workers одновременно и одно на ведомость."""
+        busy = {os.path.realpath(job.path_ved) for _, job, _ in self._running.values()}
+        waiting = []
+        for name, job in self._queue:
+            path_ved = os.path.realpath(job.path_ved)
+            if len(self._running) >= self.workers or path_ved in busy:
+                waiting.append((name, job))
+                continue
+            busy.add(path_ved)
+            self._running[executor.submit(jobs.run_job, job)] = (name, job, time())
+        self._queue = waiting
+
+    def _collect(self) -> None:
+        for future in [future for future in self._running if future.done()]:
+            name, job, queued = self._running.pop(future)
+            try:
+                result = future.result()
+            except Exception as exc:  # процесс пула упал
+                result = jobs.JobResult(job, False, 0.0, error=f'{type(exc).__name__}: {exc}')
+            self._finish(name, result, queued)
+
+    def run(self, stop_event=None, once=False) -> int:
+        """
+        Следит за папкой до stop_event (или Ctrl+C).
+
+        Args:
+            stop_event (threading.Event | None): Остановка наблюдения.
+            once (bool): Обработать файлы, которые уже лежат в папке, и выйти.
+
+        Returns:
+            int: Количество обработанных файлов.
+        """
+        os.makedirs(self.inbox, exist_ok=True)
+        notifier = open_inotify(self.inbox) if self.use_inotify and not once else None
+        logger.info(f'Наблюдение за папкой {self.inbox} ({"inotify" if notifier else "опрос"}), '
+                    f'процессов: {self.workers}')
+        # без уведомлений файл проверяется раз в interval, с ними — чаще, чтобы не ждать лишнего после settle
+        timeout = min(self.interval, self.settle / 2) if notifier else self.interval
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                if once:  # файлы уже записаны, ждать settle не нужно
+                    for name in sorted(os.listdir(self.inbox)):
+                        if self._is_bank_file(name) and os.path.isfile(os.path.join(self.inbox, name)):
+                            self._enqueue(name)
+                changed = None  # None — проверить всю папку (первый проход, опрос, потерянные события inotify)
+                while stop_event is None or not stop_event.is_set():
+                    if not once:
+                        for name in self.scan(changed):
+                            self._enqueue(name)
+                    self._dispatch(executor)
+                    self._collect()
+                    if once and not self._queue and not self._running:
+                        break
+                    if notifier is not None:
+                        changed = notifier.wait(timeout)
+                    else:
+                        sleep(timeout)
+                wait(self._running)  # остановка: дожидаемся начатых заданий
+                self._collect()
+        finally:
+            if notifier is not None:
+                notifier.close()
+        return self.processed
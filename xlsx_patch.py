@@ -0,0 +1,325 @@
+"""
+Точечная запись изменений в xlsx без полного сохранения через openpyxl.
+
+Переписываются только XML листов, в которых есть изменённые ячейки
+(строки `<row>` и ячейки `<c>` правятся на месте, стиль ячейки сохраняется,
+строки записываются как inlineStr — sharedStrings.xml не трогается).
+Остальные части книги копируются в сжатом виде как есть, без распаковки
+и повторного сжатия (если внутреннее устройство zipfile другое — сжимаются заново).
+В workbook.xml включается пересчёт формул при открытии, calcChain.xml удаляется,
+если перезаписана ячейка с формулой.
+
+Если лист устроен непривычно (префиксы пространств имён, строки без номера,
+общие формулы в изменяемых ячейках), выбрасывается `PatchError` —
+вызывающий код должен сохранить книгу обычным способом.
+"""
+import copy
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from xml.sax.saxutils import escape
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CALC_CHAIN = 'xl/calcChain.xml'
+
+ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+REF_RE = re.compile(r'\br="([A-Z]+)?(\d+)"')
+STYLE_RE = re.compile(r'\bs="(\d+)"')
+SPANS_RE = re.compile(r'\s+spans="[^"]*"')
+SHEET_DATA_RE = re.compile(r'<sheetData\s*/>|<sheetData\b[^>]*>(.*?)</sheetData>', re.S)
+DIMENSION_RE = re.compile(r'<dimension\s+ref="([^"]*)"\s*/>')
+
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+LOCAL_HEADER_SIZE = 30  # без имени файла и дополнительного поля
+DATA_DESCRIPTOR_FLAG = 0x08  # CRC и размеры записаны после данных, а не в заголовке
+# внутренние атрибуты zipfile.ZipFile, без которых сжатые данные не скопировать как есть
+RAW_COPY_ATTRIBUTES = ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify')
+
+
+class PatchError(Exception):
+    """Книгу нельзя изменить точечно (нужно обычное сохранение)"""
+
+
+def column_letter(col: int) -> str:
+    """1 -> 'A', 27 -> 'AA'."""
+    letters = ''
+    while col:
+        col, rest = divmod(col - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def column_index(letters: str) -> int:
+    """'A' -> 1, 'AA' -> 27."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def workbook_rels(archive: zipfile.ZipFile) -> dict:
+    """
+    Связи книги (xl/_rels/workbook.xml.rels).
+
+    Returns:
+        dict: {идентификатор: (тип связи, часть архива)}.
+    """
+    rels = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    result = {}
+    for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+        target = rel.get('Target')
+        part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+        result[rel.get('Id')] = (rel.get('Type', ''), part)
+    return result
+
+
+def sheet_parts(archive: zipfile.ZipFile) -> dict:
+    """
+    Соответствие имён листов частям архива.
+
+    Returns:
+        dict: {имя листа: 'xl/worksheets/sheetN.xml'}.
+    """
+    rels = workbook_rels(archive)
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    return {sheet.get('name'): rels[sheet.get(f'{{{NS_REL}}}id')][1]
+            for sheet in workbook.iter(f'{{{NS_MAIN}}}sheet')}
+
+
+def cell_xml(ref: str, style: str, value) -> str:
+    """XML ячейки с новым значением (стиль сохраняется)."""
+    style_attr = f' s="{style}"' if style is not None else ''
+    if value is None:
+        return f'<c r="{ref}"{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{repr(value)}</v></c>'
+    text = escape(str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+class _SheetPatcher:
+    """Правка sheetData одного листа"""
+
+    def __init__(self, xml: str):
+        self.xml = xml
+        self.formula_replaced = False
+
+    def patch(self, cells: dict) -> str:
+        """
+        Args:
+            cells (dict): {(строка, столбец): значение}.
+
+        Returns:
+            str: Новый XML листа.
+        """
+        if '<sheetData' not in self.xml:
+            raise PatchError('на листе нет sheetData (возможно, префиксы пространств имён)')
+        by_row = {}
+        for (row, col), value in cells.items():
+            by_row.setdefault(row, {})[col] = value
+
+        match = SHEET_DATA_RE.search(self.xml)
+        body = match.group(1) or ''
+        new_body = self._patch_rows(body, by_row)
+        xml = f'{self.xml[:match.start()]}<sheetData>{new_body}</sheetData>{self.xml[match.end():]}'
+        return self._patch_dimension(xml, by_row)
+
+    def _patch_rows(self, body: str, by_row: dict) -> str:
+        pieces = []
+        position = 0
+        pending = sorted(by_row)
+        for match in ROW_RE.finditer(body):
+            ref = REF_RE.search(match.group(1))
+            if ref is None:
+                raise PatchError('строка листа без атрибута r')
+            row = int(ref.group(2))
+            while pending and pending[0] < row:  # новые строки перед текущей
+                pieces.append(body[position:match.start()])
+                position = match.start()
+                new_row = pending.pop(0)
+                pieces.append(self._row_xml(new_row, '', '', by_row[new_row]))
+            if pending and pending[0] == row:
+                pending.pop(0)
+                pieces.append(body[position:match.start()])
+                pieces.append(self._row_xml(row, match.group(1), match.group(2) or '', by_row[row]))
+                position = match.end()
+        pieces.append(body[position:])
+        for new_row in pending:  # новые строки в конце листа
+            pieces.append(self._row_xml(new_row, '', '', by_row[new_row]))
+        return ''.join(pieces)
+
+    def _row_xml(self, row: int, attrs: str, content: str, values: dict) -> str:
+        cells = {}
+        for match in CELL_RE.finditer(content):
+            ref = REF_RE.search(match.group(1))
+            if ref is None or ref.group(1) is None:
+                raise PatchError(f'ячейка без адреса в строке {row}')
+            cells[column_index(ref.group(1))] = (match.group(0), match.group(1), match.group(2) or '')
+
+        for col, value in values.items():
+            style = None
+            if col in cells:
+                _, cell_attrs, cell_content = cells[col]
+                if '<f' in cell_content:
+                    if 't="shared"' in cell_content and 'ref="' in cell_content:
+                        raise PatchError(f'ячейка {column_letter(col)}{row} — начало общей формулы')
+                    self.formula_replaced = True
+                style_match = STYLE_RE.search(cell_attrs)
+                style = style_match.group(1) if style_match else None
+            ref = f'{column_letter(col)}{row}'
+            cells[col] = (cell_xml(ref, style, value), None, None)
+
+        attrs = SPANS_RE.sub('', attrs) if attrs else f' r="{row}"'
+        return f'<row{attrs}>{"".join(cells[col][0] for col in sorted(cells))}</row>'
+
+    @staticmethod
+    def _patch_dimension(xml: str, by_row: dict) -> str:
+        match = DIMENSION_RE.search(xml)
+        if match is None:
+            return xml
+        refs = re.findall(r'([A-Z]+)(\d+)', match.group(1))
+        if not refs:
+            return xml
+        cols = [column_index(col) for col, _ in refs] + [col for values in by_row.values() for col in values]
+        rows = [int(row) for _, row in refs] + list(by_row)
+        ref = f'{column_letter(min(cols))}{min(rows)}:{column_letter(max(cols))}{max(rows)}'
+        return f'{xml[:match.start()]}<dimension ref="{ref}"/>{xml[match.end():]}'
+
+
+def _full_calc_on_load(xml: str) -> str:
+    """Включает пересчёт формул при открытии книги."""
+    match = re.search(r'<calcPr\b([^>]*?)/>', xml)
+    if match is None:
+        return xml.replace('</workbook>', '<calcPr fullCalcOnLoad="1"/></workbook>')
+    if 'fullCalcOnLoad=' in match.group(1):
+        attrs = re.sub(r'fullCalcOnLoad="[^"]*"', 'fullCalcOnLoad="1"', match.group(1))
+    else:
+        attrs = f'{match.group(1)} fullCalcOnLoad="1"'
+    return f'{xml[:match.start()]}<calcPr{attrs}/>{xml[match.end():]}'
+
+
+def _drop_calc_chain(name: str, data: bytes) -> bytes:
+    """Убирает ссылки на calcChain.xml из [Content_Types].xml и связей книги."""
+    text = data.decode('utf-8')
+    if name == '[Content_Types].xml':
+        text = re.sub(r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', '', text)
+    else:
+        text = re.sub(r'<Relationship\b[^>]*Target="/?(?:xl/)?calcChain\.xml"[^>]*/>', '', text)
+    return text.encode('utf-8')
+
+
+def _can_copy_raw(target: zipfile.ZipFile) -> bool:
+    """
+    Можно ли копировать части без распаковки: `_copy_compressed` опирается на внутреннее устройство
+    zipfile, которое может измениться в другой версии Python (тогда части сжимаются заново).
+    """
+    return (all(hasattr(target, name) for name in RAW_COPY_ATTRIBUTES)
+            and isinstance(target.filelist, list) and isinstance(target.NameToInfo, dict)
+            and hasattr(zipfile.ZipInfo, 'FileHeader'))
+
+
+def _copy_compressed(raw, target: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """
+    Копирует часть архива без распаковки: сжатые данные переносятся как есть
+    (только если `_can_copy_raw(target)`).
+
+    Args:
+        raw: Исходный файл книги, открытый в двоичном режиме.
+        target (zipfile.ZipFile): Новый архив (режим 'w').
+        info (zipfile.ZipInfo): Часть исходного архива (из центрального каталога).
+    """
+    raw.seek(info.header_offset)
+    header = raw.read(LOCAL_HEADER_SIZE)
+    if header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f'неверный заголовок части {info.filename}')
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    raw.seek(info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length)
+    data = raw.read(info.compress_size)
+
+    copied = copy.copy(info)
+    copied.flag_bits &= ~DATA_DESCRIPTOR_FLAG  # CRC и размеры известны, пишутся в заголовок
+    copied.header_offset = target.fp.tell()
+    target.fp.write(copied.FileHeader())
+    target.fp.write(data)
+    target.filelist.append(copied)
+    target.NameToInfo[copied.filename] = copied
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+
+def patch_workbook(path: str, changes, output=None) -> int:
+    """
+    Записывает набор изменений в xlsx, переписывая только затронутые листы.
+
+    Args:
+        path (str): Исходная книга.
+        changes: Изменения `allocation.Change(sheet, row, col, value)`.
+        output (str | None): Куда сохранить (по умолчанию — поверх исходной книги).
+
+    Returns:
+        int: Количество записанных ячеек.
+
+    Raises:
+        PatchError: Если книгу нельзя изменить точечно.
+        PermissionError: Если файл открыт в другой программе.
+    """
+    output = output if output is not None else path
+    by_sheet = {}
+    for change in changes:
+        by_sheet.setdefault(change.sheet, {})[(change.row, change.col)] = change.value
+    count = sum(len(cells) for cells in by_sheet.values())
+
+    with zipfile.ZipFile(path) as source:
+        try:
+            parts = sheet_parts(source)
+        except (KeyError, ET.ParseError) as exc:
+            raise PatchError(f'не удалось найти листы книги: {exc}') from exc
+        missing = [sheet for sheet in by_sheet if sheet not in parts]
+        if missing:
+            raise PatchError(f'в книге нет листов: {", ".join(missing)}')
+
+        patched = {}
+        drop_calc_chain = False
+        for sheet, cells in by_sheet.items():
+            part = parts[sheet]
+            patcher = _SheetPatcher(source.read(part).decode('utf-8'))
+            patched[part] = patcher.patch(cells).encode('utf-8')
+            drop_calc_chain = drop_calc_chain or patcher.formula_replaced
+        if patched:
+            patched['xl/workbook.xml'] = _full_calc_on_load(source.read('xl/workbook.xml').decode('utf-8')) \
+                .encode('utf-8')
+
+        directory = os.path.dirname(os.path.abspath(output))
+        handle, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+        os.close(handle)
+        try:
+            with zipfile.ZipFile(temp_path, 'w') as target, open(path, 'rb') as raw:
+                copy_raw = _can_copy_raw(target)
+                for info in source.infolist():
+                    if drop_calc_chain and info.filename == CALC_CHAIN:
+                        continue
+                    data = patched.get(info.filename)
+                    if data is None and drop_calc_chain and \
+                            info.filename in ('[Content_Types].xml', 'xl/_rels/workbook.xml.rels'):
+                        data = _drop_calc_chain(info.filename, source.read(info.filename))
+                    if data is None and copy_raw:
+                        _copy_compressed(raw, target, info)  # нетронутая часть — без повторного сжатия
+                    else:
+                        data = data if data is not None else source.read(info.filename)
+                        target.writestr(info, data, compress_type=info.compress_type)
+            os.replace(temp_path, output)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return count